@@ -8,7 +8,10 @@ namespace LERD.Application.Services;
 public abstract class BaseChartService
 {
     /// <summary>
-    /// Builds common filter conditions for survey response data with advanced period filtering
+    /// Builds common filter conditions for survey response data with advanced period filtering.
+    /// Filters on the typed columns the data processor writes next to response_data, so the
+    /// survey_responses_chart_filter_idx partial index applies; Satisfaction and NPS_NPS_GROUP
+    /// answers that are not integer codes are stored as NULL and count as unanswered
     /// </summary>
     /// <param name="filters">Chart filters to apply</param>
     /// <returns>SQL WHERE conditions string</returns>
@@ -16,15 +19,15 @@ public abstract class BaseChartService
     {
         var conditions = new List<string>
         {
-            "sr.response_data->>'Satisfaction' IS NOT NULL",
-            "sr.response_data->>'NPS_NPS_GROUP' IS NOT NULL"
+            "sr.satisfaction IS NOT NULL",
+            "sr.nps_group IS NOT NULL"
         };
 
         if (!string.IsNullOrEmpty(filters.Gender))
-            conditions.Add("sr.response_data->>'Gender' = @gender");
+            conditions.Add("sr.gender = @gender");
 
         if (!string.IsNullOrEmpty(filters.ParticipantType))
-            conditions.Add("sr.response_data->>'ParticipantType' = @participantType");
+            conditions.Add("sr.participant_type = @participantType");
 
         // Advanced period filtering with multiple format support
         var periodFilter = filters.PeriodFilter;
@@ -37,6 +40,35 @@ public abstract class BaseChartService
         return string.Join(" AND ", conditions);
     }
 
+    /// <summary>
+    /// Builds the same filter conditions against survey_response_rollups (aliased sr),
+    /// which the data processor rebuilds after every load
+    /// </summary>
+    /// <param name="filters">Chart filters to apply</param>
+    /// <returns>SQL WHERE conditions string</returns>
+    protected string BuildRollupFilterConditions(ChartFilters filters)
+    {
+        var conditions = new List<string>
+        {
+            "sr.has_core_answers"
+        };
+
+        if (!string.IsNullOrEmpty(filters.Gender))
+            conditions.Add("sr.gender = @gender");
+
+        if (!string.IsNullOrEmpty(filters.ParticipantType))
+            conditions.Add("sr.participant_type = @participantType");
+
+        // Rollups keep period_year/period_month, so the period clause applies unchanged
+        var periodCondition = filters.PeriodFilter.BuildWhereClause();
+        if (periodCondition != "1=1")
+        {
+            conditions.Add(periodCondition);
+        }
+
+        return string.Join(" AND ", conditions);
+    }
+
     /// <summary>
     /// Builds base CTE (Common Table Expression) for filtered survey responses
     /// </summary>
@@ -48,9 +80,9 @@ public abstract class BaseChartService
         var filterConditions = BuildFilterConditions(filters);
         
         var baseFields = @"
-                    sr.response_data->>'Facility' as facility_code,
-                    sr.response_data->>'Gender' as gender,
-                    sr.response_data->>'ParticipantType' as participant_type,
+                    sr.facility as facility_code,
+                    sr.gender,
+                    sr.participant_type,
                     sr.response_data->>'EndDate' as end_date";
 
         var allFields = string.IsNullOrEmpty(additionalFields) 
@@ -22,40 +22,49 @@ public class CustomerSatisfactionService : BaseChartService, ICustomerSatisfacti
 
     public async Task<CustomerSatisfactionData> GetSatisfactionDataAsync(Guid surveyId, ChartFilters filters)
     {
-        var baseCTE = BuildBaseResponseCTE(filters, @"
-                    sr.response_data->>'Satisfaction' as satisfaction_code");
+        var filterConditions = BuildRollupFilterConditions(filters);
         
+        // Pre-aggregated counts maintained by the data processor instead of a response_data scan
         var sql = $@"
-            {baseCTE},
+            WITH satisfaction_counts AS (
+              SELECT 
+                sr.code as satisfaction_code,
+                SUM(sr.response_count) as response_count
+              FROM survey_response_rollups sr
+              WHERE sr.survey_id = @surveyId
+                AND sr.metric = 'Satisfaction'
+                AND {filterConditions}
+              GROUP BY sr.code
+            ),
             total_count AS (
-              SELECT COUNT(*) as total FROM response_records
+              SELECT SUM(response_count) as total FROM satisfaction_counts
             )
             SELECT 
               COALESCE(
                 ROUND(
-                  COUNT(CASE WHEN satisfaction_code = '6' THEN 1 END) * 100.0 / NULLIF(tc.total, 0), 1
+                  SUM(CASE WHEN satisfaction_code = '6' THEN response_count ELSE 0 END) * 100.0 / NULLIF(tc.total, 0), 1
                 ), 0
               ) as very_satisfied_percentage,
               
               COALESCE(
                 ROUND(
-                  COUNT(CASE WHEN satisfaction_code = '5' THEN 1 END) * 100.0 / NULLIF(tc.total, 0), 1
+                  SUM(CASE WHEN satisfaction_code = '5' THEN response_count ELSE 0 END) * 100.0 / NULLIF(tc.total, 0), 1
                 ), 0
               ) as satisfied_percentage,
               
               COALESCE(
                 ROUND(
-                  COUNT(CASE WHEN satisfaction_code = '4' THEN 1 END) * 100.0 / NULLIF(tc.total, 0), 1
+                  SUM(CASE WHEN satisfaction_code = '4' THEN response_count ELSE 0 END) * 100.0 / NULLIF(tc.total, 0), 1
                 ), 0
               ) as somewhat_satisfied_percentage,
               
               COALESCE(
                 ROUND(
-                  COUNT(CASE WHEN satisfaction_code IN ('4','5','6') THEN 1 END) * 100.0 / NULLIF(tc.total, 0), 1
+                  SUM(CASE WHEN satisfaction_code IN ('4','5','6') THEN response_count ELSE 0 END) * 100.0 / NULLIF(tc.total, 0), 1
                 ), 0
               ) as total_satisfied_percentage
 
-            FROM response_records, total_count tc
+            FROM satisfaction_counts, total_count tc
             GROUP BY tc.total;";
 
         using var connection = new NpgsqlConnection(_context.Database.GetConnectionString());
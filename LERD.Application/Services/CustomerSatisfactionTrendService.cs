@@ -110,7 +110,7 @@ public class CustomerSatisfactionTrendService : BaseChartService, ICustomerSatis
             WITH yearly_satisfaction AS (
               SELECT 
                 EXTRACT(YEAR FROM (sr.response_data->>'EndDate')::timestamp) as year,
-                sr.response_data->>'Satisfaction' as satisfaction_code
+                sr.satisfaction as satisfaction_code
               FROM survey_responses sr
               WHERE sr.survey_id = @surveyId
                 AND sr.response_data->>'EndDate' IS NOT NULL
@@ -128,17 +128,17 @@ public class CustomerSatisfactionTrendService : BaseChartService, ICustomerSatis
               ys.year,
               COALESCE(
                 ROUND(
-                  COUNT(CASE WHEN ys.satisfaction_code = '6' THEN 1 END) * 100.0 / NULLIF(yt.total_responses, 0), 1
+                  COUNT(CASE WHEN ys.satisfaction_code = 6 THEN 1 END) * 100.0 / NULLIF(yt.total_responses, 0), 1
                 ), 0
               ) as very_satisfied_percentage,
               COALESCE(
                 ROUND(
-                  COUNT(CASE WHEN ys.satisfaction_code = '5' THEN 1 END) * 100.0 / NULLIF(yt.total_responses, 0), 1
+                  COUNT(CASE WHEN ys.satisfaction_code = 5 THEN 1 END) * 100.0 / NULLIF(yt.total_responses, 0), 1
                 ), 0
               ) as satisfied_percentage,
               COALESCE(
                 ROUND(
-                  COUNT(CASE WHEN ys.satisfaction_code = '4' THEN 1 END) * 100.0 / NULLIF(yt.total_responses, 0), 1
+                  COUNT(CASE WHEN ys.satisfaction_code = 4 THEN 1 END) * 100.0 / NULLIF(yt.total_responses, 0), 1
                 ), 0
               ) as somewhat_satisfied_percentage,
               yt.total_responses
@@ -22,24 +22,21 @@ public class NPSService : BaseChartService, INPSService
 
     public async Task<NPSData> GetNPSDataAsync(Guid surveyId, ChartFilters filters)
     {
-        var filterConditions = BuildFilterConditions(filters);
+        var filterConditions = BuildRollupFilterConditions(filters);
         
+        // Pre-aggregated counts maintained by the data processor instead of a response_data scan
         var sql = $@"
-            WITH nps_data AS (
+            WITH distribution AS (
               SELECT 
-                sr.response_data->>'NPS_NPS_GROUP' as nps_group
-              FROM survey_responses sr
+                COALESCE(SUM(CASE WHEN sr.code = '3' THEN sr.response_count END), 0) as promoter_count,
+                COALESCE(SUM(CASE WHEN sr.code = '2' THEN sr.response_count END), 0) as passive_count,
+                COALESCE(SUM(CASE WHEN sr.code = '1' THEN sr.response_count END), 0) as detractor_count,
+                COALESCE(SUM(sr.response_count), 0) as total_count
+              FROM survey_response_rollups sr
               WHERE sr.survey_id = @surveyId
-                AND sr.response_data->>'NPS_NPS_GROUP' IS NOT NULL
+                AND sr.metric = 'NPS_NPS_GROUP'
+                AND sr.code IS NOT NULL
                 AND {filterConditions}
-            ),
-            distribution AS (
-              SELECT 
-                COUNT(CASE WHEN nps_group = '3' THEN 1 END) as promoter_count,
-                COUNT(CASE WHEN nps_group = '2' THEN 1 END) as passive_count,
-                COUNT(CASE WHEN nps_group = '1' THEN 1 END) as detractor_count,
-                COUNT(*) as total_count
-              FROM nps_data
             )
             SELECT 
               promoter_count,
@@ -69,8 +69,8 @@ public class ServiceAttributeService : BaseChartService, IServiceAttributeServic
         var sql = @"
             WITH response_keys AS (
               SELECT DISTINCT 
-                jsonb_object_keys(sr.response_data) as key_name
-              FROM survey_responses sr
+                sr.metric as key_name
+              FROM survey_response_rollups sr
               WHERE sr.survey_id = @surveyId
             )
             SELECT REPLACE(key_name, 'Ab_', '') as attribute_name
@@ -102,36 +102,43 @@ public class ServiceAttributeService : BaseChartService, IServiceAttributeServic
             return new List<AttributeItem>();
         }
 
-        var filterConditions = BuildFilterConditions(filters);
+        var filterConditions = BuildRollupFilterConditions(filters);
         
         // 构建动态查询，只包含目标属性
         var attributeSelections = targetAttributes.Select(attr => 
             $"SELECT '{attr}' as attribute_name, 'Ab_{attr}' as field_name").ToList();
         
+        // Pre-aggregated counts maintained by the data processor instead of a response_data scan;
+        // every filtered response has exactly one Satisfaction rollup entry, so those give the response total
         var sql = $@"
-            WITH attribute_data AS (
+            WITH filtered_rollups AS (
               SELECT 
-                sr.response_data as response_element
-              FROM survey_responses sr
+                sr.metric,
+                sr.code,
+                sr.response_count
+              FROM survey_response_rollups sr
               WHERE sr.survey_id = @surveyId
-                AND sr.response_data->>'Satisfaction' IS NOT NULL
                 AND {filterConditions}
             ),
+            response_total AS (
+              SELECT COALESCE(SUM(response_count), 0) as total_responses
+              FROM filtered_rollups
+              WHERE metric = 'Satisfaction'
+            ),
             target_attributes AS (
               {string.Join(" UNION ALL ", attributeSelections)}
             ),
             attribute_stats AS (
               SELECT 
                 ta.attribute_name,
-                COUNT(ad.response_element) as total_responses,
-                COUNT(CASE WHEN ad.response_element->>ta.field_name = '4' THEN 1 END) as always_count,
-                COUNT(CASE WHEN ad.response_element->>ta.field_name = '3' THEN 1 END) as most_count,
-                COUNT(CASE WHEN ad.response_element->>ta.field_name IS NOT NULL 
-                           AND ad.response_element->>ta.field_name != '' 
-                           AND ad.response_element->>ta.field_name IN ('1', '2', '3', '4') THEN 1 END) as valid_responses
+                rt.total_responses,
+                COALESCE(SUM(CASE WHEN fr.code = '4' THEN fr.response_count END), 0) as always_count,
+                COALESCE(SUM(CASE WHEN fr.code = '3' THEN fr.response_count END), 0) as most_count,
+                COALESCE(SUM(CASE WHEN fr.code IN ('1', '2', '3', '4') THEN fr.response_count END), 0) as valid_responses
               FROM target_attributes ta
-              CROSS JOIN attribute_data ad
-              GROUP BY ta.attribute_name
+              CROSS JOIN response_total rt
+              LEFT JOIN filtered_rollups fr ON fr.metric = ta.field_name
+              GROUP BY ta.attribute_name, rt.total_responses
             )
             SELECT 
               attribute_name,
@@ -1,12 +1,14 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, Response, jsonify, request, current_app
 from datetime import datetime
 import logging
 import traceback
 import os
 
 from ..services.extract_service import DataExtractionService
-from ..services.transform_service import DataTransformService
+from ..services.job_service import PipelineJobService
+from ..services.pipeline_service import PipelineService, create_cancel_token
 from ..config.database import db_manager
+from ..utils.metrics import metrics
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 health_bp = Blueprint('health', __name__)
@@ -30,6 +32,40 @@ def create_response(success, data=None, error=None, status_code=200):
     return jsonify(response_data), status_code
 
 
+def wants_async_job(request_data):
+    if request_data and "async" in request_data:
+        return bool(request_data.get("async"))
+    return current_app.config.get("PIPELINE_JOBS_ASYNC", False)
+
+
+def deadline_params(request_data):
+    """deadline_seconds / survey_deadline_seconds given with a pipeline request"""
+    params = {}
+    for name in ("deadline_seconds", "survey_deadline_seconds"):
+        value = request_data.get(name) if request_data else None
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            raise ValueError(f"{name} must be a positive number of seconds")
+        params[name] = value
+    return params
+
+
+def enqueue_job(job_type, params):
+    job_id = PipelineJobService().submit(job_type, params)
+    return create_response(
+        success=True,
+        data={
+            "job_id": job_id,
+            "job_type": job_type,
+            "status": "queued",
+            "status_url": f"/api/jobs/{job_id}",
+            "result_url": f"/api/jobs/{job_id}/result"
+        },
+        status_code=202
+    )
+
+
 @health_bp.route('/health', methods=['GET'])
 def health_check():
     try:
@@ -55,6 +91,11 @@ def health_check():
         )
 
 
+@health_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
 @api_bp.route('/extract-data', methods=['POST'])
 def extract_data():
     try:
@@ -63,13 +104,17 @@ def extract_data():
         request_data = request.get_json() if request.is_json else {}
         survey_ids = request_data.get('survey_ids') if request_data else None
         organisation_id = request_data.get('organisation_id') if request_data else None
+        try:
+            deadlines = deadline_params(request_data)
+        except ValueError as e:
+            return create_response(success=False, error=str(e), status_code=400)
 
-        extraction_service = DataExtractionService()
+        if wants_async_job(request_data):
+            return enqueue_job("extract", {"survey_ids": survey_ids, "organisation_id": organisation_id,
+                                           **deadlines})
 
-        if survey_ids:
-            result = extraction_service.extract_specific_surveys(survey_ids)
-        else:
-            result = extraction_service.extract_all_surveys(organisation_id)
+        result = PipelineService(cancel_token=create_cancel_token(**deadlines)).extract_data(survey_ids,
+                                                                                            organisation_id)
 
         if result.get("success"):
             logger.info("Extract data API completed successfully")
@@ -107,6 +152,7 @@ def extract_definitions():
         extraction_service = DataExtractionService()
 
         if survey_ids:
+            extraction_service.metadata_cache.load(survey_ids)
             results = {}
             for survey_id in survey_ids:
                 results[survey_id] = extraction_service.extract_survey_definitions(survey_id)
@@ -163,13 +209,17 @@ def transform_and_load():
         survey_ids = request_data.get('survey_ids') if request_data else None
         organisation_id = request_data.get('organisation_id') if request_data else None
         force_mappings_update = request_data.get('force_mappings_update', False) if request_data else False
+        try:
+            deadlines = deadline_params(request_data)
+        except ValueError as e:
+            return create_response(success=False, error=str(e), status_code=400)
 
-        transform_service = DataTransformService()
+        if wants_async_job(request_data):
+            return enqueue_job("transform_and_load", {"survey_ids": survey_ids, "organisation_id": organisation_id,
+                                                      "force_mappings_update": force_mappings_update, **deadlines})
 
-        if survey_ids:
-            result = transform_service.transform_specific_surveys(survey_ids, force_mappings_update)
-        else:
-            result = transform_service.transform_and_load_all(organisation_id, force_mappings_update)
+        result = PipelineService(cancel_token=create_cancel_token(**deadlines)).transform_and_load(
+            survey_ids, organisation_id, force_mappings_update)
 
         if result.get("success"):
             logger.info("Transform and load API completed successfully")
@@ -204,64 +254,115 @@ def full_pipeline():
         survey_ids = request_data.get('survey_ids') if request_data else None
         organisation_id = request_data.get('organisation_id') if request_data else None
         force_mappings_update = request_data.get('force_mappings_update', False) if request_data else False
+        try:
+            deadlines = deadline_params(request_data)
+        except ValueError as e:
+            return create_response(success=False, error=str(e), status_code=400)
 
-        pipeline_result = {
-            "extract_phase": None,
-            "transform_phase": None,
-            "overall_success": False
-        }
+        if wants_async_job(request_data):
+            return enqueue_job("full_pipeline", {"survey_ids": survey_ids, "organisation_id": organisation_id,
+                                                 "force_mappings_update": force_mappings_update, **deadlines})
 
-        # Phase 1
-        logger.info("Starting extract phase...")
-        extraction_service = DataExtractionService()
+        result = PipelineService(cancel_token=create_cancel_token(**deadlines)).full_pipeline(
+            survey_ids, organisation_id, force_mappings_update)
 
-        if survey_ids:
-            extract_result = extraction_service.extract_specific_surveys(survey_ids)
+        if result.get("success"):
+            return create_response(
+                success=True,
+                data=result.get("data")
+            )
         else:
-            extract_result = extraction_service.extract_all_surveys(organisation_id)
-
-        pipeline_result["extract_phase"] = extract_result
-
-        if not extract_result.get("success"):
-            logger.error("Extract phase failed, stopping pipeline")
             return create_response(
                 success=False,
-                data=pipeline_result,
-                error="Extract phase failed"
+                data=result.get("data"),
+                error=result.get("error")
             )
 
-        # Phase 2
-        logger.info("Starting transform and load phase...")
-        transform_service = DataTransformService()
+    except Exception as e:
+        logger.error(f"Full pipeline API exception: {e}")
+        logger.error(traceback.format_exc())
+        return create_response(
+            success=False,
+            error=f"Internal server error: {str(e)}",
+            status_code=500
+        )
+
 
-        if survey_ids:
-            transform_result = transform_service.transform_specific_surveys(survey_ids, force_mappings_update)
-        else:
-            transform_result = transform_service.transform_and_load_all(organisation_id, force_mappings_update)
+@api_bp.route('/jobs', methods=['GET'])
+def list_jobs():
+    try:
+        limit = min(int(request.args.get('limit', 20)), 100)
+        return create_response(
+            success=True,
+            data={"jobs": PipelineJobService().list_jobs(limit)}
+        )
+    except Exception as e:
+        logger.error(f"List jobs API exception: {e}")
+        return create_response(
+            success=False,
+            error=f"Failed to list jobs: {str(e)}",
+            status_code=500
+        )
 
-        pipeline_result["transform_phase"] = transform_result
 
-        if transform_result.get("success"):
-            pipeline_result["overall_success"] = True
-            logger.info("Full pipeline completed successfully")
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    try:
+        job = PipelineJobService().get_job(job_id)
+        if not job:
+            return create_response(success=False, error=f"Job {job_id} not found", status_code=404)
+
+        return create_response(success=True, data=job)
+    except Exception as e:
+        logger.error(f"Get job API exception: {e}")
+        return create_response(
+            success=False,
+            error=f"Failed to get job: {str(e)}",
+            status_code=500
+        )
+
+
+@api_bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    try:
+        job = PipelineJobService().cancel_job(job_id)
+        if not job:
+            return create_response(success=False, error=f"Job {job_id} not found", status_code=404)
+
+        if job["status"] in ("succeeded", "failed"):
+            return create_response(success=False, error=f"Job {job_id} already {job['status']}", status_code=409)
+
+        # A running job stops at its next checkpoint, within JOB_CANCEL_POLL_SECONDS
+        return create_response(success=True, data=job, status_code=202 if job["status"] == "running" else 200)
+    except Exception as e:
+        logger.error(f"Cancel job API exception: {e}")
+        return create_response(
+            success=False,
+            error=f"Failed to cancel job: {str(e)}",
+            status_code=500
+        )
+
+
+@api_bp.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    try:
+        job = PipelineJobService().get_job(job_id, include_result=True)
+        if not job:
+            return create_response(success=False, error=f"Job {job_id} not found", status_code=404)
+
+        if job["status"] in ("queued", "running"):
             return create_response(
                 success=True,
-                data=pipeline_result
-            )
-        else:
-            logger.error("Transform phase failed")
-            return create_response(
-                success=False,
-                data=pipeline_result,
-                error="Transform and load phase failed"
+                data={"job_id": job["id"], "status": job["status"], "progress": job["progress"]},
+                status_code=202
             )
 
+        return create_response(success=True, data=job)
     except Exception as e:
-        logger.error(f"Full pipeline API exception: {e}")
-        logger.error(traceback.format_exc())
+        logger.error(f"Get job result API exception: {e}")
         return create_response(
             success=False,
-            error=f"Internal server error: {str(e)}",
+            error=f"Failed to get job result: {str(e)}",
             status_code=500
         )
 
@@ -315,6 +416,7 @@ def get_status():
                 "recent_extractions": recent_extractions,
                 "data_center": current_app.config.get('QUALTRICS_DATA_CENTER', 'not_configured'),
                 "data_dir": str(current_app.config.get('DATA_DIR', 'not_configured')),
+                "database_pool": db_manager.get_pool_metrics(),
                 "app_version": current_app.config.get('APP_VERSION', '1.0.0')
             }
         )
@@ -1,4 +1,6 @@
 import os
+import threading
+import time
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from psycopg2.pool import ThreadedConnectionPool
@@ -6,6 +8,8 @@ from contextlib import contextmanager
 from dotenv import load_dotenv
 import logging
 
+from ..utils.metrics import metrics
+
 # Load environment variables
 load_dotenv()
 
@@ -17,6 +21,20 @@ class DatabaseManager:
         self.config = config
         self.connection_pool = None
 
+        # Checkout bookkeeping: connections are only validated after sitting idle or after an error
+        self._slots = None
+        self._last_used = {}
+        self._suspect = set()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_seconds_total": 0.0,
+            "validations": 0,
+            "validation_failures": 0,
+            "in_use": 0,
+        }
+
     def initialize_with_config(self, config):
         self.config = config
         self._init_connection_pool()
@@ -45,6 +63,8 @@ class DatabaseManager:
                 maxconn=self.config.DB_POOL_MAX_CONN,
                 **connection_kwargs
             )
+            # ThreadedConnectionPool raises when exhausted; the semaphore makes callers wait instead
+            self._slots = threading.BoundedSemaphore(self.config.DB_POOL_MAX_CONN)
             logger.info("Database connection pool initialized successfully")
 
         except psycopg2.OperationalError as e:
@@ -62,32 +82,125 @@ class DatabaseManager:
         if not self.connection_pool:
             raise Exception("Database connection pool not initialized")
 
-        conn = None
+        conn = self._checkout()
+        failed = False
         try:
-            conn = self.connection_pool.getconn()
-            with conn.cursor() as test_cursor:
-                test_cursor.execute("SELECT 1")
-            yield conn
-        except psycopg2.InterfaceError as e:
-            logger.warning(f"Connection lost, attempting to reconnect: {e}")
-            if conn:
-                try:
-                    self.connection_pool.putconn(conn, close=True)
-                except:
-                    pass
-            conn = self.connection_pool.getconn()
             yield conn
         except Exception as e:
-            if conn:
+            failed = True
+            try:
                 conn.rollback()
+            except Exception:
+                pass
             logger.error(f"Database operation failed: {e}")
             raise
         finally:
-            if conn:
-                try:
-                    self.connection_pool.putconn(conn)
-                except Exception as e:
-                    logger.warning(f"Failed to return connection to pool: {e}")
+            self._checkin(conn, failed)
+
+    def _checkout(self):
+        if not self._slots.acquire(blocking=False):
+            started = time.monotonic()
+            acquired = self._slots.acquire(timeout=self.config.DB_POOL_CHECKOUT_TIMEOUT)
+            waited = time.monotonic() - started
+            self._record_metric("waits", 1)
+            self._record_metric("wait_seconds_total", waited)
+            metrics.observe("db_pool_checkout_wait_seconds", waited)
+            if not acquired:
+                raise Exception(
+                    f"Timed out after {self.config.DB_POOL_CHECKOUT_TIMEOUT}s waiting for a database connection")
+
+        try:
+            conn = self.connection_pool.getconn()
+            # After a database restart every idle connection is dead, so keep replacing them until one passes;
+            # once the idle ones are used up getconn opens a new connection
+            discarded = 0
+            while self._needs_validation(conn) and not self._validate(conn):
+                self._discard(conn)
+                discarded += 1
+                if discarded > self.config.DB_POOL_MAX_CONN:
+                    raise Exception(f"No working database connection after discarding {discarded}")
+                conn = self.connection_pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        self._record_metric("checkouts", 1)
+        self._record_metric("in_use", 1)
+        return conn
+
+    def _checkin(self, conn, failed=False):
+        key = id(conn)
+        try:
+            if conn.closed:
+                self._discard(conn)
+            else:
+                if failed:
+                    self._suspect.add(key)
+                self._last_used[key] = time.monotonic()
+                self.connection_pool.putconn(conn)
+        except Exception as e:
+            logger.warning(f"Failed to return connection to pool: {e}")
+        finally:
+            self._record_metric("in_use", -1)
+            self._slots.release()
+
+    def _needs_validation(self, conn):
+        key = id(conn)
+        if conn.closed or key in self._suspect:
+            return True
+
+        last_used = self._last_used.get(key)
+        if last_used is None:
+            return True
+        return time.monotonic() - last_used > self.config.DB_POOL_VALIDATE_IDLE_SECONDS
+
+    def _validate(self, conn):
+        self._record_metric("validations", 1)
+        try:
+            with conn.cursor() as test_cursor:
+                test_cursor.execute("SELECT 1")
+            conn.rollback()
+            self._suspect.discard(id(conn))
+            return True
+        except Exception as e:
+            # Whatever the error, the caller discards the connection rather than hand it out or leak it
+            logger.warning(f"Connection check failed, discarding it: {e}")
+            self._record_metric("validation_failures", 1)
+            return False
+
+    def _discard(self, conn):
+        key = id(conn)
+        self._suspect.discard(key)
+        self._last_used.pop(key, None)
+        try:
+            self.connection_pool.putconn(conn, close=True)
+        except Exception:
+            pass
+
+    def _record_metric(self, name, amount):
+        with self._metrics_lock:
+            self._metrics[name] += amount
+
+    def get_pool_metrics(self):
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics["max_connections"] = self.config.DB_POOL_MAX_CONN if self.config else 0
+        metrics["wait_seconds_total"] = round(metrics["wait_seconds_total"], 3)
+        return metrics
+
+    def collect_pool_metrics(self):
+        """Pool gauges and counters for GET /metrics"""
+        pool = self.get_pool_metrics()
+        return [
+            ("db_pool_connections_in_use", "gauge", "Database connections checked out", pool["in_use"]),
+            ("db_pool_max_connections", "gauge", "DB_POOL_MAX_CONN", pool["max_connections"]),
+            ("db_pool_checkouts_total", "counter", "Database connection checkouts", pool["checkouts"]),
+            ("db_pool_waits_total", "counter", "Checkouts that had to wait for a free connection", pool["waits"]),
+            ("db_pool_validations_total", "counter", "Idle or suspect connections re-checked with SELECT 1",
+             pool["validations"]),
+            ("db_pool_validation_failures_total", "counter", "Connections discarded after a failed check",
+             pool["validation_failures"]),
+        ]
 
     @contextmanager
     def get_cursor(self, autocommit=False):
@@ -127,4 +240,5 @@ class DatabaseManager:
                 logger.error(f"Error closing database connections: {e}")
 
 
-db_manager = DatabaseManager()
\ No newline at end of file
+db_manager = DatabaseManager()
+metrics.register_collector(db_manager.collect_pool_metrics)
\ No newline at end of file
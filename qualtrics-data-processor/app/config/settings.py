@@ -16,6 +16,8 @@ class Config:
 
     QUALTRICS_API_TOKEN = os.getenv("QUALTRICS_API_TOKEN")
     QUALTRICS_DATA_CENTER = os.getenv("QUALTRICS_DATA_CENTER")
+    # Overrides https://{QUALTRICS_DATA_CENTER}.qualtrics.com/API/v3, e.g. to point at a local fake server
+    QUALTRICS_BASE_URL = os.getenv("QUALTRICS_BASE_URL")
 
     DB_HOST = os.getenv("DB_HOST")
     DB_PORT = int(os.getenv("DB_PORT"))
@@ -25,6 +27,9 @@ class Config:
 
     DB_POOL_MIN_CONN = int(os.getenv("DB_POOL_MIN_CONN", "1"))
     DB_POOL_MAX_CONN = int(os.getenv("DB_POOL_MAX_CONN", "10"))
+    # Pooled connections are only re-checked with SELECT 1 after idling this long or after an error
+    DB_POOL_VALIDATE_IDLE_SECONDS = float(os.getenv("DB_POOL_VALIDATE_IDLE_SECONDS", "30"))
+    DB_POOL_CHECKOUT_TIMEOUT = float(os.getenv("DB_POOL_CHECKOUT_TIMEOUT", "30"))
 
     BASE_DIR = Path(__file__).resolve().parent.parent.parent
     DATA_DIR = BASE_DIR / "data"
@@ -32,8 +37,88 @@ class Config:
     DATA_DIR.mkdir(parents=True, exist_ok=True)
 
     API_TIMEOUT = int(os.getenv("API_TIMEOUT", "30"))
+    API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "10"))
+    # Kept-alive connections to Qualtrics shared by all extraction workers
+    QUALTRICS_HTTP_POOL_SIZE = int(os.getenv("QUALTRICS_HTTP_POOL_SIZE", "10"))
+    # 429/5xx and connection errors are retried with exponential backoff and jitter, honouring Retry-After
+    QUALTRICS_MAX_RETRIES = int(os.getenv("QUALTRICS_MAX_RETRIES", "5"))
+    QUALTRICS_RETRY_BACKOFF_BASE = float(os.getenv("QUALTRICS_RETRY_BACKOFF_BASE", "1.0"))
+    QUALTRICS_RETRY_BACKOFF_MAX = float(os.getenv("QUALTRICS_RETRY_BACKOFF_MAX", "60"))
     EXPORT_POLL_MAX_SECONDS = int(os.getenv("EXPORT_POLL_MAX_SECONDS", "300"))
-    EXPORT_POLL_INTERVAL = float(os.getenv("EXPORT_POLL_INTERVAL", "2.0"))
+    # Status checks are scheduled from percentComplete, bounded by these intervals
+    EXPORT_POLL_MIN_INTERVAL = float(os.getenv("EXPORT_POLL_MIN_INTERVAL", "0.5"))
+    EXPORT_POLL_MAX_INTERVAL = float(os.getenv("EXPORT_POLL_MAX_INTERVAL", "10.0"))
+
+    # Surveys exported concurrently; 1 keeps the sequential behaviour
+    EXTRACT_MAX_WORKERS = int(os.getenv("EXTRACT_MAX_WORKERS", "1"))
+    # threads | async; async runs every survey's start/poll/download on one event loop (needs httpx)
+    EXTRACT_BACKEND = os.getenv("EXTRACT_BACKEND", "threads").lower()
+    # Shared across all workers; 0 disables throttling
+    QUALTRICS_MAX_REQUESTS_PER_SECOND = float(os.getenv("QUALTRICS_MAX_REQUESTS_PER_SECOND", "20"))
+
+    # Export only responses newer than the stored watermark and upsert them by ResponseId. The watermark table
+    # and the response_id column it relies on come from migrations/001_incremental_export.sql, which every
+    # load needs whatever this is set to (python migrate.py applies all migrations)
+    INCREMENTAL_EXPORT = os.getenv("INCREMENTAL_EXPORT", "false").lower() == "true"
+
+    # Stream the export ZIP to disk and load the CSV in chunks instead of holding whole exports in memory
+    STREAMING_PIPELINE = os.getenv("STREAMING_PIPELINE", "false").lower() == "true"
+    STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "5000"))
+    DOWNLOAD_CHUNK_BYTES = int(os.getenv("DOWNLOAD_CHUNK_BYTES", str(1024 * 1024)))
+
+    # Run /api/extract-data, /api/transform-and-load and /api/full-pipeline as background jobs by default
+    # (requires migrations/002_pipeline_jobs.sql); a request can still pass "async" explicitly
+    PIPELINE_JOBS_ASYNC = os.getenv("PIPELINE_JOBS_ASYNC", "false").lower() == "true"
+    JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "2"))
+    JOB_PROGRESS_FLUSH_SECONDS = float(os.getenv("JOB_PROGRESS_FLUSH_SECONDS", "2.0"))
+    # Running jobs look for POST /api/jobs/<id>/cancel this often (requires migrations/007_pipeline_job_cancel.sql)
+    JOB_CANCEL_POLL_SECONDS = float(os.getenv("JOB_CANCEL_POLL_SECONDS", "2.0"))
+    # Each process touches its queued and running jobs this often; jobs not touched for JOB_STALE_SECONDS belong
+    # to a process that has stopped and are marked failed (requires migrations/010_pipeline_job_heartbeat.sql)
+    JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+    JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "120"))
+
+    # Default deadlines, 0 for none; requests can pass deadline_seconds / survey_deadline_seconds instead.
+    # A run past its deadline stops polling and downloading and rolls back the load in progress; a survey past
+    # its deadline (for its extract, and again for its transform and load) fails on its own.
+    PIPELINE_DEADLINE_SECONDS = float(os.getenv("PIPELINE_DEADLINE_SECONDS", "0"))
+    SURVEY_DEADLINE_SECONDS = float(os.getenv("SURVEY_DEADLINE_SECONDS", "0"))
+
+    # phased | pipelined; pipelined full-pipeline runs hand each survey to transform/load as soon as it is
+    # extracted, with at most PIPELINE_QUEUE_SIZE extracted surveys waiting before extraction holds back
+    PIPELINE_MODE = os.getenv("PIPELINE_MODE", "phased").lower()
+    PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+
+    # Transform and load several surveys at once: parsing runs in TRANSFORM_MAX_WORKERS processes and
+    # LOAD_MAX_WORKERS threads each load one survey in its own transaction, so keep it below DB_POOL_MAX_CONN
+    TRANSFORM_MAX_WORKERS = int(os.getenv("TRANSFORM_MAX_WORKERS", "1"))
+    LOAD_MAX_WORKERS = int(os.getenv("LOAD_MAX_WORKERS", "1"))
+
+    # python scheduler.py (requires migrations/006_refresh_scheduler.sql); every SCHEDULER_TICK_SECONDS the
+    # most overdue surveys, busiest first, are refreshed in one full pipeline run of at most
+    # SCHEDULER_MAX_SURVEYS_PER_RUN surveys. refresh_schedules rows override the default interval per
+    # organisation or survey. Surveys whose Qualtrics response count has not moved are not re-exported until
+    # SCHEDULER_FORCE_REFRESH_HOURS have passed, since edited responses do not change the count.
+    SCHEDULER_TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", "60"))
+    SCHEDULER_DEFAULT_INTERVAL_MINUTES = int(os.getenv("SCHEDULER_DEFAULT_INTERVAL_MINUTES", "360"))
+    SCHEDULER_MAX_SURVEYS_PER_RUN = int(os.getenv("SCHEDULER_MAX_SURVEYS_PER_RUN", "20"))
+    SCHEDULER_VELOCITY_DAYS = int(os.getenv("SCHEDULER_VELOCITY_DAYS", "7"))
+    SCHEDULER_FORCE_REFRESH_HOURS = float(os.getenv("SCHEDULER_FORCE_REFRESH_HOURS", "24"))
+
+    # csv | parquet | arrow; columnar extracts let the transform read only the kept columns
+    # (they need pyarrow from requirements-columnar.txt)
+    EXTRACT_STORAGE_FORMAT = os.getenv("EXTRACT_STORAGE_FORMAT", "csv").lower()
+
+    # c | pyarrow; the parser used for CSV extracts in the transform stage (pyarrow needs requirements-columnar.txt)
+    CSV_READ_ENGINE = os.getenv("CSV_READ_ENGINE", "c").lower()
+
+    # copy | values | row
+    RESPONSES_LOAD_METHOD = os.getenv("RESPONSES_LOAD_METHOD", "copy")
+    RESPONSES_LOAD_PAGE_SIZE = int(os.getenv("RESPONSES_LOAD_PAGE_SIZE", "1000"))
+    # diff | merge | delete; diff only writes responses whose content hash changed, merge stages every response
+    # and applies the difference by ResponseId. Every strategy writes the response_id, typed and content_hash
+    # columns, so all of them need migrations 001, 005 and 008 (python migrate.py)
+    RESPONSES_REPLACE_STRATEGY = os.getenv("RESPONSES_REPLACE_STRATEGY", "diff").lower()
 
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -86,6 +171,105 @@ class Config:
         except (ValueError, TypeError) as e:
             raise ValueError(f"Invalid connection pool configuration: {e}")
 
+        if cls.QUALTRICS_HTTP_POOL_SIZE < 1:
+            raise ValueError(f"QUALTRICS_HTTP_POOL_SIZE must be at least 1, got {cls.QUALTRICS_HTTP_POOL_SIZE}")
+
+        if cls.QUALTRICS_MAX_RETRIES < 0:
+            raise ValueError(f"QUALTRICS_MAX_RETRIES must be at least 0, got {cls.QUALTRICS_MAX_RETRIES}")
+
+        if not (0 < cls.EXPORT_POLL_MIN_INTERVAL <= cls.EXPORT_POLL_MAX_INTERVAL):
+            raise ValueError(f"EXPORT_POLL_MIN_INTERVAL ({cls.EXPORT_POLL_MIN_INTERVAL}) must be positive and "
+                             f"<= EXPORT_POLL_MAX_INTERVAL ({cls.EXPORT_POLL_MAX_INTERVAL})")
+
+        if cls.EXTRACT_MAX_WORKERS < 1:
+            raise ValueError(f"EXTRACT_MAX_WORKERS must be at least 1, got {cls.EXTRACT_MAX_WORKERS}")
+
+        if cls.EXTRACT_BACKEND not in {"threads", "async"}:
+            raise ValueError(f"Invalid EXTRACT_BACKEND: {cls.EXTRACT_BACKEND}. Must be one of threads, async")
+        if cls.EXTRACT_BACKEND == "async":
+            try:
+                import httpx  # noqa: F401
+            except ImportError:
+                raise ValueError("EXTRACT_BACKEND=async requires httpx")
+
+        if cls.STREAM_CHUNK_ROWS < 1:
+            raise ValueError(f"STREAM_CHUNK_ROWS must be at least 1, got {cls.STREAM_CHUNK_ROWS}")
+
+        if cls.JOB_MAX_WORKERS < 1:
+            raise ValueError(f"JOB_MAX_WORKERS must be at least 1, got {cls.JOB_MAX_WORKERS}")
+
+        if cls.JOB_CANCEL_POLL_SECONDS <= 0:
+            raise ValueError(f"JOB_CANCEL_POLL_SECONDS must be positive, got {cls.JOB_CANCEL_POLL_SECONDS}")
+
+        if cls.JOB_HEARTBEAT_SECONDS <= 0:
+            raise ValueError(f"JOB_HEARTBEAT_SECONDS must be positive, got {cls.JOB_HEARTBEAT_SECONDS}")
+        if cls.JOB_STALE_SECONDS <= 2 * cls.JOB_HEARTBEAT_SECONDS:
+            raise ValueError(f"JOB_STALE_SECONDS ({cls.JOB_STALE_SECONDS}) must be more than twice "
+                             f"JOB_HEARTBEAT_SECONDS ({cls.JOB_HEARTBEAT_SECONDS})")
+
+        if cls.PIPELINE_DEADLINE_SECONDS < 0 or cls.SURVEY_DEADLINE_SECONDS < 0:
+            raise ValueError(f"PIPELINE_DEADLINE_SECONDS ({cls.PIPELINE_DEADLINE_SECONDS}) and "
+                             f"SURVEY_DEADLINE_SECONDS ({cls.SURVEY_DEADLINE_SECONDS}) must be 0 or positive")
+
+        if cls.PIPELINE_MODE not in {"phased", "pipelined"}:
+            raise ValueError(f"Invalid PIPELINE_MODE: {cls.PIPELINE_MODE}. Must be one of phased, pipelined")
+
+        if cls.PIPELINE_QUEUE_SIZE < 1:
+            raise ValueError(f"PIPELINE_QUEUE_SIZE must be at least 1, got {cls.PIPELINE_QUEUE_SIZE}")
+
+        if cls.TRANSFORM_MAX_WORKERS < 1:
+            raise ValueError(f"TRANSFORM_MAX_WORKERS must be at least 1, got {cls.TRANSFORM_MAX_WORKERS}")
+
+        if cls.LOAD_MAX_WORKERS < 1:
+            raise ValueError(f"LOAD_MAX_WORKERS must be at least 1, got {cls.LOAD_MAX_WORKERS}")
+        # Leave a connection for the API, job progress and the watermark/log writes of other stages
+        if cls.LOAD_MAX_WORKERS > 1 and cls.LOAD_MAX_WORKERS >= int(cls.DB_POOL_MAX_CONN):
+            raise ValueError(f"LOAD_MAX_WORKERS ({cls.LOAD_MAX_WORKERS}) must be < DB_POOL_MAX_CONN "
+                             f"({cls.DB_POOL_MAX_CONN})")
+
+        if cls.SCHEDULER_TICK_SECONDS <= 0:
+            raise ValueError(f"SCHEDULER_TICK_SECONDS must be positive, got {cls.SCHEDULER_TICK_SECONDS}")
+
+        if cls.SCHEDULER_DEFAULT_INTERVAL_MINUTES < 1:
+            raise ValueError(f"SCHEDULER_DEFAULT_INTERVAL_MINUTES must be at least 1, "
+                             f"got {cls.SCHEDULER_DEFAULT_INTERVAL_MINUTES}")
+
+        if cls.SCHEDULER_MAX_SURVEYS_PER_RUN < 1:
+            raise ValueError(f"SCHEDULER_MAX_SURVEYS_PER_RUN must be at least 1, "
+                             f"got {cls.SCHEDULER_MAX_SURVEYS_PER_RUN}")
+
+        if cls.SCHEDULER_VELOCITY_DAYS < 1:
+            raise ValueError(f"SCHEDULER_VELOCITY_DAYS must be at least 1, got {cls.SCHEDULER_VELOCITY_DAYS}")
+
+        if cls.EXTRACT_STORAGE_FORMAT not in {"csv", "parquet", "arrow"}:
+            raise ValueError(
+                f"Invalid EXTRACT_STORAGE_FORMAT: {cls.EXTRACT_STORAGE_FORMAT}. Must be one of csv, parquet, arrow")
+        if cls.EXTRACT_STORAGE_FORMAT != "csv":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ValueError(f"EXTRACT_STORAGE_FORMAT={cls.EXTRACT_STORAGE_FORMAT} requires pyarrow "
+                                 f"(pip install -r requirements-columnar.txt)")
+
+        if cls.CSV_READ_ENGINE not in {"c", "pyarrow"}:
+            raise ValueError(f"Invalid CSV_READ_ENGINE: {cls.CSV_READ_ENGINE}. Must be one of c, pyarrow")
+        if cls.CSV_READ_ENGINE == "pyarrow":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ValueError("CSV_READ_ENGINE=pyarrow requires pyarrow (pip install -r requirements-columnar.txt)")
+
+        if cls.RESPONSES_LOAD_METHOD not in {"copy", "values", "row"}:
+            raise ValueError(
+                f"Invalid RESPONSES_LOAD_METHOD: {cls.RESPONSES_LOAD_METHOD}. Must be one of copy, values, row")
+
+        if cls.RESPONSES_LOAD_PAGE_SIZE < 1:
+            raise ValueError(f"RESPONSES_LOAD_PAGE_SIZE must be at least 1, got {cls.RESPONSES_LOAD_PAGE_SIZE}")
+
+        if cls.RESPONSES_REPLACE_STRATEGY not in {"diff", "merge", "delete"}:
+            raise ValueError(f"Invalid RESPONSES_REPLACE_STRATEGY: {cls.RESPONSES_REPLACE_STRATEGY}. "
+                             f"Must be one of diff, merge, delete")
+
         return True
 
     @classmethod
@@ -101,6 +285,22 @@ class Config:
         print(f"Data Directory: {cls.DATA_DIR}")
         print(f"Log Level: {cls.LOG_LEVEL}")
         print(f"Connection Pool: {cls.DB_POOL_MIN_CONN}-{cls.DB_POOL_MAX_CONN}")
+        print(f"Extract Workers: {cls.EXTRACT_MAX_WORKERS} {cls.EXTRACT_BACKEND} "
+              f"(max {cls.QUALTRICS_MAX_REQUESTS_PER_SECOND} req/s)")
+        print(f"Qualtrics HTTP: pool {cls.QUALTRICS_HTTP_POOL_SIZE}, {cls.QUALTRICS_MAX_RETRIES} retries, "
+              f"timeouts {cls.API_CONNECT_TIMEOUT}s connect / {cls.API_TIMEOUT}s read")
+        print(f"Incremental Export: {cls.INCREMENTAL_EXPORT}")
+        print(f"Streaming Pipeline: {cls.STREAMING_PIPELINE} ({cls.STREAM_CHUNK_ROWS} rows per chunk)")
+        print(f"Pipeline Jobs Async: {cls.PIPELINE_JOBS_ASYNC} ({cls.JOB_MAX_WORKERS} workers)")
+        print(f"Pipeline Mode: {cls.PIPELINE_MODE} (queue {cls.PIPELINE_QUEUE_SIZE})")
+        print(f"Deadlines: run {cls.PIPELINE_DEADLINE_SECONDS or 'none'}, survey {cls.SURVEY_DEADLINE_SECONDS or 'none'}")
+        print(f"Transform/Load Workers: {cls.TRANSFORM_MAX_WORKERS} processes / {cls.LOAD_MAX_WORKERS} threads")
+        print(f"Scheduler: every {cls.SCHEDULER_TICK_SECONDS}s, default interval "
+              f"{cls.SCHEDULER_DEFAULT_INTERVAL_MINUTES} min, max {cls.SCHEDULER_MAX_SURVEYS_PER_RUN} surveys per run")
+        print(f"Extract Storage Format: {cls.EXTRACT_STORAGE_FORMAT}")
+        print(f"CSV Read Engine: {cls.CSV_READ_ENGINE}")
+        print(f"Responses Load Method: {cls.RESPONSES_LOAD_METHOD} (page size {cls.RESPONSES_LOAD_PAGE_SIZE})")
+        print(f"Responses Replace Strategy: {cls.RESPONSES_REPLACE_STRATEGY}")
         print("===========================")
 
 
@@ -6,6 +6,7 @@ from flask import Flask
 from .config.settings import get_config
 from .config.database import db_manager
 from .api.routes import api_bp, health_bp
+from .services.job_service import PipelineJobService
 
 
 def setup_logging(config):
@@ -45,6 +46,14 @@ def create_app():
             else:
                 app.logger.error("Database connection test failed")
 
+            # Jobs a stopped process left queued or running would otherwise stay that way forever
+            try:
+                stale_jobs = PipelineJobService().fail_stale_jobs()
+                if stale_jobs:
+                    app.logger.warning(f"Marked {stale_jobs} interrupted pipeline jobs as failed")
+            except Exception as e:
+                app.logger.error(f"Failed to check for interrupted pipeline jobs: {e}")
+
         except Exception as e:
             app.logger.error(f"Failed to initialize database: {e}")
             app.logger.error("Please check your database configuration and ensure the database server is running")
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import time
+
+from .qualtrics_api import RETRY_STATUS_CODES
+from ..utils.metrics import metrics, rounded_timings, stage_timings, timed
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncExtractionBackend:
+    """EXTRACT_BACKEND=async: runs every survey's export start/poll/download on one event loop.
+
+    Up to EXTRACT_MAX_WORKERS surveys are in flight at once over a single pooled httpx client, sharing the
+    Qualtrics rate limiter and retry policy of the threaded backend. ZIPs are streamed to disk; watermark
+    reads and the hash/save/log step run in worker threads through the owning DataExtractionService.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self.config = service.config
+        self.api_client = service.api_client
+        self.cancel_token = service.cancel_token
+
+    def extract(self, survey_ids, on_extracted=None):
+        """Same result as DataExtractionService._extract_responses_for_surveys"""
+        logger.info(f"Extracting {len(survey_ids)} surveys on one event loop, "
+                    f"{self.config.EXTRACT_MAX_WORKERS} at a time")
+        return asyncio.run(self._extract_all(survey_ids, on_extracted))
+
+    async def _extract_all(self, survey_ids, on_extracted):
+        import httpx
+
+        limits = httpx.Limits(max_connections=self.config.QUALTRICS_HTTP_POOL_SIZE,
+                              max_keepalive_connections=self.config.QUALTRICS_HTTP_POOL_SIZE)
+        timeout = httpx.Timeout(self.config.API_TIMEOUT, connect=self.config.API_CONNECT_TIMEOUT)
+        semaphore = asyncio.Semaphore(self.config.EXTRACT_MAX_WORKERS)
+
+        async with httpx.AsyncClient(headers=self.api_client.headers, limits=limits, timeout=timeout) as client:
+            results = await asyncio.gather(
+                *(self._extract_survey(client, semaphore, survey_id, on_extracted) for survey_id in survey_ids))
+
+        return dict(zip(survey_ids, results))
+
+    async def _extract_survey(self, client, semaphore, survey_id, on_extracted):
+        async with semaphore:
+            with stage_timings() as timings, self.cancel_token.survey_scope():
+                with timed("extract"):
+                    result = await self._extract_survey_responses(client, survey_id)
+            result["timings"] = rounded_timings(timings)
+            if on_extracted:
+                # Off the loop, since it may block until the next stage has room
+                await asyncio.to_thread(on_extracted, survey_id, result)
+            return result
+
+    async def _extract_survey_responses(self, client, survey_id):
+        try:
+            self.cancel_token.check()
+            logger.info(f"[{survey_id}] Starting survey responses extraction...")
+            self.service._report_progress(survey_id, "exporting", percent_complete=0)
+
+            file_name, file_path, export_options, export_mode = await asyncio.to_thread(
+                self.service._prepare_export, survey_id)
+
+            zip_path = file_path.with_suffix(".zip.part")
+            try:
+                continuation_token = await self._export_to_path(client, survey_id, zip_path, export_options)
+                self.cancel_token.check()
+                with timed("save_export"):
+                    return await asyncio.to_thread(self.service._save_export, survey_id, file_name, file_path,
+                                                   zip_path, continuation_token, export_mode)
+            finally:
+                zip_path.unlink(missing_ok=True)
+
+        except Exception as e:
+            return self.service._extraction_failed(survey_id, e)
+
+    async def _export_to_path(self, client, survey_id, download_path, export_options):
+        """Start, poll and download one export into download_path; returns the continuation token"""
+        logger.info(f"[{survey_id}] Starting full export process...")
+
+        with timed("start_export"):
+            progress_id = await self._start_export(client, survey_id, export_options)
+        logger.info(f"[{survey_id}] Export started, progress_id: {progress_id}")
+
+        logger.info(f"[{survey_id}] Waiting for export completion...")
+        with timed("wait_for_export"):
+            result = await self._wait_for_export_completion(client, survey_id, progress_id)
+        file_id = result["fileId"]
+        logger.info(f"[{survey_id}] Export completed, file_id: {file_id}")
+
+        logger.info(f"[{survey_id}] Downloading file...")
+        self.service._report_progress(survey_id, "downloading", percent_complete=100)
+        with timed("download"):
+            await self._download_export_file_to_path(client, survey_id, file_id, download_path)
+        logger.info(f"[{survey_id}] File downloaded successfully")
+
+        return result.get("continuationToken")
+
+    async def _start_export(self, client, survey_id, export_options):
+        url = f"{self.api_client.base_url}/surveys/{survey_id}/export-responses/"
+        response = await self._request(client, "POST", url, json=self.api_client.export_payload(**export_options))
+
+        # An expired or unknown continuation token: fall back to the EndDate watermark
+        if response.status_code == 400 and export_options.get("continuation_token"):
+            watermark = await asyncio.to_thread(self.service.watermark_service.get_watermark, survey_id) or {}
+            fallback_options = self.service.watermark_service.build_export_options(
+                {"last_end_date": watermark.get("last_end_date")})
+            fallback_options["allow_continuation"] = True
+            logger.warning(f"[{survey_id}] Continuation token rejected, retrying with {fallback_options}")
+            response = await self._request(client, "POST", url,
+                                           json=self.api_client.export_payload(**fallback_options))
+
+        response.raise_for_status()
+        return response.json()["result"]["progressId"]
+
+    async def _wait_for_export_completion(self, client, survey_id, progress_id):
+        """Poll on the same percentComplete-driven schedule as the threaded backend"""
+        url = f"{self.api_client.base_url}/surveys/{survey_id}/export-responses/{progress_id}"
+        started = time.monotonic()
+        deadline = started + self.config.EXPORT_POLL_MAX_SECONDS
+        poll_count = 0
+        while True:
+            response = await self._request(client, "GET", url)
+            response.raise_for_status()
+            metrics.inc("export_status_checks_total")
+            result = response.json()["result"]
+            poll_count += 1
+            percent_complete = result.get("percentComplete", 0)
+            self.service._report_progress(survey_id, "exporting", percent_complete=percent_complete)
+
+            if result["status"] == "complete":
+                logger.info(f"[{survey_id}] Export complete after {poll_count} status checks "
+                            f"in {time.monotonic() - started:.1f}s")
+                return result
+            elif result["status"] in {"failed", "error"}:
+                raise Exception(f"Export failed: {result}")
+
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            delay = self.service._next_poll_delay(now - started, percent_complete, poll_count)
+            await self.cancel_token.wait_async(min(delay, deadline - now))
+
+        raise TimeoutError(f"Export timed out after {self.config.EXPORT_POLL_MAX_SECONDS} seconds")
+
+    async def _download_export_file_to_path(self, client, survey_id, file_id, download_path):
+        url = f"{self.api_client.base_url}/surveys/{survey_id}/export-responses/{file_id}/file"
+        response = await self._request(client, "GET", url, stream=True)
+        try:
+            response.raise_for_status()
+            with open(download_path, "wb") as f:
+                async for chunk in response.aiter_bytes(self.config.DOWNLOAD_CHUNK_BYTES):
+                    self.cancel_token.check()
+                    f.write(chunk)
+                    metrics.inc("export_download_bytes_total", len(chunk))
+        finally:
+            await response.aclose()
+        return download_path
+
+    async def _request(self, client, method, url, stream=False, **kwargs):
+        """QualtricsAPI.request for the async client: same rate limiter, retryable statuses and backoff.
+
+        With stream=True the body is left unread and the caller must aclose() the response.
+        """
+        import httpx
+
+        max_retries = self.config.QUALTRICS_MAX_RETRIES
+        for attempt in range(max_retries + 1):
+            await self.api_client.rate_limiter.acquire_async()
+            try:
+                response = await client.send(client.build_request(method, url, **kwargs), stream=stream)
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                if attempt == max_retries:
+                    raise
+                delay = self.api_client._backoff_delay(attempt)
+                reason = str(e) or type(e).__name__
+            else:
+                metrics.inc("qualtrics_requests_total", method=method, status=str(response.status_code))
+                if response.status_code not in RETRY_STATUS_CODES or attempt == max_retries:
+                    return response
+                delay = self.api_client._retry_after_delay(response)
+                if delay is None:
+                    delay = self.api_client._backoff_delay(attempt)
+                reason = f"HTTP {response.status_code}"
+                await response.aclose()
+
+            metrics.inc("qualtrics_retries_total", reason=reason if reason.startswith("HTTP") else "connection")
+            logger.warning(f"{method} {url} failed ({reason}), retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+            await self.cancel_token.wait_async(delay)
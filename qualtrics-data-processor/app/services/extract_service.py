@@ -1,62 +1,148 @@
 import zipfile
 import io
+import csv
+import shutil
 import pandas as pd
 import logging
 import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from pathlib import Path
 
 from .qualtrics_api import QualtricsAPI
+from .survey_metadata_cache import SurveyMetadataCache
+from .watermark_service import ExtractionWatermarkService
 from ..config.database import db_manager
 from ..config.settings import get_config
-from ..utils.file_utils import calculate_file_hash, generate_filename
+from ..utils.cancellation import CancellationToken
+from ..utils.columnar_utils import COLUMNAR_FORMATS, QUALTRICS_HEADER_ROWS, convert_csv_to_columnar
+from ..utils.file_utils import calculate_file_hash, calculate_stream_hash, generate_filename
+from ..utils.metrics import metrics, rounded_timings, stage_timings, timed
 
 logger = logging.getLogger(__name__)
 
 
 class DataExtractionService:
-    def __init__(self):
+    def __init__(self, progress_callback=None, metadata_cache=None, cancel_token=None):
         self.config = get_config()
         self.api_client = QualtricsAPI()
+        self.watermark_service = ExtractionWatermarkService()
+        self.metadata_cache = metadata_cache or SurveyMetadataCache()
+        # progress_callback(survey_id, stage, **details), used by background jobs to report per-survey progress
+        self.progress_callback = progress_callback
+        # Checked between polls, download chunks and steps; stops the run on cancel or deadline
+        self.cancel_token = cancel_token or CancellationToken()
 
     def extract_survey_responses(self, survey_id: str):
-        """Single Response"""
-        file_name = generate_filename(survey_id)
-        file_path = self.config.DATA_DIR / file_name
-
+        """Single Response, with its per-stage timings"""
+        with stage_timings() as timings, self.cancel_token.survey_scope():
+            with timed("extract"):
+                result = self._extract_survey_responses(survey_id)
+        result["timings"] = rounded_timings(timings)
+        return result
+
+    def _extract_survey_responses(self, survey_id: str):
         try:
+            self.cancel_token.check()
             logger.info(f"[{survey_id}] Starting survey responses extraction...")
+            self._report_progress(survey_id, "exporting", percent_complete=0)
+
+            file_name, file_path, export_options, export_mode = self._prepare_export(survey_id)
+
+            zip_path = file_path.with_suffix(".zip.part") if self.config.STREAMING_PIPELINE else None
+            try:
+                if zip_path:
+                    _, continuation_token = self._execute_full_export(survey_id, download_path=zip_path,
+                                                                      **export_options)
+                    zip_source = zip_path
+                else:
+                    file_content, continuation_token = self._execute_full_export(survey_id, **export_options)
+                    zip_source = io.BytesIO(file_content)
+
+                self.cancel_token.check()
+                with timed("save_export"):
+                    return self._save_export(survey_id, file_name, file_path, zip_source, continuation_token,
+                                             export_mode)
+            finally:
+                if zip_path:
+                    zip_path.unlink(missing_ok=True)
 
-            file_content = self._execute_full_export(survey_id)
+        except Exception as e:
+            return self._extraction_failed(survey_id, e)
+
+    def _prepare_export(self, survey_id: str):
+        """(file_name, file_path, export_options, export_mode) for the next export of survey_id"""
+        file_name = generate_filename(survey_id, file_type=self.config.EXTRACT_STORAGE_FORMAT)
+        file_path = self.config.DATA_DIR / file_name
 
+        export_options = {}
+        export_mode = "full"
+        if self.config.INCREMENTAL_EXPORT:
+            watermark = self.watermark_service.get_watermark(survey_id)
+            export_options = self.watermark_service.build_export_options(watermark)
+            if export_options:
+                export_mode = "incremental"
+            export_options["allow_continuation"] = True
+
+        return file_name, file_path, export_options, export_mode
+
+    def _save_export(self, survey_id, file_name, file_path, zip_source, continuation_token, export_mode):
+        """Hash, store and log a downloaded export ZIP (a path or a file-like object)"""
+        # Hash the CSV bytes before anything is parsed or written
+        content_hash = self._hash_export_csv(zip_source)
+        logger.info(f"[{survey_id}] Export content hash: {content_hash}")
+
+        # Deltas are small and carry a new continuation token, so only full exports short-circuit
+        if export_mode == "full":
+            previous = self._get_latest_extraction_log(survey_id)
+            if previous and previous["file_hash"] == content_hash:
+                return self._skip_unchanged_extraction(survey_id, previous, export_mode)
+
+        if self.config.EXTRACT_STORAGE_FORMAT in COLUMNAR_FORMATS:
+            records_count = self._convert_export_to_columnar(zip_source, file_path)
+        elif isinstance(zip_source, Path):
+            records_count = self._unzip_export_to_csv(zip_source, file_path)
+        else:
             # Save as CSV
-            with zipfile.ZipFile(io.BytesIO(file_content)) as zip_file:
+            with zipfile.ZipFile(zip_source) as zip_file:
                 csv_filename = zip_file.namelist()[0]
                 with zip_file.open(csv_filename) as f:
                     df = pd.read_csv(f)
 
             # Save to data directory
             df.to_csv(file_path, index=False)
-            logger.info(f"[{survey_id}] Survey responses data saved to {file_path}")
+            records_count = len(df)
 
-            # Success logging
-            self._log_responses_extraction_result(survey_id, file_name, file_path, success=True)
+        logger.info(f"[{survey_id}] Survey responses data saved to {file_path}")
+        metrics.inc("rows_extracted_total", records_count)
 
-            return {
-                "success": True,
-                "file_path": str(file_path),
-                "file_name": file_name,
-                "records_count": len(df)
-            }
+        # Success logging
+        self._log_responses_extraction_result(survey_id, file_name, file_path, success=True,
+                                              file_hash=content_hash)
 
-        except Exception as e:
-            error_msg = f"Failed to extract survey responses: {str(e)}"
-            logger.error(f"[{survey_id}] {error_msg}")
+        if self.config.INCREMENTAL_EXPORT:
+            self.watermark_service.set_pending(survey_id, file_name, continuation_token, export_mode)
 
-            return {
-                "success": False,
-                "error": error_msg
-            }
+        self._report_progress(survey_id, "extracted", records_count=records_count)
+
+        return {
+            "success": True,
+            "file_path": str(file_path),
+            "file_name": file_name,
+            "records_count": records_count,
+            "export_mode": export_mode
+        }
+
+    def _extraction_failed(self, survey_id, error):
+        error_msg = f"Failed to extract survey responses: {str(error)}"
+        logger.error(f"[{survey_id}] {error_msg}")
+        self._report_progress(survey_id, "failed", error=error_msg)
+
+        return {
+            "success": False,
+            "error": error_msg
+        }
 
     def extract_survey_definitions(self, survey_id: str):
         """Single survey definitions and mappings, only when field_mapping is null """
@@ -106,12 +192,10 @@ class DataExtractionService:
             if not survey_ids:
                 return {"success": False, "error": "No surveys found in database"}
 
-            results = {}
             logger.info(
                 f"Starting responses extraction for {len(survey_ids)} surveys from database: {', '.join(survey_ids)}")
 
-            for survey_id in survey_ids:
-                results[survey_id] = self.extract_survey_responses(survey_id)
+            results = self._extract_responses_for_surveys(survey_ids)
 
             successful = sum(1 for result in results.values() if result["success"])
             total = len(survey_ids)
@@ -173,16 +257,14 @@ class DataExtractionService:
             logger.error(f"Failed to extract survey definitions from database: {e}")
             return {"success": False, "error": str(e)}
 
-    def extract_specific_surveys(self, survey_ids):
-        """Get responses for specific surveys"""
+    def extract_specific_surveys(self, survey_ids, on_extracted=None):
+        """Get responses for specific surveys; on_extracted(survey_id, result) is called as each one finishes"""
         if not survey_ids:
             return {"success": False, "error": "No survey IDs provided"}
 
-        results = {}
         logger.info(f"Starting responses extraction for {len(survey_ids)} specified surveys: {', '.join(survey_ids)}")
 
-        for survey_id in survey_ids:
-            results[survey_id] = self.extract_survey_responses(survey_id)
+        results = self._extract_responses_for_surveys(survey_ids, on_extracted)
 
         successful = sum(1 for result in results.values() if result["success"])
         total = len(survey_ids)
@@ -200,57 +282,137 @@ class DataExtractionService:
             }
         }
 
-    def _execute_full_export(self, survey_id: str):
-        """Full export process"""
+    def _extract_responses_for_surveys(self, survey_ids, on_extracted=None):
+        """Run extract_survey_responses for each survey, EXTRACT_MAX_WORKERS at a time, keeping survey_ids order"""
+        if self.config.EXTRACT_BACKEND == "async":
+            from .async_extract_backend import AsyncExtractionBackend
+            return AsyncExtractionBackend(self).extract(survey_ids, on_extracted)
+
+        max_workers = min(self.config.EXTRACT_MAX_WORKERS, len(survey_ids))
+        if max_workers <= 1:
+            return {survey_id: self._extract_and_notify(survey_id, on_extracted) for survey_id in survey_ids}
+
+        logger.info(f"Extracting {len(survey_ids)} surveys with {max_workers} concurrent workers")
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="extract") as executor:
+            futures = {survey_id: executor.submit(self._extract_and_notify, survey_id, on_extracted)
+                       for survey_id in survey_ids}
+
+        return {survey_id: future.result() for survey_id, future in futures.items()}
+
+    def _extract_and_notify(self, survey_id, on_extracted=None):
+        result = self.extract_survey_responses(survey_id)
+        if on_extracted:
+            # May block when the next stage is behind, which holds this worker back
+            on_extracted(survey_id, result)
+        return result
+
+    def _execute_full_export(self, survey_id: str, download_path=None, **export_options):
+        """Full export process, returns (file_content, continuation_token).
+
+        With download_path the ZIP is streamed to that file instead and file_content is None.
+        """
         try:
             logger.info(f"[{survey_id}] Starting full export process...")
 
             # Step 1: Launch progress
-            progress_id = self.api_client.start_export(survey_id)
+            with timed("start_export"):
+                progress_id = self._start_export(survey_id, export_options)
             logger.info(f"[{survey_id}] Export started, progress_id: {progress_id}")
 
             # Step 2: Wait for export completion
             logger.info(f"[{survey_id}] Waiting for export completion...")
-            file_id = self._wait_for_export_completion(survey_id, progress_id)
+            with timed("wait_for_export"):
+                result = self._wait_for_export_completion(survey_id, progress_id)
+            file_id = result["fileId"]
             logger.info(f"[{survey_id}] Export completed, file_id: {file_id}")
 
             # Step 3: Download files
             logger.info(f"[{survey_id}] Downloading file...")
-            file_content = self._download_export_file(survey_id, file_id)
+            self._report_progress(survey_id, "downloading", percent_complete=100)
+            with timed("download"):
+                if download_path:
+                    file_content = None
+                    self._download_export_file_to_path(survey_id, file_id, download_path)
+                else:
+                    file_content = self._download_export_file(survey_id, file_id)
             logger.info(f"[{survey_id}] File downloaded successfully")
 
-            return file_content
+            return file_content, result.get("continuationToken")
 
         except Exception as e:
             logger.error(f"[{survey_id}] Full export process failed: {e}")
             raise
 
+    def _start_export(self, survey_id: str, export_options):
+        try:
+            return self.api_client.start_export(survey_id, **export_options)
+        except requests.exceptions.HTTPError as e:
+            # An expired or unknown continuation token: fall back to the EndDate watermark
+            if not export_options.get("continuation_token") or e.response is None or e.response.status_code != 400:
+                raise
+
+            watermark = self.watermark_service.get_watermark(survey_id) or {}
+            fallback_options = self.watermark_service.build_export_options(
+                {"last_end_date": watermark.get("last_end_date")})
+            fallback_options["allow_continuation"] = True
+            logger.warning(f"[{survey_id}] Continuation token rejected, retrying with {fallback_options}")
+            return self.api_client.start_export(survey_id, **fallback_options)
+
     def _wait_for_export_completion(self, survey_id: str, progress_id: str):
-        waited = 0
-        while waited < self.config.EXPORT_POLL_MAX_SECONDS:
+        """Poll until the export completes and return the final status result"""
+        started = time.monotonic()
+        deadline = started + self.config.EXPORT_POLL_MAX_SECONDS
+        poll_count = 0
+        while True:
             try:
                 result = self._check_export_status(survey_id, progress_id)
+                poll_count += 1
+                percent_complete = result.get("percentComplete", 0)
+                self._report_progress(survey_id, "exporting", percent_complete=percent_complete)
 
                 if result["status"] == "complete":
-                    return result["fileId"]
+                    logger.info(f"[{survey_id}] Export complete after {poll_count} status checks "
+                                f"in {time.monotonic() - started:.1f}s")
+                    return result
                 elif result["status"] in {"failed", "error"}:
                     raise Exception(f"Export failed: {result}")
 
-                time.sleep(self.config.EXPORT_POLL_INTERVAL)
-                waited += self.config.EXPORT_POLL_INTERVAL
-
             except Exception as e:
                 logger.error(f"Error while waiting for export completion: {e}")
                 raise
 
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            delay = self._next_poll_delay(now - started, percent_complete, poll_count)
+            self.cancel_token.wait(min(delay, deadline - now))
+
         raise TimeoutError(f"Export timed out after {self.config.EXPORT_POLL_MAX_SECONDS} seconds")
 
+    def _next_poll_delay(self, elapsed, percent_complete, poll_count):
+        """Seconds until the next status check, between EXPORT_POLL_MIN_INTERVAL and EXPORT_POLL_MAX_INTERVAL.
+
+        Once Qualtrics reports progress, the remaining time is extrapolated from the rate so far and the next
+        check lands about halfway there; until then the delay grows geometrically from the minimum.
+        """
+        min_interval = self.config.EXPORT_POLL_MIN_INTERVAL
+        max_interval = self.config.EXPORT_POLL_MAX_INTERVAL
+
+        if 0 < percent_complete < 100:
+            remaining = elapsed * (100 - percent_complete) / percent_complete
+            delay = remaining / 2
+        else:
+            delay = min_interval * 1.5 ** poll_count
+
+        return max(min_interval, min(max_interval, delay))
+
     def _check_export_status(self, survey_id: str, progress_id: str):
         url = f"{self.api_client.base_url}/surveys/{survey_id}/export-responses/{progress_id}"
 
         try:
-            response = requests.get(url, headers=self.api_client.headers)
+            response = self.api_client.request("GET", url)
             response.raise_for_status()
+            metrics.inc("export_status_checks_total")
             return response.json()["result"]
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to check export status for survey {survey_id}: {e}")
@@ -260,13 +422,106 @@ class DataExtractionService:
         url = f"{self.api_client.base_url}/surveys/{survey_id}/export-responses/{file_id}/file"
 
         try:
-            response = requests.get(url, headers=self.api_client.headers)
-            response.raise_for_status()
-            return response.content
+            content = io.BytesIO()
+            with self.api_client.request("GET", url, stream=True) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=self.config.DOWNLOAD_CHUNK_BYTES):
+                    self.cancel_token.check()
+                    content.write(chunk)
+                    metrics.inc("export_download_bytes_total", len(chunk))
+            return content.getvalue()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to download export file for survey {survey_id}: {e}")
+            raise
+
+    def _download_export_file_to_path(self, survey_id: str, file_id: str, download_path):
+        url = f"{self.api_client.base_url}/surveys/{survey_id}/export-responses/{file_id}/file"
+
+        try:
+            with self.api_client.request("GET", url, stream=True) as response:
+                response.raise_for_status()
+                with open(download_path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=self.config.DOWNLOAD_CHUNK_BYTES):
+                        self.cancel_token.check()
+                        f.write(chunk)
+                        metrics.inc("export_download_bytes_total", len(chunk))
+            return download_path
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to download export file for survey {survey_id}: {e}")
             raise
 
+    def _hash_export_csv(self, zip_source):
+        """sha256 of the CSV inside the export ZIP, streamed; the ZIP itself differs on every export"""
+        with zipfile.ZipFile(zip_source) as zip_file:
+            csv_filename = zip_file.namelist()[0]
+            with zip_file.open(csv_filename) as f:
+                content_hash, _ = calculate_stream_hash(f, self.config.DOWNLOAD_CHUNK_BYTES)
+        return content_hash
+
+    def _skip_unchanged_extraction(self, survey_id, previous, export_mode):
+        logger.info(f"[{survey_id}] Export content unchanged since {previous['file_name']}, skipping parse and save")
+        self._log_responses_extraction_result(survey_id, previous["file_name"], None, success=True,
+                                              file_hash=previous["file_hash"], file_size=previous["file_size"],
+                                              skip_reason="content_hash_unchanged")
+        self._report_progress(survey_id, "extracted", records_count=0, skipped=True)
+
+        return {
+            "success": True,
+            "action": "skipped_unchanged",
+            "reason": "content_hash_unchanged",
+            "file_path": str(self.config.DATA_DIR / previous["file_name"]),
+            "file_name": previous["file_name"],
+            "records_count": 0,
+            "export_mode": export_mode,
+            "hash": previous["file_hash"]
+        }
+
+    def _get_latest_extraction_log(self, survey_id):
+        try:
+            with db_manager.get_cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT file_name, file_size, file_hash
+                    FROM survey_responses_extraction_log
+                    WHERE survey_id = %s
+                    ORDER BY extracted_at DESC LIMIT 1
+                    """,
+                    (survey_id,)
+                )
+                row = cursor.fetchone()
+                return dict(row) if row else None
+        except Exception as e:
+            logger.warning(f"[{survey_id}] Failed to read latest extraction log, will not short-circuit: {e}")
+            return None
+
+    def _convert_export_to_columnar(self, zip_source, file_path):
+        """Stream the CSV member into a Parquet/Arrow file; returns the same count as len(pd.read_csv(...))"""
+        with zipfile.ZipFile(zip_source) as zip_file:
+            csv_filename = zip_file.namelist()[0]
+            with zip_file.open(csv_filename) as f:
+                data_rows = convert_csv_to_columnar(f, file_path, self.config.EXTRACT_STORAGE_FORMAT,
+                                                    self.config.DOWNLOAD_CHUNK_BYTES)
+        return data_rows + QUALTRICS_HEADER_ROWS
+
+    def _unzip_export_to_csv(self, zip_path, file_path):
+        """Copy the CSV member of the export ZIP to file_path without parsing it; returns the data row count"""
+        with zipfile.ZipFile(zip_path) as zip_file:
+            csv_filename = zip_file.namelist()[0]
+            with zip_file.open(csv_filename) as src, open(file_path, "wb") as dst:
+                shutil.copyfileobj(src, dst, self.config.DOWNLOAD_CHUNK_BYTES)
+
+        # Same count as len(pd.read_csv(...)): every record after the header row
+        with open(file_path, newline="", encoding="utf-8-sig") as f:
+            return max(sum(1 for _ in csv.reader(f)) - 1, 0)
+
+    def _report_progress(self, survey_id, stage, **details):
+        if not self.progress_callback:
+            return
+        try:
+            self.progress_callback(survey_id, stage, **details)
+        except Exception as e:
+            logger.warning(f"[{survey_id}] Progress callback failed: {e}")
+
     def get_export_progress(self, survey_id: str, progress_id: str):
         try:
             result = self._check_export_status(survey_id, progress_id)
@@ -283,24 +538,14 @@ class DataExtractionService:
 
     def _has_existing_field_mapping(self, survey_id):
         try:
-            with db_manager.get_cursor() as cursor:
-                query = """
-                        SELECT field_mapping
-                        FROM surveys
-                        WHERE qualtrics_survey_id = %s
-                          AND field_mapping IS NOT NULL
-                          AND field_mapping != '{}'::jsonb
-                    AND field_mapping != 'null'::jsonb \
-                        """
-                cursor.execute(query, (survey_id,))
-                result = cursor.fetchone()
-
-                if result:
-                    logger.info(f"[{survey_id}] Field mapping already exists")
-                    return True
-                else:
-                    logger.info(f"[{survey_id}] Field mapping is empty or null")
-                    return False
+            survey = self.metadata_cache.get(survey_id)
+
+            if survey and survey['has_field_mapping']:
+                logger.info(f"[{survey_id}] Field mapping already exists")
+                return True
+            else:
+                logger.info(f"[{survey_id}] Field mapping is empty or null")
+                return False
 
         except Exception as e:
             logger.error(f"Failed to check field mapping for survey {survey_id}: {e}")
@@ -308,60 +553,36 @@ class DataExtractionService:
 
     def _get_all_survey_ids_from_db(self, organisation_id=None):
         """Get all survey ids"""
-        try:
-            with db_manager.get_cursor() as cursor:
-                if organisation_id:
-                    # Get all active survey ids for specific organisation
-                    query = """
-                            SELECT DISTINCT qualtrics_survey_id
-                            FROM surveys
-                            WHERE organisation_id = %s and status = 'active'
-                            ORDER BY qualtrics_survey_id \
-                            """
-                    cursor.execute(query, (organisation_id,))
-                else:
-                    # Get all active survey ids
-                    query = """
-                            SELECT DISTINCT qualtrics_survey_id
-                            FROM surveys
-                            WHERE status = 'active'
-                            ORDER BY qualtrics_survey_id \
-                            """
-                    cursor.execute(query)
-
-                results = cursor.fetchall()
-                return [row['qualtrics_survey_id'] for row in results]
+        return self.metadata_cache.get_active_survey_ids(organisation_id)
 
-        except Exception as e:
-            logger.error(f"Failed to get survey IDs from database: {e}")
-            raise
-
-    def _log_responses_extraction_result(self, survey_id, file_name, file_path, success=True, error_message=None):
-        """Success download process log"""
+    def _log_responses_extraction_result(self, survey_id, file_name, file_path, success=True, error_message=None,
+                                         file_hash=None, file_size=None, skip_reason=None):
+        """Success download process log; skipped extractions re-log the previous file with a skip_reason"""
         if not success:
             logger.info(f"[{survey_id}] Skipping log for failed extraction")
             return None
 
         try:
             with db_manager.get_cursor() as cursor:
-                if file_path.exists():
+                if not skip_reason:
+                    if not file_path.exists():
+                        logger.warning(f"[{survey_id}] File does not exist, skipping log")
+                        return None
                     file_size = file_path.stat().st_size
-                    file_hash = calculate_file_hash(file_path)
-                else:
-                    logger.warning(f"[{survey_id}] File does not exist, skipping log")
-                    return None
+                    file_hash = file_hash or calculate_file_hash(file_path)
 
                 insert_query = """
                                INSERT INTO survey_responses_extraction_log
-                                   (survey_id, file_name, file_size, file_hash, extracted_at)
-                               VALUES (%s, %s, %s, %s, %s) RETURNING id \
+                                   (survey_id, file_name, file_size, file_hash, extracted_at, skip_reason)
+                               VALUES (%s, %s, %s, %s, %s, %s) RETURNING id \
                                """
                 cursor.execute(insert_query, (
                     survey_id,
                     file_name,
                     file_size,
                     file_hash,
-                    datetime.now(timezone.utc)
+                    datetime.now(timezone.utc),
+                    skip_reason
                 ))
 
                 log_id = cursor.fetchone()['id']
@@ -370,4 +591,4 @@ class DataExtractionService:
 
         except Exception as e:
             logger.error(f"Failed to log responses extraction result: {e}")
-            return None
\ No newline at end of file
+            return None
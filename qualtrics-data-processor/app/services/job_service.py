@@ -0,0 +1,329 @@
+import json
+import logging
+import math
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+
+from .pipeline_service import PipelineService, create_cancel_token
+from ..config.database import db_manager
+from ..config.settings import get_config
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPES = ("extract", "transform_and_load", "full_pipeline")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+_heartbeat_pid = None
+_heartbeat_lock = threading.Lock()
+
+
+def _get_executor(config):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=config.JOB_MAX_WORKERS, thread_name_prefix="pipeline-job")
+        return _executor
+
+
+def _worker_id():
+    """Owner recorded on this process's jobs; read per call so forked gunicorn workers each get their own"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _start_heartbeat(job_service):
+    """Start this process's heartbeat thread once; threads do not survive a fork, hence the pid check"""
+    global _heartbeat_pid
+    with _heartbeat_lock:
+        if _heartbeat_pid == os.getpid():
+            return
+        _heartbeat_pid = os.getpid()
+        threading.Thread(target=job_service._heartbeat_loop, name="pipeline-job-heartbeat", daemon=True).start()
+
+
+def _json_safe(value):
+    """jsonb rejects NaN, and results may carry pandas NaN or datetimes"""
+    if isinstance(value, dict):
+        return {str(k): _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _to_json(value):
+    return json.dumps(_json_safe(value))
+
+
+class _JobProgress:
+    """Per-survey progress of one job, flushed to pipeline_jobs at most every JOB_PROGRESS_FLUSH_SECONDS"""
+
+    TERMINAL_STAGES = {"extracted", "loaded", "failed"}
+
+    def __init__(self, job_service, job_id, flush_interval):
+        self.job_service = job_service
+        self.job_id = job_id
+        self.flush_interval = flush_interval
+        self.surveys = {}
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def update(self, survey_id, stage, **details):
+        with self._lock:
+            self.surveys[survey_id] = {"stage": stage, **details,
+                                       "updated_at": datetime.now(timezone.utc).isoformat()}
+            due = stage in self.TERMINAL_STAGES or time.monotonic() - self._last_flush >= self.flush_interval
+            if due:
+                self._last_flush = time.monotonic()
+                snapshot = dict(self.surveys)
+
+        if due:
+            self.job_service._update_job(self.job_id, progress=snapshot)
+
+    def flush(self):
+        with self._lock:
+            snapshot = dict(self.surveys)
+        self.job_service._update_job(self.job_id, progress=snapshot)
+
+
+class PipelineJobService:
+    """Runs pipeline requests on an in-process executor and tracks them in pipeline_jobs"""
+
+    def __init__(self):
+        self.config = get_config()
+
+    def submit(self, job_type, params):
+        job_id = self._create_job(job_type, params)
+        _get_executor(self.config).submit(self._run_job, job_id, job_type, params)
+        logger.info(f"Queued {job_type} job {job_id}")
+        return job_id
+
+    def run(self, job_type, params):
+        """Run a job in the calling thread, tracked in pipeline_jobs like submitted ones; returns (job_id, result)"""
+        job_id = self._create_job(job_type, params)
+        return job_id, self._run_job(job_id, job_type, params)
+
+    def _create_job(self, job_type, params):
+        if job_type not in JOB_TYPES:
+            raise ValueError(f"Unknown job type: {job_type}")
+
+        job_id = str(uuid.uuid4())
+        now = datetime.now(timezone.utc)
+        with db_manager.get_cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO pipeline_jobs (id, job_type, status, params, created_at, worker_id, heartbeat_at)
+                VALUES (%s, %s, 'queued', %s, %s, %s, %s)
+                """,
+                (job_id, job_type, _to_json(params), now, _worker_id(), now)
+            )
+        _start_heartbeat(self)
+        return job_id
+
+    def fail_stale_jobs(self):
+        """Fail queued and running jobs whose process stopped heartbeating; returns how many were failed.
+
+        Jobs live on an in-process executor, so a restart loses them; any process may fail them, since a live
+        owner keeps heartbeat_at within JOB_STALE_SECONDS. Jobs from before migration 010 have no heartbeat
+        and are judged by when they started or were queued.
+        """
+        now = datetime.now(timezone.utc)
+        with db_manager.get_cursor() as cursor:
+            cursor.execute(
+                """
+                UPDATE pipeline_jobs
+                SET status      = 'failed',
+                    error       = %s,
+                    finished_at = %s
+                WHERE status IN ('queued', 'running')
+                  AND COALESCE(heartbeat_at, started_at, created_at) < %s
+                RETURNING id, worker_id
+                """,
+                ("Interrupted: the process running this job stopped", now,
+                 now - timedelta(seconds=self.config.JOB_STALE_SECONDS))
+            )
+            stale = cursor.fetchall()
+
+        for row in stale:
+            logger.warning(f"Job {row['id']} failed: its process {row['worker_id'] or '(unknown)'} stopped")
+        return len(stale)
+
+    def _heartbeat_loop(self):
+        """Keep this process's jobs fresh and fail the jobs of processes that stopped"""
+        while True:
+            time.sleep(self.config.JOB_HEARTBEAT_SECONDS)
+            try:
+                with db_manager.get_cursor() as cursor:
+                    cursor.execute(
+                        """
+                        UPDATE pipeline_jobs
+                        SET heartbeat_at = %s
+                        WHERE worker_id = %s
+                          AND status IN ('queued', 'running')
+                        """,
+                        (datetime.now(timezone.utc), _worker_id())
+                    )
+                self.fail_stale_jobs()
+            except Exception as e:
+                logger.warning(f"Job heartbeat failed: {e}")
+
+    def get_job(self, job_id, include_result=False):
+        try:
+            uuid.UUID(str(job_id))
+        except ValueError:
+            return None
+
+        columns = ("id, job_type, status, params, progress, error, created_at, started_at, finished_at, "
+                   "cancel_requested_at")
+        if include_result:
+            columns += ", result"
+
+        with db_manager.get_cursor() as cursor:
+            cursor.execute(f"SELECT {columns} FROM pipeline_jobs WHERE id = %s", (job_id,))
+            row = cursor.fetchone()
+
+        return self._serialize_job(row) if row else None
+
+    def list_jobs(self, limit=20):
+        with db_manager.get_cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT id, job_type, status, params, error, created_at, started_at, finished_at
+                FROM pipeline_jobs
+                ORDER BY created_at DESC LIMIT %s
+                """,
+                (limit,)
+            )
+            return [self._serialize_job(row) for row in cursor.fetchall()]
+
+    def cancel_job(self, job_id):
+        """Request cancellation; returns the job, None when unknown. Finished jobs are returned unchanged"""
+        try:
+            uuid.UUID(str(job_id))
+        except ValueError:
+            return None
+
+        with db_manager.get_cursor() as cursor:
+            # Queued jobs never start; running ones are stopped by the process running them
+            cursor.execute(
+                """
+                UPDATE pipeline_jobs
+                SET cancel_requested_at = %s,
+                    status              = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END,
+                    finished_at         = CASE WHEN status = 'queued' THEN %s ELSE finished_at END
+                WHERE id = %s
+                  AND status IN ('queued', 'running')
+                """,
+                (datetime.now(timezone.utc), datetime.now(timezone.utc), job_id)
+            )
+            if cursor.rowcount:
+                logger.info(f"Cancellation requested for job {job_id}")
+
+        return self.get_job(job_id)
+
+    def _run_job(self, job_id, job_type, params):
+        """Pipeline result of the job, or None when it crashed or was cancelled before it started"""
+        if not self._claim_job(job_id):
+            logger.info(f"Job {job_id} ({job_type}) was cancelled before it started")
+            return None
+
+        progress = _JobProgress(self, job_id, self.config.JOB_PROGRESS_FLUSH_SECONDS)
+        cancel_token = create_cancel_token(params.get("deadline_seconds"), params.get("survey_deadline_seconds"))
+        watcher_stop = threading.Event()
+        threading.Thread(target=self._watch_for_cancel, args=(job_id, cancel_token, watcher_stop),
+                         name=f"job-cancel-{job_id[:8]}", daemon=True).start()
+        logger.info(f"Job {job_id} ({job_type}) started")
+
+        try:
+            pipeline = PipelineService(progress_callback=progress.update, cancel_token=cancel_token)
+            if job_type == "extract":
+                result = pipeline.extract_data(params.get("survey_ids"), params.get("organisation_id"))
+            elif job_type == "transform_and_load":
+                result = pipeline.transform_and_load(params.get("survey_ids"), params.get("organisation_id"),
+                                                     params.get("force_mappings_update", False))
+            else:
+                result = pipeline.full_pipeline(params.get("survey_ids"), params.get("organisation_id"),
+                                                params.get("force_mappings_update", False))
+
+            # Surveys stopped by the token fail one by one, so a cancelled run can still report success
+            if cancel_token.cancelled:
+                status, error = "cancelled", cancel_token.reason
+            else:
+                status, error = ("succeeded" if result.get("success") else "failed"), result.get("error")
+            progress.flush()
+            self._update_job(job_id, status=status, result=result, error=error,
+                             finished_at=datetime.now(timezone.utc))
+            logger.info(f"Job {job_id} ({job_type}) {status}")
+            return result
+
+        except Exception as e:
+            status = "cancelled" if cancel_token.cancelled else "failed"
+            logger.error(f"Job {job_id} ({job_type}) {status}: {e}")
+            self._update_job(job_id, status=status, error=cancel_token.reason or str(e),
+                             finished_at=datetime.now(timezone.utc))
+            return None
+        finally:
+            watcher_stop.set()
+
+    def _claim_job(self, job_id):
+        with db_manager.get_cursor() as cursor:
+            cursor.execute(
+                """
+                UPDATE pipeline_jobs
+                SET status     = 'running',
+                    started_at = %s
+                WHERE id = %s
+                  AND status = 'queued'
+                """,
+                (datetime.now(timezone.utc), job_id)
+            )
+            return cursor.rowcount > 0
+
+    def _watch_for_cancel(self, job_id, cancel_token, stop):
+        """Cancel the token once cancel_requested_at is set; the request may reach another process"""
+        while not stop.wait(self.config.JOB_CANCEL_POLL_SECONDS):
+            try:
+                with db_manager.get_cursor() as cursor:
+                    cursor.execute("SELECT cancel_requested_at FROM pipeline_jobs WHERE id = %s", (job_id,))
+                    row = cursor.fetchone()
+            except Exception as e:
+                logger.warning(f"Failed to check job {job_id} for cancellation: {e}")
+                continue
+
+            if row and row["cancel_requested_at"]:
+                logger.info(f"Job {job_id} cancelled, stopping")
+                cancel_token.cancel("cancelled by request")
+                return
+
+    def _update_job(self, job_id, **fields):
+        assignments = []
+        values = []
+        for column, value in fields.items():
+            assignments.append(f"{column} = %s")
+            values.append(_to_json(value) if column in ("progress", "result") else value)
+        values.append(job_id)
+
+        try:
+            with db_manager.get_cursor() as cursor:
+                cursor.execute(f"UPDATE pipeline_jobs SET {', '.join(assignments)} WHERE id = %s", values)
+        except Exception as e:
+            logger.error(f"Failed to update job {job_id}: {e}")
+
+    def _serialize_job(self, row):
+        job = dict(row)
+        job["id"] = str(job["id"])
+        for column in ("created_at", "started_at", "finished_at", "cancel_requested_at"):
+            if job.get(column):
+                job[column] = job[column].isoformat()
+        return job
@@ -1,15 +1,152 @@
+import csv
+import hashlib
+import io
 import json
+import re
 import pandas as pd
 import logging
+import psycopg2
+from psycopg2.extras import execute_values
 
 from ..config.database import db_manager
+from ..config.settings import get_config
+from ..utils.cancellation import CancellationToken
+from ..utils.date_utils import compute_submission_periods
+from ..utils.metrics import metrics, timed
+from .survey_metadata_cache import SurveyMetadataCache
 
 logger = logging.getLogger(__name__)
 
+# Typed copies of the response_data keys the dashboard filters on: (column, response key, column type)
+RESPONSE_TYPED_FIELDS = (
+    ("facility", "Facility", "text"),
+    ("gender", "Gender", "text"),
+    ("participant_type", "ParticipantType", "text"),
+    ("satisfaction", "Satisfaction", "smallint"),
+    ("nps", "NPS", "smallint"),
+    ("nps_group", "NPS_NPS_GROUP", "smallint"),
+)
+
+# Written by every load path; response_id, the typed columns and content_hash come from migrations 001, 005 and 008
+RESPONSE_COLUMNS = ("survey_id", "response_id", "submitted_at", "period_year", "period_month", "response_data",
+                    *(column for column, _, _ in RESPONSE_TYPED_FIELDS), "content_hash")
+
+# Part of every content hash; bump it when the row values derived from a response change, so the next diff
+# load rewrites every row instead of keeping the old derivation for unchanged responses
+RESPONSE_HASH_VERSION = 1
+
+RESPONSE_STAGING_TABLE = "survey_responses_staging"
+
+RESPONSE_UPSERT_CLAUSE = """
+    ON CONFLICT (survey_id, response_id) DO UPDATE
+        SET submitted_at  = EXCLUDED.submitted_at,
+            period_year   = EXCLUDED.period_year,
+            period_month  = EXCLUDED.period_month,
+            response_data = EXCLUDED.response_data,
+            facility = EXCLUDED.facility,
+            gender = EXCLUDED.gender,
+            participant_type = EXCLUDED.participant_type,
+            satisfaction = EXCLUDED.satisfaction,
+            nps = EXCLUDED.nps,
+            nps_group = EXCLUDED.nps_group,
+            content_hash = EXCLUDED.content_hash
+"""
+
+# The typed columns and content hash are compared too, so rows loaded before they existed are filled in by the
+# next merge
+RESPONSE_CHANGED_CONDITION = """
+    (survey_responses.submitted_at, survey_responses.period_year, survey_responses.period_month,
+     survey_responses.response_data, survey_responses.facility, survey_responses.gender,
+     survey_responses.participant_type, survey_responses.satisfaction, survey_responses.nps,
+     survey_responses.nps_group, survey_responses.content_hash)
+        IS DISTINCT FROM (EXCLUDED.submitted_at, EXCLUDED.period_year, EXCLUDED.period_month, EXCLUDED.response_data,
+                          EXCLUDED.facility, EXCLUDED.gender, EXCLUDED.participant_type, EXCLUDED.satisfaction,
+                          EXCLUDED.nps, EXCLUDED.nps_group, EXCLUDED.content_hash)
+"""
+
+_SMALLINT_CODE = re.compile(r"-?[0-9]{1,5}")
+
+
+def _encode_response(response):
+    """json.dumps of one response; jsonb rejects NaN, so missing answers are stored as null"""
+    return json.dumps({key: None if isinstance(value, float) and value != value else value
+                       for key, value in response.items()})
+
+
+def _typed_value(value, column_type):
+    """Value for a typed response column; anything that is not an in-range integer code becomes NULL"""
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    if column_type == "text":
+        return str(value)
+
+    text = str(value).strip(" ")
+    if not _SMALLINT_CODE.fullmatch(text):
+        return None
+    code = int(text)
+    return code if -32768 <= code <= 32767 else None
+
+
+def _typed_values(response):
+    return tuple(_typed_value(response.get(key), column_type) for _, key, column_type in RESPONSE_TYPED_FIELDS)
+
+
+def response_content_hashes(responses_df):
+    """Hex content hash per row of a responses DataFrame, over its column names and values.
+
+    Values are compared as strings, so the same export hashes the same whether its columns were read as
+    categoricals, strings or objects, and the column order does not matter.
+    """
+    columns = sorted(responses_df.columns)
+    values = pd.DataFrame({column: responses_df[column].astype("string") for column in columns})
+    row_hashes = pd.util.hash_pandas_object(values, index=False).tolist()
+    salt = int.from_bytes(hashlib.blake2b("\x1f".join([str(RESPONSE_HASH_VERSION), *columns]).encode(),
+                                          digest_size=8).digest(), "little")
+    return [f"{row_hash ^ salt:016x}" for row_hash in row_hashes]
+
+
+def _typed_column_sql(key, column_type):
+    """SQL counterpart of _typed_value over survey_responses.response_data"""
+    if column_type == "text":
+        return f"response_data ->> '{key}'"
+
+    # Nested CASE so the casts only run on values that matched the pattern
+    value = f"btrim(response_data ->> '{key}')"
+    return (f"CASE WHEN {value} ~ '^-?[0-9]{{1,5}}$' THEN "
+            f"CASE WHEN {value}::integer BETWEEN -32768 AND 32767 THEN {value}::smallint END END")
+
+
+class _CopyRowStream:
+    """File-like object rendering rows as COPY csv text on demand, so the payload is never built in one piece"""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+        self._pending = ""
+
+    def read(self, size=-1):
+        while size < 0 or len(self._pending) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._writer.writerow(row)
+            self._pending += self._buffer.getvalue()
+            self._buffer.seek(0)
+            self._buffer.truncate()
+
+        if size < 0:
+            chunk, self._pending = self._pending, ""
+        else:
+            chunk, self._pending = self._pending[:size], self._pending[size:]
+        return chunk
+
 
 class DataLoadService:
-    def __init__(self):
-        pass
+    def __init__(self, metadata_cache=None, cancel_token=None):
+        self.config = get_config()
+        self.metadata_cache = metadata_cache or SurveyMetadataCache()
+        self.cancel_token = cancel_token or CancellationToken()
 
     def load_survey_mappings(self, survey_id, mappings_data, force_update=False):
         try:
@@ -25,7 +162,7 @@ class DataLoadService:
                 }
 
             # Check if any existing mappings then skip the insert
-            if not force_update and self._has_existing_mappings(survey_uuid):
+            if not force_update and self._has_existing_mappings(survey_id):
                 logger.info(f"Survey {survey_id} already has mappings, skipping update")
                 return {
                     "success": True,
@@ -36,6 +173,7 @@ class DataLoadService:
                 }
 
             success = self._update_survey_mappings(survey_uuid, mappings_data)
+            self.metadata_cache.invalidate(survey_id)
 
             if success:
                 return {
@@ -59,7 +197,8 @@ class DataLoadService:
                 "action": "failed"
             }
 
-    def load_survey_responses(self, survey_id, responses_data, replace_existing=True):
+    def load_survey_responses(self, survey_id, responses_data, replace_existing=True, submission_periods=None,
+                              upsert=False, content_hashes=None):
         try:
             logger.info(f"Loading responses for survey {survey_id}")
 
@@ -71,17 +210,51 @@ class DataLoadService:
                     "error": f"Survey with qualtrics_survey_id {survey_id} not found in database"
                 }
 
-            deleted_count = 0
-            if replace_existing:
-                deleted_count = self._clear_survey_responses(survey_uuid)
+            if responses_data is None or len(responses_data) == 0:
+                logger.warning("No response data to insert")
+                batches = []
+            else:
+                batches = [(responses_data, submission_periods, content_hashes)]
+
+            result = self._write_survey_responses(survey_uuid, batches, replace_existing, upsert)
+            result.pop("batch_count")
+
+            return {
+                "success": True,
+                **result,
+                "load_mode": "upsert" if upsert else ("replace" if replace_existing else "append")
+            }
+
+        except Exception as e:
+            logger.error(f"Failed to load responses for survey {survey_id}: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+    def load_survey_responses_batches(self, survey_id, batches, replace_existing=True, upsert=False):
+        """Streaming counterpart of load_survey_responses.
 
-            inserted_count = self._insert_survey_responses(survey_uuid, responses_data)
+        batches yields (responses_data, submission_periods, content_hashes) tuples, responses_data being a
+        DataFrame of the kept response columns or a list of dicts; submission_periods and content_hashes may be
+        None. Only one batch is held in memory at a time.
+        """
+        try:
+            logger.info(f"Loading responses for survey {survey_id} in batches")
+
+            survey_uuid = self._get_survey_uuid_by_qualtrics_id(survey_id)
+            if not survey_uuid:
+                return {
+                    "success": False,
+                    "error": f"Survey with qualtrics_survey_id {survey_id} not found in database"
+                }
+
+            result = self._write_survey_responses(survey_uuid, batches, replace_existing, upsert)
 
             return {
                 "success": True,
-                "deleted_count": deleted_count,
-                "inserted_count": inserted_count,
-                "total_input_records": len(responses_data) if responses_data else 0
+                **result,
+                "load_mode": "upsert" if upsert else ("replace" if replace_existing else "append")
             }
 
         except Exception as e:
@@ -97,7 +270,7 @@ class DataLoadService:
             if not survey_uuid:
                 return False
 
-            return self._has_existing_mappings(survey_uuid)
+            return self._has_existing_mappings(survey_id)
 
         except Exception as e:
             logger.error(f"Failed to check mappings existence for survey {survey_id}: {e}")
@@ -123,34 +296,42 @@ class DataLoadService:
             logger.error(f"Failed to get mappings for survey {survey_id}: {e}")
             return None
 
+    def backfill_typed_columns(self, survey_uuid):
+        """Fill the typed response columns from response_data for one survey; returns the updated row count"""
+        columns = ", ".join(column for column, _, _ in RESPONSE_TYPED_FIELDS)
+        expressions = ", ".join(_typed_column_sql(key, column_type) for _, key, column_type in RESPONSE_TYPED_FIELDS)
+
+        with db_manager.get_cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE survey_responses
+                SET ({columns}) = ({expressions})
+                WHERE survey_id = %s
+                  AND ({columns}) IS DISTINCT FROM ({expressions})
+                """,
+                (survey_uuid,)
+            )
+            updated_count = cursor.rowcount
+
+        logger.info(f"Backfilled typed columns on {updated_count} responses for survey {survey_uuid}")
+        return updated_count
+
     def _get_survey_uuid_by_qualtrics_id(self, qualtrics_survey_id):
         try:
-            with db_manager.get_cursor() as cursor:
-                query = "SELECT id FROM surveys WHERE qualtrics_survey_id = %s"
-                cursor.execute(query, (qualtrics_survey_id,))
-                result = cursor.fetchone()
-                if result:
-                    return result['id']
-                else:
-                    logger.warning(f"Survey with qualtrics_survey_id {qualtrics_survey_id} not found")
-                    return None
+            survey = self.metadata_cache.get(qualtrics_survey_id)
+            if survey:
+                return survey['id']
+            else:
+                logger.warning(f"Survey with qualtrics_survey_id {qualtrics_survey_id} not found")
+                return None
         except Exception as e:
             logger.error(f"Failed to get survey UUID: {e}")
             raise
 
-    def _has_existing_mappings(self, survey_uuid):
+    def _has_existing_mappings(self, qualtrics_survey_id):
         try:
-            with db_manager.get_cursor() as cursor:
-                query = """
-                        SELECT field_mapping
-                        FROM surveys
-                        WHERE id = %s
-                          AND field_mapping IS NOT NULL
-                          AND field_mapping != '{}'::jsonb
-                        """
-                cursor.execute(query, (survey_uuid,))
-                result = cursor.fetchone()
-                return result is not None
+            survey = self.metadata_cache.get(qualtrics_survey_id)
+            return bool(survey and survey['has_mappings'])
         except Exception as e:
             logger.error(f"Failed to check existing mappings: {e}")
             raise
@@ -190,75 +371,519 @@ class DataLoadService:
             logger.error(f"Failed to update survey mappings: {e}")
             return False
 
-    def _clear_survey_responses(self, survey_uuid):
-        try:
-            with db_manager.get_cursor() as cursor:
-                delete_query = "DELETE FROM survey_responses WHERE survey_id = %s"
-                cursor.execute(delete_query, (survey_uuid,))
+    def _write_survey_responses(self, survey_uuid, batches, replace_existing=True, upsert=False):
+        """Replace or upsert the survey's responses in one transaction, so readers never see a partial survey.
+
+        With RESPONSES_REPLACE_STRATEGY=diff a replace compares each response's content hash with the stored one
+        and stages only new or changed responses; merge stages every response. Either way the staged rows are
+        then applied by response_id and responses missing from the export are deleted. delete clears the
+        survey and inserts every row again.
+
+        The survey's dashboard rollups are updated in the same transaction. Diff and upsert loads know which
+        responses they touched, so only the periods those responses were in before or after the load are
+        recomputed; merge, delete and append loads recompute the whole survey.
+
+        A cancel interrupts the running statement and a deadline bounds it through statement_timeout; the
+        checks between steps then raise PipelineCancelled inside the transaction, which rolls it back.
+        """
+        strategy = self.config.RESPONSES_REPLACE_STRATEGY
+        merge = replace_existing and not upsert and strategy in {"diff", "merge"}
+        diff = merge and strategy == "diff"
+        table = RESPONSE_STAGING_TABLE if merge else "survey_responses"
+
+        deleted_count = 0
+        changed_count = None
+        unchanged_count = None
+        inserted_count = 0
+        total_input_records = 0
+        rejected_rows = []
+        batch_count = 0
+        # Periods whose rollups must be recomputed; None recomputes the whole survey
+        touched_periods = set() if diff or upsert else None
+        touched_ids = set()
+
+        with db_manager.get_cursor() as cursor, self.cancel_token.on_cancel(cursor.connection.cancel):
+            remaining = self.cancel_token.remaining()
+            if remaining is not None:
+                cursor.execute("SET LOCAL statement_timeout = %s", (max(int(remaining * 1000), 1),))
+
+            if merge:
+                self._create_staging_table(cursor)
+            elif replace_existing:
+                cursor.execute("DELETE FROM survey_responses WHERE survey_id = %s", (survey_uuid,))
                 deleted_count = cursor.rowcount
                 logger.info(f"Deleted {deleted_count} existing responses for survey {survey_uuid}")
-                return deleted_count
-        except Exception as e:
-            logger.error(f"Failed to clear survey responses: {e}")
-            raise
 
-    def _insert_survey_responses(self, survey_uuid, responses_data):
-        if not responses_data:
-            logger.warning("No response data to insert")
+            if diff:
+                with timed("diff"):
+                    stored_hashes = self._get_stored_hashes(cursor, survey_uuid)
+                seen_ids = set()
+                unchanged_count = 0
+
+            for responses_data, submission_periods, content_hashes in batches:
+                self.cancel_token.check()
+                batch_size = len(responses_data)
+                if batch_size == 0:
+                    continue
+
+                positions = None
+                if diff:
+                    if content_hashes is None:
+                        content_hashes = response_content_hashes(pd.DataFrame(self._response_records(responses_data)))
+                    positions = self._changed_positions(responses_data, content_hashes, stored_hashes, seen_ids)
+                    unchanged_count += batch_size - len(positions)
+                    responses_data, submission_periods, content_hashes = self._take_rows(
+                        responses_data, submission_periods, content_hashes, positions)
+                    touched_ids.update(self._response_ids(responses_data))
+                elif upsert:
+                    batch_ids = set(self._response_ids(responses_data))
+                    touched_periods |= self._response_periods(cursor, survey_uuid, batch_ids - touched_ids)
+                    touched_ids |= batch_ids
+
+                if len(responses_data):
+                    batch_inserted, batch_rejects = self._write_response_batch(
+                        cursor, survey_uuid, responses_data, submission_periods, upsert,
+                        total_input_records if positions is None else 0, table, content_hashes)
+                    if positions is not None:
+                        # Rejected row indexes refer to the whole export, not to the changed rows
+                        for rejected in batch_rejects:
+                            rejected["row_index"] = total_input_records + positions[rejected["row_index"]]
+                    inserted_count += batch_inserted
+                    rejected_rows.extend(batch_rejects)
+                total_input_records += batch_size
+                batch_count += 1
+
+            self.cancel_token.check()
+            if merge:
+                removed_ids = None
+                if diff:
+                    removed_ids = set(stored_hashes) - seen_ids
+                    touched_ids |= removed_ids
+                    touched_periods |= self._response_periods(cursor, survey_uuid, touched_ids)
+                with timed("merge"):
+                    deleted_count, changed_count = self._merge_staged_responses(cursor, survey_uuid, removed_ids)
+
+            with timed("rollups"):
+                if touched_periods is not None:
+                    touched_periods |= self._response_periods(cursor, survey_uuid, touched_ids)
+                rollup_rows = self._refresh_response_rollups(cursor, survey_uuid, touched_periods)
+
+            # Last chance to roll back: a statement cut short by a cancel or statement_timeout must not commit
+            self.cancel_token.check()
+
+        logger.info(f"Successfully inserted {inserted_count} responses in {batch_count} batches using survey "
+                    f"UUID {survey_uuid} (method={self.config.RESPONSES_LOAD_METHOD}, "
+                    f"rejected={len(rejected_rows)}"
+                    + (f", unchanged={unchanged_count})" if unchanged_count is not None else ")"))
+        metrics.inc("rows_loaded_total", inserted_count, result="inserted")
+        metrics.inc("rows_loaded_total", len(rejected_rows), result="rejected")
+        metrics.inc("rows_loaded_total", deleted_count, result="deleted")
+        if changed_count is not None:
+            metrics.inc("rows_loaded_total", changed_count, result="changed")
+        if unchanged_count is not None:
+            metrics.inc("rows_loaded_total", unchanged_count, result="unchanged")
+
+        result = {
+            "deleted_count": deleted_count,
+            "inserted_count": inserted_count,
+            "rejected_count": len(rejected_rows),
+            "rejected_rows": rejected_rows,
+            "total_input_records": total_input_records,
+            "batch_count": batch_count
+        }
+        if changed_count is not None:
+            result["changed_count"] = changed_count
+        if unchanged_count is not None:
+            result["unchanged_count"] = unchanged_count
+        result["rollup_rows"] = rollup_rows
+        return result
+
+    def _get_stored_hashes(self, cursor, survey_uuid):
+        """{response_id: content_hash} of the survey's stored responses; the hash is None for rows loaded before
+        content hashes existed, so those are rewritten once"""
+        cursor.execute(
+            """
+            SELECT response_id, content_hash
+            FROM survey_responses
+            WHERE survey_id = %s
+              AND response_id IS NOT NULL
+            """,
+            (survey_uuid,)
+        )
+        return {row["response_id"]: row["content_hash"] for row in cursor.fetchall()}
+
+    def _response_periods(self, cursor, survey_uuid, response_ids):
+        """(period_year, period_month) pairs of the survey's stored responses with one of response_ids or with
+        no response_id at all; the latter are replaced by every load"""
+        cursor.execute(
+            """
+            SELECT DISTINCT period_year, period_month
+            FROM survey_responses
+            WHERE survey_id = %s
+              AND (response_id IS NULL OR response_id = ANY(%s))
+            """,
+            (survey_uuid, sorted(response_id for response_id in response_ids if response_id is not None))
+        )
+        return {(row["period_year"], row["period_month"]) for row in cursor.fetchall()}
+
+    def _changed_positions(self, responses_data, content_hashes, stored_hashes, seen_ids):
+        """Positions of the batch's new or changed responses; rows without a ResponseId are always written.
+
+        stored_hashes is updated with the hashes written, so a ResponseId repeated later in the export is only
+        written again if its content differs from the earlier occurrence, and the last occurrence still wins.
+        """
+        positions = []
+        for position, (response_id, content_hash) in enumerate(zip(self._response_ids(responses_data),
+                                                                   content_hashes)):
+            if response_id is None:
+                positions.append(position)
+                continue
+            seen_ids.add(response_id)
+            if stored_hashes.get(response_id) != content_hash:
+                stored_hashes[response_id] = content_hash
+                positions.append(position)
+        return positions
+
+    def _take_rows(self, responses_data, submission_periods, content_hashes, positions):
+        if isinstance(responses_data, pd.DataFrame):
+            responses_data = responses_data.iloc[positions].reset_index(drop=True)
+        else:
+            responses_data = [responses_data[position] for position in positions]
+        if submission_periods is not None:
+            submission_periods = [submission_periods[position] for position in positions]
+        return responses_data, submission_periods, [content_hashes[position] for position in positions]
+
+    def _create_staging_table(self, cursor):
+        """Temp copy of the response columns, dropped at commit; staged_order keeps the export order"""
+        cursor.execute(f"""
+            CREATE TEMP TABLE {RESPONSE_STAGING_TABLE} ON COMMIT DROP AS
+            SELECT {', '.join(RESPONSE_COLUMNS)} FROM survey_responses WITH NO DATA
+        """)
+        cursor.execute(f"ALTER TABLE {RESPONSE_STAGING_TABLE} ADD COLUMN staged_order bigserial")
+
+    def _merge_staged_responses(self, cursor, survey_uuid, removed_ids=None):
+        """Make the survey's rows match the staging table; returns (deleted_count, changed_count).
+
+        Responses missing from the export are deleted and only new or changed ones are written, so unchanged
+        rows produce no new tuple versions. Rows without a response_id cannot be matched and are replaced.
+
+        A diff load passes the stored response_ids missing from the export as removed_ids; its staging table
+        only holds rows already known to have changed, so they are written without comparing them again.
+        """
+        columns = ", ".join(RESPONSE_COLUMNS)
+        # Temp tables are never auto-analyzed; the planner needs row counts to pick the anti-join
+        cursor.execute(f"ANALYZE {RESPONSE_STAGING_TABLE}")
+
+        if removed_ids is None:
+            cursor.execute(
+                f"""
+                DELETE FROM survey_responses sr
+                WHERE sr.survey_id = %s
+                  AND (sr.response_id IS NULL
+                       OR NOT EXISTS (SELECT 1 FROM {RESPONSE_STAGING_TABLE} s WHERE s.response_id = sr.response_id))
+                """,
+                (survey_uuid,)
+            )
+            changed_condition = f"WHERE {RESPONSE_CHANGED_CONDITION}"
+        else:
+            cursor.execute(
+                """
+                DELETE FROM survey_responses
+                WHERE survey_id = %s
+                  AND (response_id IS NULL OR response_id = ANY(%s))
+                """,
+                (survey_uuid, sorted(removed_ids))
+            )
+            changed_condition = ""
+        deleted_count = cursor.rowcount
+
+        # The last occurrence of a duplicated ResponseId wins, as in the upsert path
+        cursor.execute(f"""
+            INSERT INTO survey_responses ({columns})
+            SELECT DISTINCT ON (response_id) {columns}
+            FROM {RESPONSE_STAGING_TABLE}
+            WHERE response_id IS NOT NULL
+            ORDER BY response_id, staged_order DESC
+            {RESPONSE_UPSERT_CLAUSE}
+            {changed_condition}
+        """)
+        changed_count = cursor.rowcount
+
+        cursor.execute(f"""
+            INSERT INTO survey_responses ({columns})
+            SELECT {columns} FROM {RESPONSE_STAGING_TABLE} WHERE response_id IS NULL
+        """)
+        changed_count += cursor.rowcount
+
+        logger.info(f"Merged staged responses for survey {survey_uuid}: {changed_count} written, "
+                    f"{deleted_count} deleted")
+        return deleted_count, changed_count
+
+    def _refresh_response_rollups(self, cursor, survey_uuid, periods=None):
+        """Recompute the survey's dashboard rollups from its stored responses, only for the given
+        (period_year, period_month) pairs unless periods is None; returns the rollup rows written"""
+        if periods is not None and not periods:
+            logger.info(f"No rollup periods changed for survey {survey_uuid}")
             return 0
 
-        try:
-            with db_manager.get_cursor() as cursor:
-                insert_query = """
-                               INSERT INTO survey_responses
-                               (survey_id, submitted_at, period_year, period_month,
-                                response_data)
-                               VALUES (%s, %s, %s, %s, %s)
-                               """
-
-                inserted_count = 0
-                for idx, response in enumerate(responses_data):
-                    try:
-                        submitted_at = None
-                        period_year = None
-                        period_month = None
-
-                        if 'EndDate' in response and response['EndDate']:
-                            try:
-                                submitted_at = pd.to_datetime(response['EndDate'])
-
-                                from datetime import timedelta
-                                time_str = str(response['EndDate']).strip()
-                                if ',' in time_str:
-                                    time_str = time_str.split(',')[0]
-
-                                utc_dt = pd.to_datetime(time_str).to_pydatetime()
-                                perth_dt = utc_dt + timedelta(hours=8)
-
-                                period_year = perth_dt.year
-                                period_month = perth_dt.month
-
-                                logger.debug(f"Time conversion - UTC: {time_str} -> Perth: {perth_dt.strftime('%Y-%m-%d %H:%M:%S')} -> Period: {period_year}-{period_month:02d}")
-
-                            except Exception as e:
-                                logger.warning(f"Failed to parse EndDate '{response['EndDate']}': {e}")
-
-                        cursor.execute(insert_query, (
-                            survey_uuid,
-                            submitted_at,
-                            period_year,
-                            period_month,
-                            json.dumps(response)
-                        ))
-                        inserted_count += 1
-
-                    except Exception as row_error:
-                        logger.warning(f"Failed to insert response {idx}: {row_error}")
-                        continue
+        params = [survey_uuid]
+        period_filter = ""
+        if periods is not None:
+            # unnest keeps NULL periods, which IN (...) could never match
+            period_filter = """
+              AND EXISTS (SELECT 1
+                          FROM unnest(%s::integer[], %s::integer[]) AS p(period_year, period_month)
+                          WHERE p.period_year IS NOT DISTINCT FROM {table}.period_year
+                            AND p.period_month IS NOT DISTINCT FROM {table}.period_month)
+            """
+            years, months = zip(*periods)
+            params += [list(years), list(months)]
+
+        cursor.execute("DELETE FROM survey_response_rollups WHERE survey_id = %s"
+                       + period_filter.format(table="survey_response_rollups"), params)
+        cursor.execute(
+            """
+            INSERT INTO survey_response_rollups (survey_id, period_year, period_month, facility, gender,
+                                                 participant_type, has_core_answers, metric, code, response_count)
+            SELECT sr.survey_id,
+                   sr.period_year,
+                   sr.period_month,
+                   sr.facility,
+                   sr.gender,
+                   sr.participant_type,
+                   sr.satisfaction IS NOT NULL AND sr.nps_group IS NOT NULL,
+                   answer.key,
+                   answer.value,
+                   count(*)
+            FROM survey_responses sr
+                     CROSS JOIN LATERAL jsonb_each_text(sr.response_data) AS answer(key, value)
+            WHERE sr.survey_id = %s
+            """ + period_filter.format(table="sr") + """
+              AND (answer.key IN ('Satisfaction', 'NPS_NPS_GROUP') OR answer.key LIKE 'Ab\\_%%')
+            GROUP BY 1, 2, 3, 4, 5, 6, 7, 8, 9
+            """,
+            params
+        )
+        rollup_rows = cursor.rowcount
+        if periods is None:
+            logger.info(f"Rebuilt {rollup_rows} rollup rows for survey {survey_uuid}")
+        else:
+            logger.info(f"Rebuilt {rollup_rows} rollup rows in {len(periods)} periods for survey {survey_uuid}")
+        return rollup_rows
+
+    def _write_response_batch(self, cursor, survey_uuid, responses_data, submission_periods=None, upsert=False,
+                              row_offset=0, table="survey_responses", content_hashes=None):
+        """Write one batch to table on an open cursor; rejected row indexes are shifted by row_offset"""
+        method = self.config.RESPONSES_LOAD_METHOD
+
+        if method == "row" and not upsert:
+            inserted_count, rejected_rows = self._insert_rows_individually(cursor, survey_uuid,
+                                                                           self._response_records(responses_data),
+                                                                           submission_periods, table, content_hashes)
+        else:
+            rows, rejected_rows = self._prepare_response_rows(survey_uuid, responses_data, submission_periods,
+                                                              content_hashes)
+            if upsert:
+                rows = self._dedupe_by_response_id(rows)
+            inserted_count, write_rejects = self._bulk_insert_rows(cursor, rows, method, upsert, table)
+            rejected_rows = sorted(rejected_rows + write_rejects, key=lambda r: r["row_index"])
+
+        if row_offset:
+            for rejected in rejected_rows:
+                rejected["row_index"] += row_offset
+
+        return inserted_count, rejected_rows
+
+    def _prepare_response_rows(self, survey_uuid, responses_data, submission_periods=None, content_hashes=None):
+        """Build (row_index, values) tuples for the bulk writers; rows that cannot be encoded are rejected"""
+        if isinstance(responses_data, pd.DataFrame):
+            return self._prepare_frame_rows(survey_uuid, responses_data, submission_periods, content_hashes)
+
+        if submission_periods is None:
+            submission_periods = compute_submission_periods([response.get('EndDate') for response in responses_data])
+
+        rows = []
+        rejected_rows = []
+
+        for idx, response in enumerate(responses_data):
+            try:
+                submitted_at, period_year, period_month = submission_periods[idx]
+                rows.append((idx, (
+                    survey_uuid,
+                    response.get('ResponseId'),
+                    submitted_at.isoformat() if submitted_at is not None else None,
+                    period_year,
+                    period_month,
+                    _encode_response(response),
+                    *_typed_values(response),
+                    content_hashes[idx] if content_hashes is not None else None
+                )))
+            except Exception as row_error:
+                logger.warning(f"Failed to prepare response {idx}: {row_error}")
+                rejected_rows.append({"row_index": idx, "error": str(row_error)})
+
+        return rows, rejected_rows
+
+    def _prepare_frame_rows(self, survey_uuid, responses_df, submission_periods=None, content_hashes=None):
+        """Columnar counterpart of _prepare_response_rows; the whole batch is JSON-encoded in one call"""
+        # NaN is written as null; string values cannot contain a raw newline in JSON, so lines map to rows
+        payloads = responses_df.to_json(orient="records", lines=True).split("\n")
+        response_ids = self._response_ids(responses_df)
+        if content_hashes is None:
+            content_hashes = [None] * len(responses_df)
+        if submission_periods is None:
+            end_dates = responses_df["EndDate"] if "EndDate" in responses_df.columns else [None] * len(responses_df)
+            submission_periods = compute_submission_periods(end_dates)
+
+        typed_columns = [
+            [_typed_value(value, column_type) for value in responses_df[key].tolist()]
+            if key in responses_df.columns else [None] * len(responses_df)
+            for _, key, column_type in RESPONSE_TYPED_FIELDS
+        ]
+
+        rows = [
+            (idx, (
+                survey_uuid,
+                response_id,
+                submitted_at.isoformat() if submitted_at is not None else None,
+                period_year,
+                period_month,
+                payload,
+                *typed_values,
+                content_hash
+            ))
+            for idx, (response_id, (submitted_at, period_year, period_month), payload, typed_values, content_hash)
+            in enumerate(zip(response_ids, submission_periods, payloads, zip(*typed_columns), content_hashes))
+        ]
+        return rows, []
+
+    def _response_records(self, responses_data):
+        if isinstance(responses_data, pd.DataFrame):
+            return responses_data.to_dict(orient="records")
+        return responses_data
+
+    def _response_ids(self, responses_data):
+        """ResponseId per row, None where it is missing"""
+        if not isinstance(responses_data, pd.DataFrame):
+            return [response.get('ResponseId') for response in responses_data]
+        if "ResponseId" not in responses_data.columns:
+            return [None] * len(responses_data)
+        response_ids = responses_data["ResponseId"]
+        return response_ids.astype(object).where(response_ids.notna(), None).tolist()
+
+    def _dedupe_by_response_id(self, rows):
+        """ON CONFLICT DO UPDATE cannot touch the same row twice in one statement; keep the last occurrence"""
+        latest = {}
+        for idx, values in rows:
+            response_id = values[1]
+            latest[response_id if response_id is not None else ("__row__", idx)] = (idx, values)
+        return sorted(latest.values(), key=lambda row: row[0])
+
+    def _bulk_insert_rows(self, cursor, rows, method="copy", upsert=False, table="survey_responses"):
+        """COPY all rows in one statement, falling back to execute_values pages if the server rejects the stream.
+
+        COPY cannot resolve conflicts, so upserts always go through the paged path.
+        """
+        if not rows:
+            return 0, []
+
+        if method == "copy" and not upsert:
+            cursor.execute("SAVEPOINT responses_copy")
+            try:
+                self._copy_rows(cursor, rows, table)
+                cursor.execute("RELEASE SAVEPOINT responses_copy")
+                return len(rows), []
+            except psycopg2.Error as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT responses_copy")
+                self.cancel_token.check()
+                logger.warning(f"COPY into {table} failed, falling back to paged inserts: {e}")
+
+        return self._insert_rows_paged(cursor, rows, upsert, table)
+
+    def _copy_rows(self, cursor, rows, table="survey_responses"):
+        copy_query = (f"COPY {table} ({', '.join(RESPONSE_COLUMNS)}) "
+                      f"FROM STDIN WITH (FORMAT csv)")
+        cursor.copy_expert(copy_query, _CopyRowStream(values for _, values in rows))
+
+    def _insert_rows_paged(self, cursor, rows, upsert=False, table="survey_responses"):
+        """execute_values pages under savepoints; a failing page is retried row by row to isolate rejects"""
+        conflict_clause = RESPONSE_UPSERT_CLAUSE if upsert else ""
+        insert_query = f"INSERT INTO {table} ({', '.join(RESPONSE_COLUMNS)}) VALUES %s {conflict_clause}"
+        placeholders = ", ".join(["%s"] * len(RESPONSE_COLUMNS))
+        row_query = (f"INSERT INTO {table} ({', '.join(RESPONSE_COLUMNS)}) "
+                     f"VALUES ({placeholders}) {conflict_clause}")
+        page_size = self.config.RESPONSES_LOAD_PAGE_SIZE
+
+        inserted_count = 0
+        rejected_rows = []
+
+        for start in range(0, len(rows), page_size):
+            page = rows[start:start + page_size]
+
+            cursor.execute("SAVEPOINT responses_page")
+            try:
+                execute_values(cursor, insert_query, [values for _, values in page], page_size=page_size)
+                cursor.execute("RELEASE SAVEPOINT responses_page")
+                inserted_count += len(page)
+                continue
+            except psycopg2.Error as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT responses_page")
+                self.cancel_token.check()
+                logger.warning(f"Insert page starting at row {page[0][0]} failed, retrying row by row: {e}")
+
+            for idx, values in page:
+                cursor.execute("SAVEPOINT responses_row")
+                try:
+                    cursor.execute(row_query, values)
+                    cursor.execute("RELEASE SAVEPOINT responses_row")
+                    inserted_count += 1
+                except psycopg2.Error as row_error:
+                    cursor.execute("ROLLBACK TO SAVEPOINT responses_row")
+                    self.cancel_token.check()
+                    logger.warning(f"Failed to insert response {idx}: {row_error}")
+                    rejected_rows.append({"row_index": idx, "error": str(row_error).strip()})
+
+        return inserted_count, rejected_rows
+
+    def _insert_rows_individually(self, cursor, survey_uuid, responses_data, submission_periods=None,
+                                  table="survey_responses", content_hashes=None):
+        """Original one-INSERT-per-row path, kept as the RESPONSES_LOAD_METHOD=row baseline"""
+        insert_query = f"""
+                       INSERT INTO {table}
+                       (survey_id, response_id, submitted_at, period_year, period_month,
+                        response_data, facility, gender, participant_type, satisfaction, nps, nps_group,
+                        content_hash)
+                       VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                       """
+
+        if submission_periods is None:
+            submission_periods = compute_submission_periods([response.get('EndDate') for response in responses_data])
+
+        inserted_count = 0
+        rejected_rows = []
+        for idx, response in enumerate(responses_data):
+            # A failed INSERT aborts the transaction; rolling back to the savepoint lets the next rows go in
+            cursor.execute("SAVEPOINT responses_row")
+            try:
+                submitted_at, period_year, period_month = submission_periods[idx]
+                cursor.execute(insert_query, (
+                    survey_uuid,
+                    response.get('ResponseId'),
+                    submitted_at,
+                    period_year,
+                    period_month,
+                    _encode_response(response),
+                    *_typed_values(response),
+                    content_hashes[idx] if content_hashes is not None else None
+                ))
+                cursor.execute("RELEASE SAVEPOINT responses_row")
+                inserted_count += 1
 
-                logger.info(f"Successfully inserted {inserted_count} responses using survey UUID {survey_uuid}")
-                return inserted_count
+            except Exception as row_error:
+                cursor.execute("ROLLBACK TO SAVEPOINT responses_row")
+                self.cancel_token.check()
+                logger.warning(f"Failed to insert response {idx}: {row_error}")
+                rejected_rows.append({"row_index": idx, "error": str(row_error)})
+                continue
 
-        except Exception as e:
-            logger.error(f"Failed to insert survey responses: {e}")
-            raise
\ No newline at end of file
+        return inserted_count, rejected_rows
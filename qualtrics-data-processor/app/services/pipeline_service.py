@@ -0,0 +1,165 @@
+import logging
+import queue
+import threading
+
+from .extract_service import DataExtractionService
+from .survey_metadata_cache import SurveyMetadataCache
+from .transform_service import DataTransformService
+from ..config.settings import get_config
+from ..utils.cancellation import CancellationToken
+
+logger = logging.getLogger(__name__)
+
+
+def create_cancel_token(deadline_seconds=None, survey_deadline_seconds=None):
+    """Token for one run; unset deadlines fall back to PIPELINE_DEADLINE_SECONDS / SURVEY_DEADLINE_SECONDS"""
+    config = get_config()
+    return CancellationToken(deadline_seconds or config.PIPELINE_DEADLINE_SECONDS or None,
+                             survey_deadline_seconds or config.SURVEY_DEADLINE_SECONDS or None)
+
+
+class PipelineService:
+    """Extract / transform-and-load / full pipeline runs shared by the API routes and background jobs"""
+
+    def __init__(self, progress_callback=None, cancel_token=None):
+        self.config = get_config()
+        self.progress_callback = progress_callback
+        self.cancel_token = cancel_token or create_cancel_token()
+        # One surveys lookup per run, shared by the extract and transform stages
+        self.metadata_cache = SurveyMetadataCache()
+
+    def extract_data(self, survey_ids=None, organisation_id=None):
+        extraction_service = DataExtractionService(progress_callback=self.progress_callback,
+                                                   metadata_cache=self.metadata_cache,
+                                                   cancel_token=self.cancel_token)
+
+        if survey_ids:
+            return extraction_service.extract_specific_surveys(survey_ids)
+        return extraction_service.extract_all_surveys(organisation_id)
+
+    def transform_and_load(self, survey_ids=None, organisation_id=None, force_mappings_update=False):
+        transform_service = DataTransformService(progress_callback=self.progress_callback,
+                                                 metadata_cache=self.metadata_cache,
+                                                 cancel_token=self.cancel_token)
+
+        if survey_ids:
+            return transform_service.transform_specific_surveys(survey_ids, force_mappings_update)
+        return transform_service.transform_and_load_all(organisation_id, force_mappings_update)
+
+    def full_pipeline(self, survey_ids=None, organisation_id=None, force_mappings_update=False):
+        if self.config.PIPELINE_MODE == "pipelined":
+            return self.pipelined_full_pipeline(survey_ids, organisation_id, force_mappings_update)
+
+        pipeline_result = {
+            "extract_phase": None,
+            "transform_phase": None,
+            "overall_success": False
+        }
+
+        # Phase 1
+        logger.info("Starting extract phase...")
+        extract_result = self.extract_data(survey_ids, organisation_id)
+        pipeline_result["extract_phase"] = extract_result
+
+        if not extract_result.get("success"):
+            logger.error("Extract phase failed, stopping pipeline")
+            return {"success": False, "data": pipeline_result, "error": "Extract phase failed"}
+
+        if self.cancel_token.cancelled:
+            logger.warning(f"Pipeline stopped after the extract phase: {self.cancel_token.reason}")
+            return {"success": False, "data": pipeline_result, "error": f"Pipeline {self.cancel_token.reason}"}
+
+        # Phase 2
+        logger.info("Starting transform and load phase...")
+        transform_result = self.transform_and_load(survey_ids, organisation_id, force_mappings_update)
+        pipeline_result["transform_phase"] = transform_result
+
+        if transform_result.get("success"):
+            pipeline_result["overall_success"] = True
+            logger.info("Full pipeline completed successfully")
+            return {"success": True, "data": pipeline_result}
+
+        logger.error("Transform phase failed")
+        return {"success": False, "data": pipeline_result, "error": "Transform and load phase failed"}
+
+    def pipelined_full_pipeline(self, survey_ids=None, organisation_id=None, force_mappings_update=False):
+        """full_pipeline with the stages overlapped: each survey is transformed and loaded as soon as its
+        extraction finishes, while the other surveys are still exporting.
+
+        Extracted surveys wait in a queue of PIPELINE_QUEUE_SIZE for the LOAD_MAX_WORKERS load threads; when it
+        is full the extract workers hold back. Surveys whose extraction failed are not transformed. Returns the same
+        structure as the phased run.
+        """
+        pipeline_result = {
+            "extract_phase": None,
+            "transform_phase": None,
+            "overall_success": False
+        }
+
+        if not survey_ids:
+            survey_ids = self.metadata_cache.get_active_survey_ids(organisation_id)
+            if not survey_ids:
+                pipeline_result["extract_phase"] = {"success": False, "error": "No surveys found in database"}
+                return {"success": False, "data": pipeline_result, "error": "Extract phase failed"}
+        self.metadata_cache.load(survey_ids)
+
+        extraction_service = DataExtractionService(progress_callback=self.progress_callback,
+                                                   metadata_cache=self.metadata_cache,
+                                                   cancel_token=self.cancel_token)
+        transform_service = DataTransformService(progress_callback=self.progress_callback,
+                                                 metadata_cache=self.metadata_cache,
+                                                 cancel_token=self.cancel_token)
+
+        extracted = queue.Queue(maxsize=self.config.PIPELINE_QUEUE_SIZE)
+        transform_results = {}
+
+        def on_extracted(survey_id, result):
+            if result.get("success"):
+                extracted.put(survey_id)
+
+        def transform_and_load_extracted():
+            while True:
+                survey_id = extracted.get()
+                if survey_id is None:
+                    return
+                try:
+                    transform_results[survey_id] = transform_service.transform_and_load_survey(
+                        survey_id, force_mappings_update)
+                except Exception as e:
+                    # Keep draining the queue, or the extract workers would block on a full one
+                    logger.error(f"[{survey_id}] Transform and load failed: {e}")
+
+        load_workers = min(self.config.LOAD_MAX_WORKERS, len(survey_ids))
+        logger.info(f"Starting pipelined extract, transform and load for {len(survey_ids)} surveys "
+                    f"({load_workers} load workers)")
+        with transform_service.transform_process_pool():
+            loaders = [threading.Thread(target=transform_and_load_extracted, name=f"pipeline-load-{i}", daemon=True)
+                       for i in range(load_workers)]
+            for loader in loaders:
+                loader.start()
+            try:
+                extract_result = extraction_service.extract_specific_surveys(survey_ids, on_extracted=on_extracted)
+            finally:
+                for _ in loaders:
+                    extracted.put(None)
+                for loader in loaders:
+                    loader.join()
+        pipeline_result["extract_phase"] = extract_result
+
+        extract_details = extract_result.get("data", {}).get("details", {})
+        results = {}
+        for survey_id in survey_ids:
+            if survey_id in transform_results:
+                results[survey_id] = transform_results[survey_id]
+            else:
+                error = f"Skipped: extraction failed: {extract_details.get(survey_id, {}).get('error')}"
+                results[survey_id] = {
+                    "mappings": {"success": False, "error": error},
+                    "responses": {"success": False, "error": error},
+                    "overall_success": False
+                }
+        pipeline_result["transform_phase"] = transform_service.summarize_results(survey_ids, results)
+        pipeline_result["overall_success"] = True
+
+        logger.info("Pipelined full pipeline completed")
+        return {"success": True, "data": pipeline_result}
@@ -1,35 +1,136 @@
+import random
+import threading
 import requests
 import time
 import logging
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+
 from ..config.settings import get_config
+from ..utils.metrics import metrics
+from ..utils.rate_limiter import RateLimiter
 
 logger = logging.getLogger(__name__)
 
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# One limiter per process so concurrent extraction workers share the Qualtrics request budget
+_rate_limiter = None
+
+# One pooled session per process so polls and downloads reuse kept-alive TLS connections
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_rate_limiter(config):
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter(config.QUALTRICS_MAX_REQUESTS_PER_SECOND)
+    return _rate_limiter
+
+
+def get_http_session(config):
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            # Retries are handled in QualtricsAPI.request so they go through the rate limiter and honour Retry-After
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.QUALTRICS_HTTP_POOL_SIZE, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+    return _session
+
+
 class QualtricsAPI:
     def __init__(self):
         self.config = get_config()
+        self.rate_limiter = get_rate_limiter(self.config)
+        self.session = get_http_session(self.config)
         self.headers = {
             "x-api-token": self.config.QUALTRICS_API_TOKEN,
             "content-type": "application/json"
         }
-        self.base_url = f"https://{self.config.QUALTRICS_DATA_CENTER}.qualtrics.com/API/v3"
+        self.base_url = (self.config.QUALTRICS_BASE_URL
+                         or f"https://{self.config.QUALTRICS_DATA_CENTER}.qualtrics.com/API/v3").rstrip("/")
+        self.timeout = (self.config.API_CONNECT_TIMEOUT, self.config.API_TIMEOUT)
+
+    def request(self, method: str, url: str, **kwargs):
+        """Send a request on the shared session.
+
+        429/5xx responses, connection errors and timeouts are retried up to QUALTRICS_MAX_RETRIES times with
+        exponential backoff and full jitter, or after the Retry-After delay when the server sends one. The
+        last response is returned as is, so callers still raise_for_status.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        max_retries = self.config.QUALTRICS_MAX_RETRIES
+
+        for attempt in range(max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                response = self.session.request(method, url, headers=self.headers, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == max_retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+                reason = str(e)
+            else:
+                metrics.inc("qualtrics_requests_total", method=method, status=str(response.status_code))
+                if response.status_code not in RETRY_STATUS_CODES or attempt == max_retries:
+                    return response
+                delay = self._retry_after_delay(response)
+                if delay is None:
+                    delay = self._backoff_delay(attempt)
+                reason = f"HTTP {response.status_code}"
+                response.close()
 
-    def start_export(self, survey_id: str, export_format: str = "csv"):
+            metrics.inc("qualtrics_retries_total", reason=reason if reason.startswith("HTTP") else "connection")
+            logger.warning(f"{method} {url} failed ({reason}), retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+    def _backoff_delay(self, attempt):
+        ceiling = min(self.config.QUALTRICS_RETRY_BACKOFF_MAX, self.config.QUALTRICS_RETRY_BACKOFF_BASE * 2 ** attempt)
+        return random.uniform(0, ceiling)
+
+    def _retry_after_delay(self, response):
+        retry_after = response.headers.get("Retry-After")
+        if not retry_after:
+            return None
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return min(max(delay, 0.0), self.config.QUALTRICS_RETRY_BACKOFF_MAX)
+
+    def start_export(self, survey_id: str, export_format: str = "csv", start_date: str = None,
+                     continuation_token: str = None, allow_continuation: bool = False):
         url = f"{self.base_url}/surveys/{survey_id}/export-responses/"
+        payload = self.export_payload(export_format, start_date, continuation_token, allow_continuation)
 
         try:
-            response = requests.post(
-                url,
-                headers=self.headers,
-                json={"format": export_format},
-                timeout=self.config.API_TIMEOUT
-            )
+            response = self.request("POST", url, json=payload)
             response.raise_for_status()
             return response.json()["result"]["progressId"]
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to start export for survey {survey_id}: {e}")
             raise
 
+    @staticmethod
+    def export_payload(export_format: str = "csv", start_date: str = None, continuation_token: str = None,
+                       allow_continuation: bool = False):
+        payload = {"format": export_format}
+        if continuation_token:
+            # Qualtrics rejects startDate together with a continuation token
+            payload["continuationToken"] = continuation_token
+        elif start_date:
+            payload["startDate"] = start_date
+        if allow_continuation:
+            payload["allowContinuation"] = True
+        return payload
+
     def get_survey_responses(self, survey_id: str, export_format: str = "csv"):
         return self.start_export(survey_id, export_format)
 
@@ -37,18 +138,30 @@ class QualtricsAPI:
         url = f"{self.base_url}/survey-definitions/{survey_id}"
 
         try:
-            response = requests.get(url, headers=self.headers)
+            response = self.request("GET", url)
             response.raise_for_status()
             return response.json()["result"]["Questions"]
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to get survey questions for {survey_id}: {e}")
             raise
 
+    def get_response_count(self, survey_id: str):
+        """Recorded responses of the survey (responseCounts.auditable), without starting an export"""
+        url = f"{self.base_url}/surveys/{survey_id}"
+
+        try:
+            response = self.request("GET", url)
+            response.raise_for_status()
+            return response.json()["result"]["responseCounts"]["auditable"]
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to get response count for {survey_id}: {e}")
+            raise
+
     def test_connection(self):
         url = f"{self.base_url}/whoami"
 
         try:
-            response = requests.get(url, headers=self.headers)
+            response = self.request("GET", url)
             response.raise_for_status()
             return True
         except requests.exceptions.RequestException as e:
@@ -0,0 +1,209 @@
+import logging
+import math
+import time
+from datetime import datetime, timezone
+
+from .job_service import PipelineJobService
+from .qualtrics_api import QualtricsAPI
+from ..config.database import db_manager
+from ..config.settings import get_config
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_CANDIDATES_QUERY = """
+    SELECT s.qualtrics_survey_id                                             AS survey_id,
+           s.organisation_id,
+           COALESCE(survey_schedule.refresh_interval_minutes,
+                    organisation_schedule.refresh_interval_minutes, %(default_interval)s) AS interval_minutes,
+           COALESCE(survey_schedule.enabled, organisation_schedule.enabled, true) AS enabled,
+           extraction.last_extracted_at,
+           state.response_count,
+           state.refreshed_at,
+           state.checked_at,
+           recent.responses                                                  AS recent_responses
+    FROM surveys s
+             LEFT JOIN refresh_schedules survey_schedule
+                       ON survey_schedule.survey_id = s.qualtrics_survey_id
+                           AND survey_schedule.organisation_id IS NULL
+             LEFT JOIN refresh_schedules organisation_schedule
+                       ON organisation_schedule.organisation_id = s.organisation_id
+                           AND organisation_schedule.survey_id IS NULL
+             LEFT JOIN survey_refresh_state state ON state.survey_id = s.qualtrics_survey_id
+             LEFT JOIN LATERAL (
+        SELECT MAX(extracted_at) AS last_extracted_at
+        FROM survey_responses_extraction_log log
+        WHERE log.survey_id = s.qualtrics_survey_id
+        ) extraction ON true
+             LEFT JOIN LATERAL (
+        SELECT COUNT(*) AS responses
+        FROM survey_responses r
+        WHERE r.survey_id = s.id
+          AND r.submitted_at >= now() - make_interval(days => %(velocity_days)s)
+        ) recent ON true
+    WHERE s.status = 'active'
+"""
+
+
+class RefreshScheduler:
+    """Refreshes active surveys on their own schedule instead of waiting for API calls.
+
+    A survey is due once its refresh interval has passed since it was last extracted or last checked. Due
+    surveys are ranked by how overdue they are, weighted up by their responses per day over the last
+    SCHEDULER_VELOCITY_DAYS, and at most SCHEDULER_MAX_SURVEYS_PER_RUN of them go into one full pipeline
+    job, whose extract and load workers cap the concurrency. Before a survey is picked its Qualtrics response
+    count is compared with the one recorded at its last refresh, and unchanged surveys are only marked as
+    checked.
+    """
+
+    def __init__(self, organisation_id=None):
+        self.config = get_config()
+        self.organisation_id = organisation_id
+        self.api_client = QualtricsAPI()
+        self.job_service = PipelineJobService()
+
+    def run_forever(self):
+        logger.info(f"Scheduler started, checking every {self.config.SCHEDULER_TICK_SECONDS}s"
+                    + (f" for organisation {self.organisation_id}" if self.organisation_id else ""))
+        while True:
+            started = time.monotonic()
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Scheduled refresh failed: {e}")
+            # A long run delays the next tick rather than overlapping with it
+            time.sleep(max(self.config.SCHEDULER_TICK_SECONDS - (time.monotonic() - started), 0))
+
+    def run_once(self):
+        now = datetime.now(timezone.utc)
+        due_surveys = self.select_due_surveys(self.get_candidates(), now)
+        if not due_surveys:
+            logger.info("No surveys due for refresh")
+            return {"success": True, "data": {"refreshed": [], "skipped_unchanged": [], "job_id": None}}
+
+        selected, skipped_unchanged = self._pick_surveys_with_new_responses(due_surveys, now)
+        if skipped_unchanged:
+            self._mark_checked(skipped_unchanged, now)
+            logger.info(f"Skipping {len(skipped_unchanged)} due surveys without new responses")
+
+        if not selected:
+            return {"success": True, "data": {"refreshed": [], "skipped_unchanged": skipped_unchanged,
+                                              "job_id": None}}
+
+        survey_ids = [survey["survey_id"] for survey in selected]
+        logger.info(f"Refreshing {len(survey_ids)} of {len(due_surveys)} due surveys: {', '.join(survey_ids)}")
+        job_id, result = self.job_service.run("full_pipeline", {"survey_ids": survey_ids, "trigger": "scheduler"})
+        self._record_refresh_results(selected, result, datetime.now(timezone.utc))
+
+        return {
+            "success": bool(result and result.get("success")),
+            "data": {"refreshed": survey_ids, "skipped_unchanged": skipped_unchanged, "job_id": job_id}
+        }
+
+    def get_candidates(self):
+        params = {"default_interval": self.config.SCHEDULER_DEFAULT_INTERVAL_MINUTES,
+                  "velocity_days": self.config.SCHEDULER_VELOCITY_DAYS}
+        query = SCHEDULE_CANDIDATES_QUERY
+        if self.organisation_id:
+            query += " AND s.organisation_id = %(organisation_id)s"
+            params["organisation_id"] = self.organisation_id
+
+        try:
+            with db_manager.get_cursor() as cursor:
+                cursor.execute(query, params)
+                return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Failed to load refresh candidates: {e}")
+            raise
+
+    def select_due_surveys(self, candidates, now):
+        """Enabled surveys past their interval, most urgent first; never extracted surveys lead"""
+        due_surveys = []
+        for survey in candidates:
+            if not survey["enabled"]:
+                continue
+            last_seen = max((at for at in (survey["last_extracted_at"], survey["checked_at"]) if at), default=None)
+            interval_seconds = survey["interval_minutes"] * 60
+            if last_seen is None:
+                survey["priority"] = math.inf
+            else:
+                overdue = (now - last_seen).total_seconds() / interval_seconds
+                if overdue < 1:
+                    continue
+                responses_per_day = survey["recent_responses"] / self.config.SCHEDULER_VELOCITY_DAYS
+                survey["priority"] = overdue * (1 + math.log1p(responses_per_day))
+            due_surveys.append(survey)
+
+        return sorted(due_surveys, key=lambda survey: survey["priority"], reverse=True)
+
+    def _pick_surveys_with_new_responses(self, due_surveys, now):
+        """(surveys to refresh, ids skipped as unchanged), filling SCHEDULER_MAX_SURVEYS_PER_RUN in priority order"""
+        selected = []
+        skipped_unchanged = []
+        for survey in due_surveys:
+            if len(selected) >= self.config.SCHEDULER_MAX_SURVEYS_PER_RUN:
+                break
+
+            survey_id = survey["survey_id"]
+            try:
+                survey["current_response_count"] = self.api_client.get_response_count(survey_id)
+            except Exception as e:
+                logger.warning(f"[{survey_id}] Could not read response count, refreshing anyway: {e}")
+                survey["current_response_count"] = None
+                selected.append(survey)
+                continue
+
+            if self._is_unchanged(survey, now):
+                skipped_unchanged.append(survey_id)
+            else:
+                selected.append(survey)
+
+        return selected, skipped_unchanged
+
+    def _is_unchanged(self, survey, now):
+        if survey["response_count"] is None or survey["refreshed_at"] is None:
+            return False
+        if survey["current_response_count"] != survey["response_count"]:
+            return False
+        hours_since_refresh = (now - survey["refreshed_at"]).total_seconds() / 3600
+        return hours_since_refresh < self.config.SCHEDULER_FORCE_REFRESH_HOURS
+
+    def _mark_checked(self, survey_ids, checked_at):
+        with db_manager.get_cursor() as cursor:
+            cursor.executemany(
+                """
+                INSERT INTO survey_refresh_state (survey_id, checked_at)
+                VALUES (%s, %s)
+                ON CONFLICT (survey_id) DO UPDATE SET checked_at = EXCLUDED.checked_at
+                """,
+                [(survey_id, checked_at) for survey_id in survey_ids]
+            )
+
+    def _record_refresh_results(self, surveys, result, refreshed_at):
+        """Store the pre-export response count of fully loaded surveys; failed ones wait one interval to retry"""
+        transform_phase = ((result or {}).get("data") or {}).get("transform_phase") or {}
+        details = transform_phase.get("data", {}).get("details", {})
+
+        refreshed = []
+        failed = []
+        for survey in surveys:
+            if details.get(survey["survey_id"], {}).get("overall_success"):
+                refreshed.append((survey["survey_id"], survey["current_response_count"], refreshed_at, refreshed_at))
+            else:
+                failed.append(survey["survey_id"])
+
+        with db_manager.get_cursor() as cursor:
+            if refreshed:
+                cursor.executemany(
+                    """
+                    INSERT INTO survey_refresh_state (survey_id, response_count, refreshed_at, checked_at)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (survey_id) DO UPDATE
+                        SET response_count = EXCLUDED.response_count,
+                            refreshed_at   = EXCLUDED.refreshed_at,
+                            checked_at     = EXCLUDED.checked_at
+                    """,
+                    refreshed
+                )
+        if failed:
+            logger.warning(f"Scheduled refresh failed for {len(failed)} surveys: {', '.join(failed)}")
+            self._mark_checked(failed, refreshed_at)
@@ -0,0 +1,119 @@
+import logging
+import threading
+
+from ..config.database import db_manager
+
+logger = logging.getLogger(__name__)
+
+SURVEY_METADATA_COLUMNS = """
+    id,
+    qualtrics_survey_id,
+    status,
+    organisation_id,
+    service_type,
+    (field_mapping IS NOT NULL
+        AND field_mapping != '{}'::jsonb) AS has_mappings,
+    (field_mapping IS NOT NULL
+        AND field_mapping != '{}'::jsonb
+        AND field_mapping != 'null'::jsonb) AS has_field_mapping
+"""
+
+
+class SurveyMetadataCache:
+    """Per-run cache of surveys rows keyed by qualtrics_survey_id.
+
+    Filled with one query for all target surveys at the start of a run; single surveys missing from it are
+    looked up lazily. Call invalidate() after writing to a survey row so the next read sees the change.
+    """
+
+    def __init__(self):
+        self._surveys = {}
+        self._lock = threading.Lock()
+
+    def load(self, qualtrics_survey_ids):
+        """Fetch metadata for the given, not yet cached surveys in one query; unknown ids are remembered as missing"""
+        with self._lock:
+            survey_ids = [survey_id for survey_id in dict.fromkeys(qualtrics_survey_ids or [])
+                          if survey_id not in self._surveys]
+        if not survey_ids:
+            return
+
+        try:
+            with db_manager.get_cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    SELECT {SURVEY_METADATA_COLUMNS}
+                    FROM surveys
+                    WHERE qualtrics_survey_id = ANY(%s)
+                    """,
+                    (survey_ids,)
+                )
+                rows = cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Failed to load survey metadata: {e}")
+            raise
+
+        with self._lock:
+            for survey_id in survey_ids:
+                self._surveys[survey_id] = None
+            self._store_rows(rows)
+
+    def get_active_survey_ids(self, organisation_id=None):
+        """Active qualtrics survey ids (optionally for one organisation), caching their metadata on the way"""
+        try:
+            with db_manager.get_cursor() as cursor:
+                if organisation_id:
+                    query = f"""
+                            SELECT {SURVEY_METADATA_COLUMNS}
+                            FROM surveys
+                            WHERE organisation_id = %s
+                              AND status = 'active'
+                            ORDER BY qualtrics_survey_id
+                            """
+                    cursor.execute(query, (organisation_id,))
+                else:
+                    query = f"""
+                            SELECT {SURVEY_METADATA_COLUMNS}
+                            FROM surveys
+                            WHERE status = 'active'
+                            ORDER BY qualtrics_survey_id
+                            """
+                    cursor.execute(query)
+
+                rows = cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Failed to get survey IDs from database: {e}")
+            raise
+
+        with self._lock:
+            self._store_rows(rows)
+
+        return list(dict.fromkeys(row['qualtrics_survey_id'] for row in rows))
+
+    def get(self, qualtrics_survey_id):
+        """Metadata dict for the survey, or None when it is not in the surveys table"""
+        with self._lock:
+            if qualtrics_survey_id in self._surveys:
+                return self._surveys[qualtrics_survey_id]
+
+        self.load([qualtrics_survey_id])
+
+        with self._lock:
+            return self._surveys.get(qualtrics_survey_id)
+
+    def invalidate(self, qualtrics_survey_id=None):
+        with self._lock:
+            if qualtrics_survey_id is None:
+                self._surveys.clear()
+            else:
+                self._surveys.pop(qualtrics_survey_id, None)
+
+    def _store_rows(self, rows):
+        seen = set()
+        for row in rows:
+            survey_id = row['qualtrics_survey_id']
+            # Like the fetchone() lookups this replaces, the first row wins for duplicated qualtrics ids
+            if survey_id in seen:
+                continue
+            seen.add(survey_id)
+            self._surveys[survey_id] = dict(row)
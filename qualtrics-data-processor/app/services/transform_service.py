@@ -1,21 +1,53 @@
+import multiprocessing
 import pandas as pd
 import logging
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
 from typing import Dict, Any
 
 from ..config.settings import get_config
-from ..utils.file_utils import find_latest_csv
+from ..utils.cancellation import CancellationToken, PipelineCancelled
+from ..utils.columnar_utils import QUALTRICS_HEADER_ROWS, iter_columnar_batches, iter_csv_batches, read_columnar, \
+    read_columnar_column_names, read_csv_column_names, read_csv_columns
+from ..utils.date_utils import compute_submission_periods
+from ..utils.file_utils import find_latest_extract
+from ..utils.metrics import metrics, rounded_timings, stage_timings, timed
 from ..config.database import db_manager
-from .load_service import DataLoadService
+from .load_service import DataLoadService, response_content_hashes
+from .survey_metadata_cache import SurveyMetadataCache
+from .watermark_service import ExtractionWatermarkService
 
 logger = logging.getLogger(__name__)
 
+# Free-text response fields; every other kept column holds a handful of choice codes and is read as a categorical
+RESPONSE_TEXT_FIELDS = {"ResponseId", "EndDate"}
+
+# Per-process transform service of the TRANSFORM_MAX_WORKERS pool
+_worker_service = None
+
+
+def _read_and_transform_in_worker(extract_file):
+    """Process pool entry point; parsing and transforming touch no database state"""
+    global _worker_service
+    if _worker_service is None:
+        _worker_service = DataTransformService()
+    return _worker_service._read_and_transform(extract_file)
+
 
 class DataTransformService:
-    def __init__(self):
+    def __init__(self, progress_callback=None, metadata_cache=None, cancel_token=None):
         self.config = get_config()
-        self.load_service = DataLoadService()
-
-        self.key_fields = ["Facility", "Satisfaction", "EndDate", "NPS", "NPS_NPS_GROUP", "Gender", "ParticipantType"]
+        # progress_callback(survey_id, stage, **details), used by background jobs to report per-survey progress
+        self.progress_callback = progress_callback
+        self.metadata_cache = metadata_cache or SurveyMetadataCache()
+        self.cancel_token = cancel_token or CancellationToken()
+        self.load_service = DataLoadService(metadata_cache=self.metadata_cache, cancel_token=self.cancel_token)
+        self.watermark_service = ExtractionWatermarkService()
+        # Set by transform_process_pool() while TRANSFORM_MAX_WORKERS > 1
+        self._process_pool = None
+
+        self.key_fields = ["ResponseId", "Facility", "Satisfaction", "EndDate", "NPS", "NPS_NPS_GROUP", "Gender", "ParticipantType"]
         self.key_fields_prefixes = ["Ab_"]
         self.allowed_keys_dict = ["ServiceType", "Facility", "Satisfaction", "Gender", "ParticipantType"]
         self.allowed_prefixes = ["Ab_"]
@@ -37,29 +69,94 @@ class DataTransformService:
         if not survey_ids:
             return {"success": False, "error": "No survey IDs provided"}
 
-        results = {}
         logger.info(f"Starting transform and load for {len(survey_ids)} surveys: {', '.join(survey_ids)}")
 
-        for survey_id in survey_ids:
+        self.metadata_cache.load(survey_ids)
+
+        if self.config.LOAD_MAX_WORKERS > 1 or self.config.TRANSFORM_MAX_WORKERS > 1:
+            results = self._transform_and_load_parallel(survey_ids, force_mappings_update)
+        else:
+            results = {survey_id: self.transform_and_load_survey(survey_id, force_mappings_update)
+                       for survey_id in survey_ids}
+
+        return self.summarize_results(survey_ids, results)
+
+    def _transform_and_load_parallel(self, survey_ids, force_mappings_update=False):
+        """Surveys run LOAD_MAX_WORKERS at a time, each loaded in its own transaction, keeping survey_ids order"""
+        load_workers = min(self.config.LOAD_MAX_WORKERS, len(survey_ids))
+        logger.info(f"Transforming and loading {len(survey_ids)} surveys with {load_workers} load workers and "
+                    f"{self.config.TRANSFORM_MAX_WORKERS} transform processes")
+
+        with self.transform_process_pool():
+            with ThreadPoolExecutor(max_workers=load_workers, thread_name_prefix="load") as executor:
+                futures = {survey_id: executor.submit(self.transform_and_load_survey, survey_id,
+                                                      force_mappings_update)
+                           for survey_id in survey_ids}
+
+        return {survey_id: future.result() for survey_id, future in futures.items()}
+
+    @contextmanager
+    def transform_process_pool(self):
+        """With TRANSFORM_MAX_WORKERS > 1, parse and transform extracts in worker processes for the duration.
+
+        Only the CPU-bound part moves: duplicate checks, watermarks and loading stay in the calling threads.
+        Streamed surveys are parsed chunk by chunk inside their load and are not offloaded.
+        """
+        if self.config.TRANSFORM_MAX_WORKERS <= 1 or self._process_pool is not None:
+            yield
+            return
+
+        # spawn: forking a process that runs pool and executor threads can copy held locks
+        self._process_pool = ProcessPoolExecutor(max_workers=self.config.TRANSFORM_MAX_WORKERS,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        try:
+            yield
+        finally:
+            pool, self._process_pool = self._process_pool, None
+            pool.shutdown()
+
+    def transform_and_load_survey(self, survey_id, force_mappings_update=False):
+        """Mappings and responses of one survey, with its per-stage timings"""
+        with stage_timings() as timings, self.cancel_token.survey_scope():
             try:
-                mappings_result = self._process_survey_mappings(survey_id, force_mappings_update)
+                self.cancel_token.check()
+                self._report_progress(survey_id, "transforming")
+
+                with timed("mappings"):
+                    mappings_result = self._process_survey_mappings(survey_id, force_mappings_update)
 
                 responses_result = self._process_survey_responses(survey_id)
 
-                results[survey_id] = {
+                result = {
                     "mappings": mappings_result,
                     "responses": responses_result,
                     "overall_success": mappings_result.get("success", False) and responses_result.get("success", False)
                 }
 
+            except PipelineCancelled as e:
+                logger.warning(f"[{survey_id}] Transform and load not started: {e}")
+                result = {
+                    "mappings": {"success": False, "error": str(e)},
+                    "responses": {"success": False, "error": str(e)},
+                    "overall_success": False
+                }
             except Exception as e:
                 logger.error(f"[{survey_id}] Transform and load failed: {e}")
-                results[survey_id] = {
+                result = {
                     "mappings": {"success": False, "error": str(e)},
                     "responses": {"success": False, "error": "Skipped due to mappings failure"},
                     "overall_success": False
                 }
+        result["timings"] = rounded_timings(timings)
+
+        if result["overall_success"]:
+            self._report_progress(survey_id, "loaded", inserted_count=result["responses"].get("inserted_count", 0))
+        else:
+            self._report_progress(survey_id, "failed")
+
+        return result
 
+    def summarize_results(self, survey_ids, results):
         successful = sum(1 for result in results.values() if result["overall_success"])
         total = len(survey_ids)
 
@@ -109,41 +206,74 @@ class DataTransformService:
         try:
             dup_check = self._is_latest_duplicate_download(survey_id)
             if dup_check.get("is_duplicate"):
-                logger.info(f"[{survey_id}] Latest download hash equals previous one; skip transform & load.")
-                return {
-                    "success": True,
-                    "survey_id": survey_id,
-                    "action": "skipped_duplicate",
-                    "reason": "latest_two_file_hash_equal",
-                    "transformed_count": 0,
-                    "responses_data": [],
-                    "total_records_in_csv": 0,
-                    "hash": dup_check.get("latest_hash"),
-                }
+                return self._skipped_duplicate_result(survey_id, dup_check)
 
             logger.info(f"[{survey_id}] Transforming responses")
 
-            csv_file = find_latest_csv(self.config.DATA_DIR, survey_id)
-            df_responses = pd.read_csv(csv_file)
-
-            responses_data = self._transform_responses_data(df_responses)
+            extract_file = find_latest_extract(self.config.DATA_DIR, survey_id)
+            watermark_file, load_mode = self._get_pending_watermark(survey_id, extract_file)
+
+            if self._process_pool:
+                future = self._process_pool.submit(_read_and_transform_in_worker, extract_file)
+                try:
+                    responses_data, submission_periods, content_hashes = future.result(
+                        timeout=self.cancel_token.remaining())
+                # Not the builtin TimeoutError before Python 3.11
+                except FutureTimeoutError:
+                    future.cancel()
+                    self.cancel_token.check()
+                    raise
+            else:
+                responses_data, submission_periods, content_hashes = self._read_and_transform(extract_file)
+            # Same count as len(pd.read_csv(...)), which includes the two Qualtrics header rows
+            total_records = len(responses_data) + QUALTRICS_HEADER_ROWS
+            metrics.inc("rows_transformed_total", len(responses_data))
 
             return {
                 "success": True,
                 "survey_id": survey_id,
                 "transformed_count": len(responses_data),
                 "responses_data": responses_data,
-                "total_records_in_csv": len(df_responses)
+                "submission_periods": submission_periods,
+                "content_hashes": content_hashes,
+                "load_mode": load_mode,
+                "watermark_file": watermark_file,
+                "total_records_in_csv": total_records
             }
 
         except FileNotFoundError:
-            error_msg = f"CSV file not found for survey {survey_id}"
+            error_msg = f"Extract file not found for survey {survey_id}"
             logger.error(f"[{survey_id}] {error_msg}")
             return {"success": False, "error": error_msg}
         except Exception as e:
             logger.error(f"[{survey_id}] Failed to transform responses: {e}")
             return {"success": False, "error": str(e)}
 
+    def _report_progress(self, survey_id, stage, **details):
+        if not self.progress_callback:
+            return
+        try:
+            self.progress_callback(survey_id, stage, **details)
+        except Exception as e:
+            logger.warning(f"[{survey_id}] Progress callback failed: {e}")
+
+    def _skipped_duplicate_result(self, survey_id: str, dup_check: dict):
+        logger.info(f"[{survey_id}] Latest download hash equals previous one; skip transform & load.")
+        watermark_file = None
+        if self.config.INCREMENTAL_EXPORT:
+            extract_file = find_latest_extract(self.config.DATA_DIR, survey_id)
+            watermark_file, _ = self._get_pending_watermark(survey_id, extract_file)
+        return {
+            "success": True,
+            "survey_id": survey_id,
+            "action": "skipped_duplicate",
+            "reason": "latest_two_file_hash_equal",
+            "transformed_count": 0,
+            "total_records_in_csv": 0,
+            "hash": dup_check.get("latest_hash"),
+            "watermark_file": watermark_file,
+        }
+
     def _process_survey_mappings(self, survey_id: str, force_update=False):
         try:
             if not force_update and self.load_service.check_survey_mappings_exist(survey_id):
@@ -157,7 +287,7 @@ class DataTransformService:
             logger.info(f"[{survey_id}] Need to extract questions for mappings")
 
             from .extract_service import DataExtractionService
-            extract_service = DataExtractionService()
+            extract_service = DataExtractionService(metadata_cache=self.metadata_cache)
 
             questions_result = extract_service.extract_survey_definitions(survey_id)
 
@@ -191,17 +321,38 @@ class DataTransformService:
             return {"success": False, "error": str(e)}
 
     def _process_survey_responses(self, survey_id: str):
+        if self.config.STREAMING_PIPELINE:
+            return self._process_survey_responses_streaming(survey_id)
+
         try:
-            transform_result = self.transform_survey_responses(survey_id)
+            with timed("transform"):
+                transform_result = self.transform_survey_responses(survey_id)
 
             if not transform_result.get("success"):
                 return transform_result
 
+            watermark_file = transform_result.pop("watermark_file", None)
+
             if transform_result.get("action") == "skipped_duplicate":
+                if watermark_file:
+                    self.watermark_service.commit(survey_id, watermark_file)
                 return transform_result
 
-            responses_data = transform_result.get("responses_data", [])
-            load_result = self.load_service.load_survey_responses(survey_id, responses_data)
+            # The transformed frame goes to the loader only; it is never echoed back in the API response
+            submission_periods = transform_result.pop("submission_periods", None)
+            content_hashes = transform_result.pop("content_hashes", None)
+            responses_data = transform_result.pop("responses_data")
+            upsert = transform_result.get("load_mode") == "upsert"
+            self.cancel_token.check()
+            with timed("load"):
+                load_result = self.load_service.load_survey_responses(survey_id, responses_data,
+                                                                      replace_existing=not upsert,
+                                                                      submission_periods=submission_periods,
+                                                                      upsert=upsert, content_hashes=content_hashes)
+
+            if load_result.get("success") and watermark_file:
+                last_end_date = max((period[0] for period in submission_periods or [] if period[0]), default=None)
+                self.watermark_service.commit(survey_id, watermark_file, last_end_date)
 
             combined_result = {
                 **transform_result,
@@ -214,6 +365,99 @@ class DataTransformService:
             logger.error(f"[{survey_id}] Failed to process responses: {e}")
             return {"success": False, "error": str(e)}
 
+    def _process_survey_responses_streaming(self, survey_id: str):
+        """Transform and load the latest CSV in STREAM_CHUNK_ROWS batches; responses are not echoed back"""
+        try:
+            dup_check = self._is_latest_duplicate_download(survey_id)
+            if dup_check.get("is_duplicate"):
+                result = self._skipped_duplicate_result(survey_id, dup_check)
+                watermark_file = result.pop("watermark_file", None)
+                if watermark_file:
+                    self.watermark_service.commit(survey_id, watermark_file)
+                return result
+
+            logger.info(f"[{survey_id}] Streaming transform and load of responses")
+
+            extract_file = find_latest_extract(self.config.DATA_DIR, survey_id)
+            watermark_file, load_mode = self._get_pending_watermark(survey_id, extract_file)
+            upsert = load_mode == "upsert"
+
+            stats = {"transformed_count": 0, "last_end_date": None}
+            batches = self._iter_response_batches(extract_file, stats)
+            # Batches are read and transformed while the load consumes them; that time counts as transform
+            with timed("load", exclude="transform"):
+                load_result = self.load_service.load_survey_responses_batches(survey_id, batches,
+                                                                              replace_existing=not upsert,
+                                                                              upsert=upsert)
+
+            if load_result.get("success") and watermark_file:
+                self.watermark_service.commit(survey_id, watermark_file, stats["last_end_date"])
+
+            return {
+                "success": load_result.get("success", False),
+                "survey_id": survey_id,
+                "transformed_count": stats["transformed_count"],
+                # Same count as len(pd.read_csv(...)), which includes the two Qualtrics header rows
+                "total_records_in_csv": stats["transformed_count"] + QUALTRICS_HEADER_ROWS,
+                "load_mode": load_mode,
+                **load_result
+            }
+
+        except FileNotFoundError:
+            error_msg = f"Extract file not found for survey {survey_id}"
+            logger.error(f"[{survey_id}] {error_msg}")
+            return {"success": False, "error": error_msg}
+        except Exception as e:
+            logger.error(f"[{survey_id}] Failed to process responses: {e}")
+            return {"success": False, "error": str(e)}
+
+    def _iter_response_batches(self, extract_file, stats):
+        """Yield (responses DataFrame, submission_periods, content_hashes) per chunk, reading only the kept columns"""
+        chunks = iter(self._read_responses(extract_file, chunksize=self.config.STREAM_CHUNK_ROWS))
+        while True:
+            with timed("transform"):
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                responses_data, submission_periods, content_hashes = self._transform_responses_data(chunk)
+            stats["transformed_count"] += len(responses_data)
+            metrics.inc("rows_transformed_total", len(responses_data))
+            chunk_last = max((period[0] for period in submission_periods if period[0]), default=None)
+            if chunk_last and (stats["last_end_date"] is None or chunk_last > stats["last_end_date"]):
+                stats["last_end_date"] = chunk_last
+            yield responses_data, submission_periods, content_hashes
+
+    def _read_responses(self, extract_file, chunksize=None):
+        """Kept response columns of an extract, data rows only; an iterator of DataFrames when chunksize is set"""
+        if extract_file.suffix != ".csv":
+            selected_cols = self._select_response_columns(read_columnar_column_names(extract_file))
+            if chunksize:
+                return iter_columnar_batches(extract_file, selected_cols, chunksize)
+            return read_columnar(extract_file, selected_cols)
+
+        if self.config.CSV_READ_ENGINE == "pyarrow":
+            selected_cols = self._select_response_columns(read_csv_column_names(extract_file))
+            if chunksize:
+                return iter_csv_batches(extract_file, selected_cols, chunksize)
+            return read_csv_columns(extract_file, selected_cols)
+
+        # Unused columns are never parsed and the two Qualtrics metadata rows never reach the frame
+        return pd.read_csv(extract_file, usecols=self._is_response_column, skiprows=[1, 2],
+                           dtype=defaultdict(lambda: "category", {field: str for field in RESPONSE_TEXT_FIELDS}),
+                           chunksize=chunksize)
+
+    def _get_pending_watermark(self, survey_id: str, extract_file):
+        """(watermark_file, load_mode) for extract_file; deltas from an incremental export are upserted"""
+        if not self.config.INCREMENTAL_EXPORT:
+            return None, "replace"
+
+        watermark = self.watermark_service.get_watermark(survey_id)
+        if not watermark or watermark.get("pending_file_name") != extract_file.name:
+            return None, "replace"
+
+        load_mode = "upsert" if watermark.get("pending_mode") == "incremental" else "replace"
+        return extract_file.name, load_mode
+
     def _is_latest_duplicate_download(self, survey_id: str) -> dict:
         try:
             with db_manager.get_cursor() as cursor:
@@ -271,41 +515,24 @@ class DataTransformService:
 
         return transformed_fields
 
-    def _transform_responses_data(self, df):
-        prefix_cols = [col for col in df.columns
+    def _is_response_column(self, col):
+        return col in self.key_fields or any(col.startswith(p) for p in self.key_fields_prefixes)
+
+    def _select_response_columns(self, columns):
+        prefix_cols = [col for col in columns
                        if any(col.startswith(p) for p in self.key_fields_prefixes)]
-        available_cols = [col for col in (self.key_fields + prefix_cols)
-                          if col in df.columns]
+        return [col for col in (self.key_fields + prefix_cols) if col in columns]
 
-        df_selected = df[available_cols]
+    def _read_and_transform(self, extract_file):
+        return self._transform_responses_data(self._read_responses(extract_file))
 
-        data = df_selected.to_dict(orient='records')[2:]
-        return data
+    def _transform_responses_data(self, df):
+        """(kept columns as a DataFrame, submission_periods, content_hashes); the loader JSON-encodes the frame
+        per batch and, with RESPONSES_REPLACE_STRATEGY=diff, only writes rows whose content hash changed"""
+        df_selected = df[self._select_response_columns(df.columns)].reset_index(drop=True)
+        end_dates = df_selected["EndDate"] if "EndDate" in df_selected.columns else [None] * len(df_selected)
+        submission_periods = compute_submission_periods(end_dates)
+        return df_selected, submission_periods, response_content_hashes(df_selected)
 
     def _get_all_survey_ids_from_db(self, organisation_id=None):
-        try:
-            with db_manager.get_cursor() as cursor:
-                if organisation_id:
-                    query = """
-                            SELECT DISTINCT qualtrics_survey_id
-                            FROM surveys
-                            WHERE organisation_id = %s \
-                              and status = 'active'
-                            ORDER BY qualtrics_survey_id
-                            """
-                    cursor.execute(query, (organisation_id,))
-                else:
-                    query = """
-                            SELECT DISTINCT qualtrics_survey_id
-                            FROM surveys
-                            WHERE status = 'active'
-                            ORDER BY qualtrics_survey_id
-                            """
-                    cursor.execute(query)
-
-                results = cursor.fetchall()
-                return [row['qualtrics_survey_id'] for row in results]
-
-        except Exception as e:
-            logger.error(f"Failed to get survey IDs from database: {e}")
-            raise
\ No newline at end of file
+        return self.metadata_cache.get_active_survey_ids(organisation_id)
@@ -0,0 +1,89 @@
+import logging
+from datetime import datetime, timezone
+
+from ..config.database import db_manager
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionWatermarkService:
+    """Per-survey high-water mark for incremental exports (survey_responses_extraction_watermark)"""
+
+    def get_watermark(self, survey_id):
+        try:
+            with db_manager.get_cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT continuation_token, last_end_date, pending_continuation_token,
+                           pending_file_name, pending_mode
+                    FROM survey_responses_extraction_watermark
+                    WHERE survey_id = %s
+                    """,
+                    (survey_id,)
+                )
+                row = cursor.fetchone()
+                return dict(row) if row else None
+        except Exception as e:
+            logger.error(f"[{survey_id}] Failed to read extraction watermark: {e}")
+            raise
+
+    def build_export_options(self, watermark):
+        """Export request options for the next delta; an empty dict means a full export"""
+        if not watermark:
+            return {}
+
+        if watermark.get("continuation_token"):
+            return {"continuation_token": watermark["continuation_token"]}
+
+        if watermark.get("last_end_date"):
+            start_date = watermark["last_end_date"].astimezone(timezone.utc)
+            return {"start_date": start_date.strftime("%Y-%m-%dT%H:%M:%SZ")}
+
+        return {}
+
+    def set_pending(self, survey_id, file_name, continuation_token, mode):
+        try:
+            with db_manager.get_cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO survey_responses_extraction_watermark
+                        (survey_id, pending_continuation_token, pending_file_name, pending_mode, updated_at)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON CONFLICT (survey_id) DO UPDATE
+                        SET pending_continuation_token = EXCLUDED.pending_continuation_token,
+                            pending_file_name          = EXCLUDED.pending_file_name,
+                            pending_mode               = EXCLUDED.pending_mode,
+                            updated_at                 = EXCLUDED.updated_at
+                    """,
+                    (survey_id, continuation_token, file_name, mode, datetime.now(timezone.utc))
+                )
+                logger.info(f"[{survey_id}] Pending watermark recorded for {file_name} ({mode})")
+        except Exception as e:
+            logger.error(f"[{survey_id}] Failed to record pending watermark: {e}")
+            raise
+
+    def commit(self, survey_id, file_name, last_end_date=None):
+        """Promote the pending token once the rows from file_name are stored"""
+        try:
+            with db_manager.get_cursor() as cursor:
+                cursor.execute(
+                    """
+                    UPDATE survey_responses_extraction_watermark
+                    SET continuation_token         = COALESCE(pending_continuation_token, continuation_token),
+                        last_end_date              = GREATEST(last_end_date, %s),
+                        pending_continuation_token = NULL,
+                        pending_file_name          = NULL,
+                        pending_mode               = NULL,
+                        updated_at                 = %s
+                    WHERE survey_id = %s
+                      AND pending_file_name = %s
+                    """,
+                    (last_end_date, datetime.now(timezone.utc), survey_id, file_name)
+                )
+                committed = cursor.rowcount > 0
+                if committed:
+                    logger.info(f"[{survey_id}] Watermark advanced (last_end_date={last_end_date})")
+                return committed
+        except Exception as e:
+            logger.error(f"[{survey_id}] Failed to commit watermark: {e}")
+            return False
@@ -1,7 +1,10 @@
 """
 Utilities package for Qualtrics Data Processor
 """
-from .file_utils import calculate_file_hash, generate_filename, find_latest_csv
+from .file_utils import (calculate_file_hash, calculate_stream_hash, generate_filename, find_latest_csv,
+                         find_latest_extract)
 from .date_utils import format_timestamp, parse_date
+from .rate_limiter import RateLimiter
 
-__all__ = ['calculate_file_hash', 'generate_filename', 'find_latest_csv', 'format_timestamp', 'parse_date']
\ No newline at end of file
+__all__ = ['calculate_file_hash', 'calculate_stream_hash', 'generate_filename', 'find_latest_csv',
+           'find_latest_extract', 'format_timestamp', 'parse_date', 'RateLimiter']
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""
+Cooperative cancellation and deadlines for pipeline runs.
+
+One CancellationToken is shared by every service of a run. Long waits (export polling, downloads, load
+batches) call check() or wait() and stop with PipelineCancelled once the run is cancelled or past its
+deadline. survey_scope() adds the per-survey deadline for the survey being processed in the current thread
+or task, through a contextvar like the stage timings in utils/metrics.py.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# How often wait_async() re-checks the token while sleeping
+ASYNC_CHECK_INTERVAL = 0.5
+
+_survey_deadline = contextvars.ContextVar("survey_deadline", default=None)
+
+
+class PipelineCancelled(Exception):
+    """The run was cancelled or a run or survey deadline passed"""
+
+
+class CancellationToken:
+    def __init__(self, deadline_seconds=None, survey_deadline_seconds=None):
+        self.deadline_seconds = deadline_seconds
+        self.survey_deadline_seconds = survey_deadline_seconds
+        self.deadline = time.monotonic() + deadline_seconds if deadline_seconds else None
+        self.reason = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    def cancel(self, reason="cancelled"):
+        """Stop the run; callbacks registered with on_cancel() run once, e.g. to interrupt a SQL statement"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    @property
+    def cancelled(self):
+        """True once the whole run is cancelled or past its deadline (survey deadlines do not count)"""
+        if not self._event.is_set() and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel(f"deadline of {self.deadline_seconds}s exceeded")
+        return self._event.is_set()
+
+    def remaining(self):
+        """Seconds left before the nearest run or survey deadline, or None without deadlines"""
+        deadlines = [deadline for deadline in (self.deadline, _survey_deadline.get()) if deadline is not None]
+        if not deadlines:
+            return None
+        return max(min(deadlines) - time.monotonic(), 0.0)
+
+    def check(self):
+        if self.cancelled:
+            raise PipelineCancelled(self.reason)
+        survey_deadline = _survey_deadline.get()
+        if survey_deadline is not None and time.monotonic() >= survey_deadline:
+            raise PipelineCancelled(f"survey deadline of {self.survey_deadline_seconds}s exceeded")
+
+    def wait(self, seconds):
+        """Sleep up to seconds, waking as soon as the run is cancelled; raises PipelineCancelled if it is"""
+        remaining = self.remaining()
+        self._event.wait(seconds if remaining is None else min(seconds, remaining))
+        self.check()
+
+    async def wait_async(self, seconds):
+        end = time.monotonic() + seconds
+        while True:
+            self.check()
+            left = end - time.monotonic()
+            if left <= 0:
+                return
+            remaining = self.remaining()
+            await asyncio.sleep(min(left, ASYNC_CHECK_INTERVAL, remaining if remaining is not None else left))
+
+    @contextmanager
+    def survey_scope(self):
+        """Apply survey_deadline_seconds to the work done inside the block"""
+        if not self.survey_deadline_seconds:
+            yield
+            return
+        token = _survey_deadline.set(time.monotonic() + self.survey_deadline_seconds)
+        try:
+            yield
+        finally:
+            _survey_deadline.reset(token)
+
+    @contextmanager
+    def on_cancel(self, callback):
+        """Call callback if the run is cancelled while the block runs"""
+        with self._lock:
+            self._callbacks.append(callback)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._callbacks.remove(callback)
@@ -0,0 +1,132 @@
+import codecs
+import csv
+import io
+
+COLUMNAR_FORMATS = {"parquet", "arrow"}
+
+# Qualtrics CSVs carry two metadata rows (question text, ImportId) after the header
+QUALTRICS_HEADER_ROWS = 2
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.csv
+        import pyarrow.ipc
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError as e:
+        raise ImportError("pyarrow is required for parquet/arrow extract storage and CSV_READ_ENGINE=pyarrow "
+                          "(pip install -r requirements-columnar.txt)") from e
+
+
+def convert_csv_to_columnar(csv_stream, file_path, file_format, block_size=1024 * 1024):
+    """Stream a Qualtrics CSV into a Parquet or Arrow IPC file, block by block.
+
+    Every column is stored as string (as the CSV path reads them) and the two metadata rows are dropped,
+    so readers get data rows only. Returns the number of data rows written.
+    """
+    pa = _import_pyarrow()
+    reader = _open_qualtrics_csv(pa, csv_stream, block_size)
+
+    row_count = 0
+    if file_format == "parquet":
+        writer = pa.parquet.ParquetWriter(str(file_path), reader.schema)
+    else:
+        writer = pa.ipc.new_file(str(file_path), reader.schema)
+
+    try:
+        for batch in reader:
+            writer.write_batch(batch)
+            row_count += batch.num_rows
+    finally:
+        writer.close()
+
+    return row_count
+
+
+def _open_qualtrics_csv(pa, csv_stream, block_size, columns=None):
+    """pyarrow streaming reader over a Qualtrics CSV: string columns, metadata rows skipped"""
+    header_stream = io.BufferedReader(csv_stream, buffer_size=block_size)
+    # Decode only the header line: the peeked block can end inside a multi-byte character of a later row, and
+    # the incremental decoder holds back a character cut off at the end of a header longer than the block
+    header_bytes = header_stream.peek(block_size)[:block_size].split(b"\n", 1)[0]
+    header_line = codecs.getincrementaldecoder("utf-8-sig")().decode(header_bytes).rstrip("\r")
+    column_names = next(csv.reader([header_line]))
+
+    return pa.csv.open_csv(
+        header_stream,
+        read_options=pa.csv.ReadOptions(block_size=block_size, skip_rows_after_names=QUALTRICS_HEADER_ROWS),
+        # The metadata rows hold question text, which often has quoted line breaks
+        parse_options=pa.csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa.csv.ConvertOptions(column_types={name: pa.string() for name in column_names},
+                                              include_columns=columns,
+                                              strings_can_be_null=True)
+    )
+
+
+def read_csv_column_names(file_path):
+    with open(file_path, newline="", encoding="utf-8-sig") as f:
+        return next(csv.reader(f), [])
+
+
+def read_csv_columns(file_path, columns, block_size=1024 * 1024):
+    """DataFrame of the requested columns of a Qualtrics CSV, data rows only, parsed with pyarrow"""
+    pa = _import_pyarrow()
+    with open(file_path, "rb") as f:
+        table = _open_qualtrics_csv(pa, f, block_size, columns).read_all()
+    return _to_pandas(table)
+
+
+def iter_csv_batches(file_path, columns, batch_size, block_size=1024 * 1024):
+    """Yield DataFrames of at most batch_size data rows holding the requested columns, parsed with pyarrow"""
+    pa = _import_pyarrow()
+    with open(file_path, "rb") as f:
+        for batch in _open_qualtrics_csv(pa, f, block_size, columns):
+            for offset in range(0, batch.num_rows, batch_size):
+                yield _to_pandas(batch.slice(offset, batch_size))
+
+
+def read_columnar_column_names(file_path):
+    pa = _import_pyarrow()
+    if str(file_path).endswith(".parquet"):
+        return pa.parquet.read_schema(str(file_path), memory_map=True).names
+
+    with pa.memory_map(str(file_path)) as source:
+        return pa.ipc.open_file(source).schema.names
+
+
+def read_columnar(file_path, columns):
+    """DataFrame of the requested columns only, memory-mapped"""
+    pa = _import_pyarrow()
+    if str(file_path).endswith(".parquet"):
+        table = pa.parquet.read_table(str(file_path), columns=columns, memory_map=True)
+    else:
+        with pa.memory_map(str(file_path)) as source:
+            table = pa.ipc.open_file(source).read_all().select(columns)
+    return _to_pandas(table)
+
+
+def iter_columnar_batches(file_path, columns, batch_size):
+    """Yield DataFrames of at most batch_size rows holding the requested columns"""
+    pa = _import_pyarrow()
+    if str(file_path).endswith(".parquet"):
+        parquet_file = pa.parquet.ParquetFile(str(file_path), memory_map=True)
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+            yield _to_pandas(batch)
+        return
+
+    with pa.memory_map(str(file_path)) as source:
+        ipc_file = pa.ipc.open_file(source)
+        for i in range(ipc_file.num_record_batches):
+            batch = ipc_file.get_batch(i).select(columns)
+            for offset in range(0, batch.num_rows, batch_size):
+                yield _to_pandas(batch.slice(offset, batch_size))
+
+
+def _to_pandas(table):
+    import numpy as np
+
+    df = table.to_pandas()
+    # Missing values come back as None; keep the NaN the CSV reader produces
+    return df.astype(object).where(df.notna(), np.nan)
@@ -1,6 +1,8 @@
 from datetime import datetime
 import pandas as pd
 
+PERTH_TIMEZONE = "Australia/Perth"
+
 
 def format_timestamp(dt=None, format_str="%Y%m%d%H%M%S"):
     if dt is None:
@@ -49,4 +51,26 @@ def date_to_iso_string(dt):
     if isinstance(dt, str):
         dt = parse_date(dt)
 
-    return dt.isoformat() if dt else None
\ No newline at end of file
+    return dt.isoformat() if dt else None
+
+
+def compute_submission_periods(end_dates):
+    """(submitted_at, period_year, period_month) per Qualtrics EndDate; EndDate is UTC, periods are Perth local
+    time. Missing or unparseable dates give (None, None, None)"""
+    end_dates = pd.Series(end_dates, dtype="string").str.split(",").str[0].str.strip()
+
+    submitted_at = pd.to_datetime(end_dates, errors="coerce", utc=True)
+    unparsed = submitted_at.isna() & end_dates.notna()
+    if unparsed.any():
+        submitted_at[unparsed] = pd.to_datetime(end_dates[unparsed], errors="coerce", utc=True, format="mixed")
+
+    perth = submitted_at.dt.tz_convert(PERTH_TIMEZONE)
+    period_years = perth.dt.year.astype(object).where(perth.notna(), None)
+    period_months = perth.dt.month.astype(object).where(perth.notna(), None)
+
+    return [
+        (None if pd.isna(ts) else ts.to_pydatetime(),
+         None if year is None else int(year),
+         None if month is None else int(month))
+        for ts, year, month in zip(submitted_at, period_years, period_months)
+    ]
@@ -12,6 +12,16 @@ def calculate_file_hash(file_path):
     return sha256_hash.hexdigest()
 
 
+def calculate_stream_hash(stream, chunk_size=1024 * 1024):
+    """sha256 of a binary stream read chunk by chunk; returns (hexdigest, byte_count)"""
+    sha256_hash = hashlib.sha256()
+    byte_count = 0
+    for byte_block in iter(lambda: stream.read(chunk_size), b""):
+        sha256_hash.update(byte_block)
+        byte_count += len(byte_block)
+    return sha256_hash.hexdigest(), byte_count
+
+
 def generate_filename(survey_id, file_type="csv"):
     timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
     return f"qualtrics_data_{survey_id}_{timestamp}.{file_type}"
@@ -35,6 +45,25 @@ def find_latest_csv(base_dir, survey_id):
     return max(candidates, key=lambda x: x[0])[1]
 
 
+def find_latest_extract(base_dir, survey_id, file_types=("csv", "parquet", "arrow")):
+    """Format-aware find_latest_csv: newest extract for the survey across the given file types"""
+    base_dir = Path(base_dir)
+    ts_regex = r'_(\d{14})$'
+
+    candidates = []
+    for file_type in file_types:
+        for path in base_dir.glob(f"*{survey_id}*.{file_type}"):
+            matched = re.search(ts_regex, path.stem)
+            if not matched:
+                continue
+            candidates.append((matched.group(1), path))
+
+    if not candidates:
+        raise FileNotFoundError(f"No {survey_id} extract files found in {base_dir}")
+
+    return max(candidates, key=lambda x: x[0])[1]
+
+
 def ensure_directory_exists(directory_path):
     Path(directory_path).mkdir(parents=True, exist_ok=True)
 
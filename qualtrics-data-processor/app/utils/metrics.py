@@ -0,0 +1,142 @@
+"""
+In-process pipeline metrics, rendered in the Prometheus text format by GET /metrics.
+
+Counters and histograms live in this process only, so with several gunicorn workers each worker
+reports its own series. timed() also adds the stage duration to the per-survey timings opened by
+stage_timings(), which the extract and transform stages attach to each survey's result.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = "qualtrics_processor_"
+
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# name: (type, help)
+METRICS = {
+    "stage_duration_seconds": (
+        "histogram", "Pipeline stage duration; extract, mappings and load include their sub-stages"),
+    "qualtrics_requests_total": ("counter", "Qualtrics API responses by method and status"),
+    "qualtrics_retries_total": ("counter", "Qualtrics API requests retried, by reason"),
+    "export_status_checks_total": ("counter", "Export progress checks"),
+    "export_download_bytes_total": ("counter", "Export ZIP bytes downloaded"),
+    "rows_extracted_total": ("counter", "Records written to extract files"),
+    "rows_transformed_total": ("counter", "Responses produced by the transform stage"),
+    "rows_loaded_total": ("counter", "Response rows written by the load stage, by result"),
+    "db_pool_checkout_wait_seconds": ("histogram", "Time spent waiting for a free database connection"),
+}
+
+_stage_timings = contextvars.ContextVar("stage_timings", default=None)
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms keyed by name and label values"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": [0] * len(DURATION_BUCKETS), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def register_collector(self, collector):
+        """collector() returns [(name, type, help, value)] read at render time, e.g. pool gauges"""
+        self._collectors.append(collector)
+
+    def render(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: {"buckets": list(h["buckets"]), "sum": h["sum"], "count": h["count"]}
+                          for key, h in self._histograms.items()}
+
+        lines = []
+        for name, (metric_type, help_text) in METRICS.items():
+            lines.append(f"# HELP {PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}{name} {metric_type}")
+            if metric_type == "counter":
+                for (key_name, labels), value in sorted(counters.items()):
+                    if key_name == name:
+                        lines.append(f"{PREFIX}{name}{_format_labels(labels)} {value}")
+            else:
+                for (key_name, labels), histogram in sorted(histograms.items()):
+                    if key_name == name:
+                        lines.extend(_format_histogram(name, labels, histogram))
+
+        for collector in self._collectors:
+            for name, metric_type, help_text, value in collector():
+                lines.append(f"# HELP {PREFIX}{name} {help_text}")
+                lines.append(f"# TYPE {PREFIX}{name} {metric_type}")
+                lines.append(f"{PREFIX}{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_histogram(name, labels, histogram):
+    lines = []
+    for bound, count in zip(DURATION_BUCKETS, histogram["buckets"]):
+        lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+    lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+    lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {histogram['sum']:.6f}")
+    lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {histogram['count']}")
+    return lines
+
+
+metrics = MetricsRegistry()
+
+
+@contextmanager
+def stage_timings():
+    """Collect the timed() stages of one survey into the yielded dict (seconds per stage)"""
+    timings = {}
+    token = _stage_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _stage_timings.reset(token)
+
+
+@contextmanager
+def timed(stage, exclude=None):
+    """Time a pipeline stage; with exclude, time spent in that nested stage meanwhile is not counted"""
+    timings = _stage_timings.get()
+    excluded_before = timings.get(exclude, 0.0) if timings is not None and exclude else 0.0
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if timings is not None:
+            if exclude:
+                elapsed -= timings.get(exclude, 0.0) - excluded_before
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+        metrics.observe("stage_duration_seconds", elapsed, stage=stage)
+
+
+def rounded_timings(timings):
+    return {stage: round(seconds, 3) for stage, seconds in timings.items()}
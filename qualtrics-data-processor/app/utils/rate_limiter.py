@@ -0,0 +1,34 @@
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls to at most `rate_per_second`; a rate of 0 disables it"""
+
+    def __init__(self, rate_per_second):
+        self.interval = 1.0 / rate_per_second if rate_per_second and rate_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_allowed = 0.0
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """acquire() for coroutines; waits without blocking the event loop"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def _reserve(self):
+        """Claim the next slot and return the seconds to wait for it"""
+        if not self.interval:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_allowed - now
+            self._next_allowed = max(now, self._next_allowed) + self.interval
+        return wait
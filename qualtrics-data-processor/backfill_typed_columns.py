@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Fill the typed survey_responses columns (migrations/005_response_typed_columns.sql) for rows loaded
+before they existed. Each survey is updated in its own transaction and rows already in sync are skipped,
+so the command can be re-run safely.
+
+    python backfill_typed_columns.py
+    python backfill_typed_columns.py --survey-id SV_123abc
+"""
+import argparse
+import sys
+
+from app.config.database import db_manager
+from app.config.settings import get_config
+from app.services.load_service import DataLoadService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--survey-id", action="append", help="Qualtrics survey id; repeatable, default all surveys")
+    args = parser.parse_args()
+
+    db_manager.initialize_with_config(get_config())
+    load_service = DataLoadService()
+
+    if args.survey_id:
+        survey_uuids = []
+        for survey_id in args.survey_id:
+            survey_uuid = load_service._get_survey_uuid_by_qualtrics_id(survey_id)
+            if not survey_uuid:
+                print(f"❌ Survey {survey_id} not found")
+                return False
+            survey_uuids.append(survey_uuid)
+    else:
+        with db_manager.get_cursor() as cursor:
+            cursor.execute("SELECT DISTINCT survey_id FROM survey_responses")
+            survey_uuids = [row["survey_id"] for row in cursor.fetchall()]
+
+    total_updated = 0
+    for survey_uuid in survey_uuids:
+        updated_count = load_service.backfill_typed_columns(survey_uuid)
+        total_updated += updated_count
+        print(f"{survey_uuid}: {updated_count} rows updated")
+
+    print(f"✅ Backfilled {total_updated} rows across {len(survey_uuids)} surveys")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,173 @@
+"""
+Compare the dashboard chart filters on response_data against the typed columns with EXPLAIN ANALYZE.
+
+Each query pair counts the same responses, and the script checks that their results agree: the typed form is
+the .NET BuildFilterConditions output, on the columns and indexes from migrations/005_response_typed_columns.sql;
+the JSONB form computes the same values from response_data with the loader's expressions (_typed_column_sql), so
+a Satisfaction or NPS_NPS_GROUP code that is not an integer is unanswered in both. Read-only; uses the DB_*
+settings from .env.
+
+    python -m benchmarks.bench_chart_queries --survey-id SV_123abc --year 2024 --month 6 --gender 1
+"""
+import argparse
+import json
+import statistics
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from app.config.settings import get_config
+from app.services.load_service import _typed_column_sql
+
+JSONB_SATISFACTION = _typed_column_sql("Satisfaction", "smallint")
+JSONB_NPS_GROUP = _typed_column_sql("NPS_NPS_GROUP", "smallint")
+
+JSONB_FILTERS = {
+    "base": f"({JSONB_SATISFACTION}) IS NOT NULL AND ({JSONB_NPS_GROUP}) IS NOT NULL",
+    "gender": "sr.response_data->>'Gender' = %(gender)s",
+    "participant_type": "sr.response_data->>'ParticipantType' = %(participant_type)s",
+}
+
+TYPED_FILTERS = {
+    "base": "sr.satisfaction IS NOT NULL AND sr.nps_group IS NOT NULL",
+    "gender": "sr.gender = %(gender)s",
+    "participant_type": "sr.participant_type = %(participant_type)s",
+}
+
+QUERIES = {
+    "nps": {
+        "jsonb": """
+            SELECT {nps_group} AS nps_group, COUNT(*)
+            FROM survey_responses sr
+            WHERE sr.survey_id = %(survey_uuid)s AND {filters}
+            GROUP BY 1
+        """,
+        "typed": """
+            SELECT sr.nps_group, COUNT(*)
+            FROM survey_responses sr
+            WHERE sr.survey_id = %(survey_uuid)s AND {filters}
+            GROUP BY 1
+        """,
+    },
+    "satisfaction": {
+        "jsonb": """
+            SELECT {satisfaction} AS satisfaction, COUNT(*)
+            FROM survey_responses sr
+            WHERE sr.survey_id = %(survey_uuid)s AND {filters}
+            GROUP BY 1
+        """,
+        "typed": """
+            SELECT sr.satisfaction, COUNT(*)
+            FROM survey_responses sr
+            WHERE sr.survey_id = %(survey_uuid)s AND {filters}
+            GROUP BY 1
+        """,
+    },
+    "facility": {
+        "jsonb": """
+            SELECT sr.response_data->>'Facility' AS facility_code, COUNT(*)
+            FROM survey_responses sr
+            WHERE sr.survey_id = %(survey_uuid)s AND {filters}
+            GROUP BY 1
+        """,
+        "typed": """
+            SELECT sr.facility, COUNT(*)
+            FROM survey_responses sr
+            WHERE sr.survey_id = %(survey_uuid)s AND {filters}
+            GROUP BY 1
+        """,
+    },
+}
+
+
+def build_filters(filter_sql, args):
+    conditions = [filter_sql["base"]]
+    if args.gender:
+        conditions.append(filter_sql["gender"])
+    if args.participant_type:
+        conditions.append(filter_sql["participant_type"])
+    if args.year:
+        conditions.append("sr.period_year = %(year)s")
+    if args.month:
+        conditions.append("sr.period_month = %(month)s")
+    return " AND ".join(conditions)
+
+
+def fetch_counts(cursor, query, params):
+    """Sorted (code as text, count) pairs, so smallint and text codes compare equal"""
+    cursor.execute(query, params)
+    counts = (tuple(row.values()) for row in cursor.fetchall())
+    return sorted(((None if code is None else str(code)), count) for code, count in counts)
+
+
+def explain(cursor, query, params):
+    cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}", params)
+    row = cursor.fetchone()
+    plan = row["QUERY PLAN"]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]
+
+
+def scan_nodes(node):
+    nodes = [node["Node Type"]] if "Scan" in node["Node Type"] else []
+    for child in node.get("Plans", []):
+        nodes.extend(scan_nodes(child))
+    return nodes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--survey-id", required=True, help="Qualtrics survey id")
+    parser.add_argument("--gender")
+    parser.add_argument("--participant-type")
+    parser.add_argument("--year", type=int)
+    parser.add_argument("--month", type=int)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per query; the median is reported")
+    args = parser.parse_args()
+
+    config = get_config()
+    conn = psycopg2.connect(host=config.DB_HOST, port=config.DB_PORT, dbname=config.DB_NAME,
+                            user=config.DB_USER, password=config.DB_PASSWORD, cursor_factory=RealDictCursor)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT id FROM surveys WHERE qualtrics_survey_id = %s", (args.survey_id,))
+            survey = cursor.fetchone()
+            if not survey:
+                print(f"Survey {args.survey_id} not found")
+                return
+
+            params = {
+                "survey_uuid": survey["id"],
+                "gender": args.gender,
+                "participant_type": args.participant_type,
+                "year": args.year,
+                "month": args.month,
+            }
+            jsonb_filters = build_filters(JSONB_FILTERS, args)
+            typed_filters = build_filters(TYPED_FILTERS, args)
+
+            for name, variants in QUERIES.items():
+                timings = {}
+                counts = {}
+                for variant, filters in (("jsonb", jsonb_filters), ("typed", typed_filters)):
+                    query = variants[variant].format(filters=filters, satisfaction=JSONB_SATISFACTION,
+                                                     nps_group=JSONB_NPS_GROUP)
+                    counts[variant] = fetch_counts(cursor, query, params)
+                    runs = [explain(cursor, query, params) for _ in range(args.repeat)]
+                    last = runs[-1]["Plan"]
+                    timings[variant] = statistics.median(run["Execution Time"] for run in runs)
+                    print(f"{name:>12} {variant:>5}: {timings[variant]:9.2f} ms  "
+                          f"buffers hit={last.get('Shared Hit Blocks', 0)} read={last.get('Shared Read Blocks', 0)}  "
+                          f"scans={', '.join(scan_nodes(last))}")
+                if counts["jsonb"] != counts["typed"]:
+                    print(f"{name:>12} results differ: typed columns out of sync, run python backfill_typed_columns.py")
+                speedup = timings["jsonb"] / timings["typed"] if timings["typed"] else 0
+                print(f"{name:>12} x{speedup:.1f} faster with typed columns")
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark the survey_responses load methods (row / values / copy) against each other.
+
+Runs on a single connection against a TEMP table that shadows survey_responses, so nothing is
+written to the real table. Uses the DB_* settings from .env.
+
+    python -m benchmarks.bench_load --rows 20000 --columns 40
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from app.config.settings import get_config
+from app.services.load_service import DataLoadService
+
+
+def generate_responses(rows, columns):
+    start = datetime(2024, 1, 1)
+    responses = []
+    for _ in range(rows):
+        response = {
+            "Facility": str(random.randint(1, 12)),
+            "Satisfaction": str(random.randint(1, 5)),
+            "EndDate": (start + timedelta(minutes=random.randint(0, 60 * 24 * 365))).strftime("%Y-%m-%d %H:%M:%S"),
+            "NPS": str(random.randint(0, 10)),
+            "NPS_NPS_GROUP": str(random.randint(1, 3)),
+            "Gender": str(random.randint(1, 3)),
+            "ParticipantType": str(random.randint(1, 4)),
+        }
+        for i in range(columns):
+            response[f"Ab_{i}"] = str(random.randint(1, 4))
+        responses.append(response)
+    return responses
+
+
+def run_method(service, cursor, method, survey_uuid, responses):
+    cursor.execute("TRUNCATE survey_responses")
+
+    started = time.perf_counter()
+    if method == "row":
+        inserted, rejected = service._insert_rows_individually(cursor, survey_uuid, responses)
+    else:
+        rows, rejected = service._prepare_response_rows(survey_uuid, responses)
+        inserted, write_rejects = service._bulk_insert_rows(cursor, rows, method)
+        rejected += write_rejects
+    elapsed = time.perf_counter() - started
+
+    return {"method": method, "inserted": inserted, "rejected": len(rejected), "seconds": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--columns", type=int, default=30, help="number of Ab_* columns per response")
+    parser.add_argument("--methods", default="row,values,copy")
+    args = parser.parse_args()
+
+    config = get_config()
+    service = DataLoadService()
+    responses = generate_responses(args.rows, args.columns)
+    survey_uuid = str(uuid.uuid4())
+
+    conn = psycopg2.connect(host=config.DB_HOST, port=config.DB_PORT, dbname=config.DB_NAME,
+                            user=config.DB_USER, password=config.DB_PASSWORD, cursor_factory=RealDictCursor)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("CREATE TEMP TABLE survey_responses (LIKE public.survey_responses INCLUDING DEFAULTS)")
+
+            print(f"Loading {args.rows} responses x {args.columns} Ab_ columns")
+            baseline = None
+            for method in args.methods.split(","):
+                result = run_method(service, cursor, method.strip(), survey_uuid, responses)
+                baseline = baseline or result["seconds"]
+                rate = result["inserted"] / result["seconds"] if result["seconds"] else 0
+                print(f"{result['method']:>7}: {result['seconds']:8.2f}s  {rate:10.0f} rows/s  "
+                      f"inserted={result['inserted']} rejected={result['rejected']}  "
+                      f"x{baseline / result['seconds']:.1f} vs first")
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
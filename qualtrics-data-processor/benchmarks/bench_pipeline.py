@@ -0,0 +1,215 @@
+"""
+End-to-end pipeline benchmark: extract, transform and load N surveys x M rows x K columns.
+
+Qualtrics is replaced by benchmarks/fake_qualtrics.py, started as a subprocess so its memory is not counted.
+The surveys (and an organisation unless --organisation-id is given) are created in the database from the
+DB_* settings in .env, and everything the run wrote is deleted afterwards unless --keep is passed, so point
+it at a local or disposable Postgres. The pipeline settings (EXTRACT_BACKEND, EXTRACT_MAX_WORKERS,
+STREAMING_PIPELINE, EXTRACT_STORAGE_FORMAT, RESPONSES_LOAD_METHOD, ...) are read from the environment as usual;
+with PIPELINE_MODE=pipelined the stages overlap and only the total wall time is reported.
+
+Reports wall time, rows/s and per-survey latency for each stage, taken from the timings in each survey's
+result, and the process peak RSS after extract and after transform and load.
+
+    python -m benchmarks.bench_pipeline --surveys 5 --rows 20000 --columns 40 --latency 0.05
+"""
+import argparse
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from app.config.database import db_manager
+from app.config.settings import Config, get_config
+from app.services.extract_service import DataExtractionService
+from app.services.pipeline_service import PipelineService
+from app.services.survey_metadata_cache import SurveyMetadataCache
+from app.services.transform_service import DataTransformService
+
+STAGES = ["extract", "transform", "load"]
+
+
+def survey_timings(stage_result):
+    """{survey_id: {stage: seconds}} from the per-survey timings in a stage result's details"""
+    details = stage_result.get("data", {}).get("details", {})
+    return {survey_id: result.get("timings", {}) for survey_id, result in details.items()}
+
+
+def merged_timings(extract_result, transform_result):
+    timings = survey_timings(extract_result)
+    for survey_id, seconds in survey_timings(transform_result).items():
+        timings.setdefault(survey_id, {}).update(seconds)
+    return timings
+
+
+def survey_failures(extract_result, transform_result):
+    failures = []
+    for survey_id, result in extract_result.get("data", {}).get("details", {}).items():
+        if not result.get("success"):
+            failures.append((survey_id, "extract", result.get("error")))
+    for survey_id, result in transform_result.get("data", {}).get("details", {}).items():
+        if not result.get("overall_success"):
+            error = result["responses"].get("error") or result["mappings"].get("error")
+            failures.append((survey_id, "transform and load", error))
+    return failures
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def start_fake_qualtrics(args):
+    command = [sys.executable, "-m", "benchmarks.fake_qualtrics", "--port", "0", "--rows", str(args.rows),
+               "--columns", str(args.columns), "--latency", str(args.latency),
+               "--export-seconds", str(args.export_seconds)]
+    process = subprocess.Popen(command, cwd=Path(__file__).resolve().parent.parent, stdout=subprocess.PIPE,
+                               text=True)
+    base_url = process.stdout.readline().strip()
+    if not base_url:
+        process.kill()
+        raise RuntimeError("Fake Qualtrics server did not start")
+    return process, base_url
+
+
+def create_benchmark_surveys(count, organisation_id=None):
+    """(qualtrics survey ids, organisation id created for the run or None)"""
+    run_id = uuid.uuid4().hex[:11]
+    survey_ids = [f"SV_{run_id}{i:04d}" for i in range(count)]
+    created_organisation_id = None
+
+    with db_manager.get_cursor() as cursor:
+        if not organisation_id:
+            created_organisation_id = organisation_id = str(uuid.uuid4())
+            cursor.execute("INSERT INTO organisations (id, name, is_active) VALUES (%s, %s, true)",
+                           (organisation_id, f"Benchmark {run_id}"))
+        for survey_id in survey_ids:
+            cursor.execute(
+                """
+                INSERT INTO surveys (id, organisation_id, qualtrics_survey_id, name, status)
+                VALUES (%s, %s, %s, %s, 'active')
+                """,
+                (str(uuid.uuid4()), organisation_id, survey_id, f"Benchmark {survey_id}")
+            )
+
+    return survey_ids, created_organisation_id
+
+
+def delete_benchmark_data(config, survey_ids, organisation_id):
+    with db_manager.get_cursor() as cursor:
+        cursor.execute("SELECT id FROM surveys WHERE qualtrics_survey_id = ANY(%s)", (survey_ids,))
+        survey_uuids = [row["id"] for row in cursor.fetchall()]
+
+        cursor.execute("DELETE FROM survey_responses WHERE survey_id = ANY(%s::uuid[])", (survey_uuids,))
+        cursor.execute("SELECT to_regclass('survey_response_rollups') IS NOT NULL AS present")
+        if cursor.fetchone()["present"]:
+            cursor.execute("DELETE FROM survey_response_rollups WHERE survey_id = ANY(%s::uuid[])", (survey_uuids,))
+        cursor.execute("DELETE FROM survey_responses_extraction_log WHERE survey_id = ANY(%s)", (survey_ids,))
+        cursor.execute("SELECT to_regclass('survey_responses_extraction_watermark') IS NOT NULL AS present")
+        if cursor.fetchone()["present"]:
+            cursor.execute("DELETE FROM survey_responses_extraction_watermark WHERE survey_id = ANY(%s)",
+                           (survey_ids,))
+        cursor.execute("DELETE FROM surveys WHERE qualtrics_survey_id = ANY(%s)", (survey_ids,))
+        if organisation_id:
+            cursor.execute("DELETE FROM organisations WHERE id = %s", (organisation_id,))
+
+    for survey_id in survey_ids:
+        for path in config.DATA_DIR.glob(f"*{survey_id}*"):
+            path.unlink(missing_ok=True)
+
+
+def print_report(args, timings, stage_wall, total_wall, rss_summary, failures):
+    """stage_wall is None for a pipelined run, where the stages overlap and only the total wall time is known"""
+    total_rows = args.surveys * args.rows
+    print(f"\n{'stage':>9} {'wall s':>8} {'rows/s':>10} {'p50 s':>8} {'max s':>8}")
+    for stage in STAGES:
+        latencies = [seconds[stage] for seconds in timings.values() if stage in seconds]
+        p50 = statistics.median(latencies) if latencies else 0
+        slowest = max(latencies) if latencies else 0
+        if stage_wall is None:
+            print(f"{stage:>9} {'-':>8} {'-':>10} {p50:8.2f} {slowest:8.2f}")
+            continue
+        wall = stage_wall[stage]
+        rate = total_rows / wall if wall else 0
+        print(f"{stage:>9} {wall:8.2f} {rate:10.0f} {p50:8.2f} {slowest:8.2f}")
+
+    print(f"{'total':>9} {total_wall:8.2f} {total_rows / total_wall if total_wall else 0:10.0f}")
+    print(f"Peak RSS: {rss_summary}")
+
+    for survey_id, stage, error in failures:
+        print(f"❌ {survey_id} {stage} failed: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--surveys", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=5000, help="responses per survey")
+    parser.add_argument("--columns", type=int, default=30, help="number of Ab_* columns per response")
+    parser.add_argument("--latency", type=float, default=0.0, help="fake Qualtrics seconds per request")
+    parser.add_argument("--export-seconds", type=float, default=1.0, help="fake Qualtrics export duration")
+    parser.add_argument("--organisation-id", help="existing organisation to create the surveys under")
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark surveys, responses and files")
+    args = parser.parse_args()
+
+    config = get_config()
+    db_manager.initialize_with_config(config)
+    server, base_url = start_fake_qualtrics(args)
+    Config.QUALTRICS_BASE_URL = base_url
+    Config.QUALTRICS_API_TOKEN = "benchmark"
+
+    survey_ids, created_organisation_id = create_benchmark_surveys(args.surveys, args.organisation_id)
+    try:
+        print(f"Pipeline over {args.surveys} surveys x {args.rows} rows x {args.columns} Ab_ columns "
+              f"(fake Qualtrics latency {args.latency}s, export {args.export_seconds}s)")
+        print(f"Extract: {config.EXTRACT_BACKEND} backend, {config.EXTRACT_MAX_WORKERS} workers, "
+              f"{config.EXTRACT_STORAGE_FORMAT} files; streaming {config.STREAMING_PIPELINE}; "
+              f"load {config.RESPONSES_LOAD_METHOD}, replace {config.RESPONSES_REPLACE_STRATEGY}; "
+              f"{config.PIPELINE_MODE} stages")
+
+        if config.PIPELINE_MODE == "pipelined":
+            started = time.perf_counter()
+            pipeline_result = PipelineService().full_pipeline(survey_ids)["data"]
+            total_wall = time.perf_counter() - started
+            extract_result = pipeline_result["extract_phase"]
+            transform_result = pipeline_result["transform_phase"]
+            timings = merged_timings(extract_result, transform_result)
+            stage_wall = None
+            rss_summary = f"{peak_rss_mb():.1f} MB"
+        else:
+            metadata_cache = SurveyMetadataCache()
+            extraction_service = DataExtractionService(metadata_cache=metadata_cache)
+            transform_service = DataTransformService(metadata_cache=metadata_cache)
+
+            started = time.perf_counter()
+            extract_result = extraction_service.extract_specific_surveys(survey_ids)
+            extract_wall = time.perf_counter() - started
+            extract_rss = peak_rss_mb()
+
+            started = time.perf_counter()
+            transform_result = transform_service.transform_specific_surveys(survey_ids)
+            transform_and_load = time.perf_counter() - started
+
+            timings = merged_timings(extract_result, transform_result)
+            # Surveys are transformed and loaded one after another; mappings count towards transform
+            load_wall = sum(seconds.get("load", 0.0) for seconds in timings.values())
+            stage_wall = {"extract": extract_wall, "transform": transform_and_load - load_wall, "load": load_wall}
+            total_wall = extract_wall + transform_and_load
+            rss_summary = f"{extract_rss:.1f} MB after extract, {peak_rss_mb():.1f} MB after transform and load"
+
+        print_report(args, timings, stage_wall, total_wall, rss_summary,
+                     survey_failures(extract_result, transform_result))
+    finally:
+        server.terminate()
+        server.wait()
+        if args.keep:
+            print(f"Kept benchmark surveys: {', '.join(survey_ids)}")
+        else:
+            delete_benchmark_data(config, survey_ids, created_organisation_id)
+
+
+if __name__ == "__main__":
+    main()
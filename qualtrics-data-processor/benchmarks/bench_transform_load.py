@@ -0,0 +1,121 @@
+"""
+Transform-and-load benchmark: the same N surveys loaded one at a time, then with TRANSFORM_MAX_WORKERS
+processes and LOAD_MAX_WORKERS threads.
+
+Extract files are generated straight into DATA_DIR, so only the transform and load stages are timed; the fake
+Qualtrics server (benchmarks/fake_qualtrics.py) only serves the survey definitions for the mappings, which are
+stored before the timed runs. Like bench_pipeline, the surveys are created in the database from the DB_*
+settings in .env and deleted afterwards unless --keep is passed. Each run starts with the surveys' responses
+deleted, so both load the same rows into empty surveys.
+
+    python -m benchmarks.bench_transform_load --surveys 8 --rows 20000 --columns 40 \\
+        --transform-workers 4 --load-workers 4
+"""
+import argparse
+import statistics
+import time
+
+from app.config.database import db_manager
+from app.config.settings import Config, get_config
+from app.services.survey_metadata_cache import SurveyMetadataCache
+from app.services.transform_service import DataTransformService
+from app.utils.file_utils import generate_filename
+from benchmarks.bench_pipeline import (create_benchmark_surveys, delete_benchmark_data, start_fake_qualtrics,
+                                       survey_timings)
+from benchmarks.fake_qualtrics import generate_export_csv
+
+
+def write_extract_files(config, survey_ids, rows, columns):
+    for seed, survey_id in enumerate(survey_ids):
+        file_path = config.DATA_DIR / generate_filename(survey_id)
+        file_path.write_bytes(generate_export_csv(rows, columns, seed))
+
+
+def delete_loaded_responses(survey_ids):
+    with db_manager.get_cursor() as cursor:
+        cursor.execute(
+            """
+            DELETE FROM survey_responses
+            WHERE survey_id IN (SELECT id FROM surveys WHERE qualtrics_survey_id = ANY(%s))
+            """,
+            (survey_ids,)
+        )
+
+
+def run_transform_and_load(survey_ids, transform_workers, load_workers):
+    """(wall seconds, transform_specific_surveys result) with the given worker counts"""
+    Config.TRANSFORM_MAX_WORKERS = transform_workers
+    Config.LOAD_MAX_WORKERS = load_workers
+    delete_loaded_responses(survey_ids)
+
+    transform_service = DataTransformService(metadata_cache=SurveyMetadataCache())
+    started = time.perf_counter()
+    result = transform_service.transform_specific_surveys(survey_ids)
+    return time.perf_counter() - started, result
+
+
+def print_run(label, args, wall, result):
+    total_rows = args.surveys * args.rows
+    timings = survey_timings(result)
+    latencies = [sum(seconds.values()) for seconds in timings.values()]
+    p50 = statistics.median(latencies) if latencies else 0
+    print(f"{label:>12} {wall:8.2f} {total_rows / wall if wall else 0:10.0f} {p50:8.2f}")
+
+    for survey_id, survey_result in result.get("data", {}).get("details", {}).items():
+        if not survey_result.get("overall_success"):
+            error = survey_result["responses"].get("error") or survey_result["mappings"].get("error")
+            print(f"❌ {survey_id} failed: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--surveys", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=10000, help="responses per survey")
+    parser.add_argument("--columns", type=int, default=30, help="number of Ab_* columns per response")
+    parser.add_argument("--transform-workers", type=int, default=4, help="TRANSFORM_MAX_WORKERS of the parallel run")
+    parser.add_argument("--load-workers", type=int, default=4, help="LOAD_MAX_WORKERS of the parallel run")
+    parser.add_argument("--organisation-id", help="existing organisation to create the surveys under")
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark surveys, responses and files")
+    args = parser.parse_args()
+    # Only the survey definitions are requested
+    args.latency, args.export_seconds = 0.0, 0.0
+
+    config = get_config()
+    db_manager.initialize_with_config(config)
+    if args.load_workers >= config.DB_POOL_MAX_CONN:
+        parser.error(f"--load-workers must be below DB_POOL_MAX_CONN ({config.DB_POOL_MAX_CONN})")
+
+    server, base_url = start_fake_qualtrics(args)
+    Config.QUALTRICS_BASE_URL = base_url
+    Config.QUALTRICS_API_TOKEN = "benchmark"
+
+    survey_ids, created_organisation_id = create_benchmark_surveys(args.surveys, args.organisation_id)
+    try:
+        print(f"Transform and load of {args.surveys} surveys x {args.rows} rows x {args.columns} Ab_ columns "
+              f"(load {config.RESPONSES_LOAD_METHOD}, streaming {config.STREAMING_PIPELINE})")
+        write_extract_files(config, survey_ids, args.rows, args.columns)
+
+        mappings_service = DataTransformService()
+        for survey_id in survey_ids:
+            mappings_service._process_survey_mappings(survey_id)
+
+        sequential_wall, sequential_result = run_transform_and_load(survey_ids, 1, 1)
+        parallel_wall, parallel_result = run_transform_and_load(survey_ids, args.transform_workers,
+                                                                args.load_workers)
+
+        print(f"\n{'workers':>12} {'wall s':>8} {'rows/s':>10} {'p50 s':>8}")
+        print_run("1 / 1", args, sequential_wall, sequential_result)
+        print_run(f"{args.transform_workers} / {args.load_workers}", args, parallel_wall, parallel_result)
+        print(f"Speedup: {sequential_wall / parallel_wall if parallel_wall else 0:.2f}x "
+              f"(workers are transform processes / load threads)")
+    finally:
+        server.terminate()
+        server.wait()
+        if args.keep:
+            print(f"Kept benchmark surveys: {', '.join(survey_ids)}")
+        else:
+            delete_benchmark_data(config, survey_ids, created_organisation_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Local stand-in for the parts of the Qualtrics v3 API the data processor calls.
+
+Serves export-responses (start, progress, file), surveys, survey-definitions and whoami for any survey id. Every
+export is the same synthetic Qualtrics CSV (three header rows, ROWS responses, COLUMNS Ab_* answers plus the
+key fields the transform keeps and the metadata columns it drops), zipped once at startup. Exports report
+percentComplete in proportion to --export-seconds, and every request waits --latency seconds first.
+
+    python -m benchmarks.fake_qualtrics --rows 5000 --columns 40 --latency 0.05 --export-seconds 2
+
+then point the processor at it with QUALTRICS_BASE_URL=http://127.0.0.1:8765/API/v3.
+"""
+import argparse
+import csv
+import io
+import json
+import random
+import threading
+import time
+import uuid
+import zipfile
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METADATA_COLUMNS = ["StartDate", "EndDate", "Status", "IPAddress", "Progress", "Duration (in seconds)",
+                    "Finished", "RecordedDate", "ResponseId", "LocationLatitude", "LocationLongitude"]
+
+# (DataExportTag, number of answer codes)
+KEY_QUESTIONS = [("ServiceType", 1), ("Facility", 12), ("Satisfaction", 5), ("NPS", 11), ("NPS_NPS_GROUP", 3),
+                 ("Gender", 3), ("ParticipantType", 4)]
+
+
+def generate_export_csv(rows, columns, seed=0):
+    """Synthetic export CSV bytes in the Qualtrics layout"""
+    rng = random.Random(seed)
+    answer_columns = [tag for tag, _ in KEY_QUESTIONS[1:]] + [f"Ab_{i}" for i in range(1, columns + 1)]
+    header = METADATA_COLUMNS + answer_columns
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    writer.writerow([column.replace("_", " ") for column in header])
+    writer.writerow([json.dumps({"ImportId": column}) for column in header])
+
+    start = datetime(2024, 1, 1)
+    for i in range(rows):
+        started = start + timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+        ended = started + timedelta(seconds=rng.randint(60, 1800))
+        metadata = [started.strftime("%Y-%m-%d %H:%M:%S"), ended.strftime("%Y-%m-%d %H:%M:%S"), "0",
+                    f"10.0.{rng.randint(0, 255)}.{rng.randint(0, 255)}", "100",
+                    str(int((ended - started).total_seconds())), "1", ended.strftime("%Y-%m-%d %H:%M:%S"),
+                    f"R_{i:015d}", f"-31.{rng.randint(0, 99999)}", f"115.{rng.randint(0, 99999)}"]
+        answers = [str(rng.randint(1, 12)), str(rng.randint(1, 5)), str(rng.randint(0, 10)),
+                   str(rng.randint(1, 3)), str(rng.randint(1, 3)), str(rng.randint(1, 4))]
+        # Leave some questions unanswered, as real exports do
+        answers += ["" if rng.random() < 0.1 else str(rng.randint(1, 4)) for _ in range(columns)]
+        writer.writerow(metadata + answers)
+
+    return buffer.getvalue().encode("utf-8")
+
+
+def generate_export_zip(rows, columns, seed=0):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr("Benchmark Survey.csv", generate_export_csv(rows, columns, seed))
+    return buffer.getvalue()
+
+
+def generate_questions(columns):
+    """survey-definitions Questions for the synthetic export, so the mappings stage has choices to store"""
+    questions = {}
+    tags = KEY_QUESTIONS + [(f"Ab_{i}", 4) for i in range(1, columns + 1)]
+    for index, (tag, choice_count) in enumerate(tags, start=1):
+        questions[f"QID{index}"] = {
+            "DataExportTag": tag,
+            "QuestionText": tag.replace("_", " "),
+            "Choices": {str(code): {"Display": f"{tag} {code}"} for code in range(1, choice_count + 1)}
+        }
+    questions["QID1"]["Choices"] = {"1": {"Display": "Benchmark Service"}}
+    return questions
+
+
+class FakeQualtricsServer:
+    """Threaded HTTP server on 127.0.0.1 serving the synthetic export; start() returns the API base URL"""
+
+    def __init__(self, rows=1000, columns=30, latency=0.0, export_seconds=1.0, port=0, seed=0):
+        self.rows = rows
+        self.latency = latency
+        self.export_seconds = export_seconds
+        self.export_zip = generate_export_zip(rows, columns, seed)
+        self.questions = generate_questions(columns)
+        self.request_count = 0
+        self._exports = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/API/v3"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-qualtrics", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start_export(self):
+        progress_id = f"ES_{uuid.uuid4().hex[:15]}"
+        with self._lock:
+            self._exports[progress_id] = time.monotonic()
+        return progress_id
+
+    def export_status(self, progress_id):
+        with self._lock:
+            started = self._exports.get(progress_id)
+        if started is None:
+            return None
+
+        if self.export_seconds > 0:
+            percent_complete = min(100.0, round((time.monotonic() - started) / self.export_seconds * 100, 1))
+        else:
+            percent_complete = 100.0
+
+        if percent_complete < 100:
+            return {"status": "inProgress", "percentComplete": percent_complete}
+        return {"status": "complete", "percentComplete": 100.0, "fileId": f"{progress_id}-file",
+                "continuationToken": f"CT_{progress_id}"}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                self._begin()
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                parts = self._path_parts()
+                if len(parts) == 5 and parts[2] == "surveys" and parts[4] == "export-responses":
+                    return self._send_json({"result": {"progressId": server.start_export()}})
+                self._send_json({"meta": {"error": "not found"}}, status=404)
+
+            def do_GET(self):
+                self._begin()
+                parts = self._path_parts()
+                if parts[2:] == ["whoami"]:
+                    return self._send_json({"result": {"userId": "UR_benchmark"}})
+                if len(parts) == 4 and parts[2] == "surveys":
+                    return self._send_json({"result": {"id": parts[3],
+                                                       "responseCounts": {"auditable": server.rows, "generated": 0,
+                                                                          "deleted": 0}}})
+                if len(parts) == 4 and parts[2] == "survey-definitions":
+                    return self._send_json({"result": {"SurveyID": parts[3], "Questions": server.questions}})
+                if len(parts) == 7 and parts[4] == "export-responses" and parts[6] == "file":
+                    return self._send(server.export_zip, "application/zip")
+                if len(parts) == 6 and parts[4] == "export-responses":
+                    status = server.export_status(parts[5])
+                    if status:
+                        return self._send_json({"result": status})
+                self._send_json({"meta": {"error": "not found"}}, status=404)
+
+            def _begin(self):
+                with server._lock:
+                    server.request_count += 1
+                if server.latency:
+                    time.sleep(server.latency)
+
+            def _path_parts(self):
+                # ["API", "v3", ...] for /API/v3/...
+                return [part for part in self.path.split("?")[0].split("/") if part]
+
+            def _send_json(self, payload, status=200):
+                self._send(json.dumps(payload).encode("utf-8"), "application/json", status)
+
+            def _send(self, body, content_type, status=200):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="responses per export")
+    parser.add_argument("--columns", type=int, default=30, help="number of Ab_* columns per response")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--export-seconds", type=float, default=1.0, help="time for an export to reach 100%%")
+    parser.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeQualtricsServer(args.rows, args.columns, args.latency, args.export_seconds, args.port, args.seed)
+    # First line is read by bench_pipeline to find the port
+    print(server.base_url, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Apply the SQL files in migrations/ in file name order. Every migration is required: the load stage writes
+response_id, the typed columns and content_hash on every load, and the charts read the rollup table.
+Applied files are recorded in schema_migrations and skipped on later runs; each file runs in its own
+transaction. Run it before starting wsgi.py or scheduler.py after every deploy.
+
+    python migrate.py
+    python migrate.py --check    # list pending migrations, exit 1 if there are any
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.config.database import db_manager
+from app.config.settings import get_config
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+
+
+def get_pending_migrations():
+    with db_manager.get_cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations
+            (
+                file_name  text PRIMARY KEY,
+                applied_at timestamptz NOT NULL DEFAULT now()
+            )
+        """)
+        cursor.execute("SELECT file_name FROM schema_migrations")
+        applied = {row["file_name"] for row in cursor.fetchall()}
+
+    return [path for path in sorted(MIGRATIONS_DIR.glob("*.sql")) if path.name not in applied]
+
+
+def apply_migration(path):
+    with db_manager.get_cursor() as cursor:
+        cursor.execute(path.read_text(encoding="utf-8"))
+        cursor.execute("INSERT INTO schema_migrations (file_name) VALUES (%s)", (path.name,))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="only list pending migrations")
+    args = parser.parse_args()
+
+    db_manager.initialize_with_config(get_config())
+    try:
+        pending = get_pending_migrations()
+        if not pending:
+            print("✅ Database schema is up to date")
+            return True
+
+        if args.check:
+            for path in pending:
+                print(f"Pending: {path.name}")
+            return False
+
+        for path in pending:
+            print(f"Applying {path.name}")
+            try:
+                apply_migration(path)
+            except Exception as e:
+                print(f"❌ {path.name} failed: {e}")
+                return False
+
+        print(f"✅ Applied {len(pending)} migrations")
+        return True
+    finally:
+        db_manager.close_all_connections()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,24 @@
+-- ResponseId on survey_responses and incremental response export (INCREMENTAL_EXPORT=true)
+--
+-- Required by every load. survey_responses.response_id carries the Qualtrics ResponseId: replace loads match
+-- on it to write only the difference, and delta exports are upserted by it. survey_responses_extraction_watermark
+-- keeps the per-survey high-water mark next to
+-- survey_responses_extraction_log. The pending_* columns are written by the extract stage and only
+-- promoted once the load stage has stored the rows, so a failed load is re-exported on the next run.
+
+ALTER TABLE survey_responses
+    ADD COLUMN IF NOT EXISTS response_id text;
+
+CREATE UNIQUE INDEX IF NOT EXISTS survey_responses_survey_id_response_id_key
+    ON survey_responses (survey_id, response_id);
+
+CREATE TABLE IF NOT EXISTS survey_responses_extraction_watermark
+(
+    survey_id                  text PRIMARY KEY,
+    continuation_token         text,
+    last_end_date              timestamptz,
+    pending_continuation_token text,
+    pending_file_name          text,
+    pending_mode               text,
+    updated_at                 timestamptz NOT NULL DEFAULT now()
+);
@@ -0,0 +1,21 @@
+-- Background pipeline jobs (/api/extract-data, /api/transform-and-load, /api/full-pipeline with "async")
+--
+-- progress holds the latest per-survey stage keyed by Qualtrics survey id, for example
+-- {"SV_123": {"stage": "exporting", "percent_complete": 40}}; result holds the same payload the
+-- synchronous endpoint would have returned.
+
+CREATE TABLE IF NOT EXISTS pipeline_jobs
+(
+    id          uuid PRIMARY KEY,
+    job_type    text        NOT NULL,
+    status      text        NOT NULL DEFAULT 'queued',
+    params      jsonb       NOT NULL DEFAULT '{}'::jsonb,
+    progress    jsonb       NOT NULL DEFAULT '{}'::jsonb,
+    result      jsonb,
+    error       text,
+    created_at  timestamptz NOT NULL DEFAULT now(),
+    started_at  timestamptz,
+    finished_at timestamptz
+);
+
+CREATE INDEX IF NOT EXISTS pipeline_jobs_created_at_idx ON pipeline_jobs (created_at DESC);
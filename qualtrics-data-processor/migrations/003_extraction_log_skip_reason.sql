@@ -0,0 +1,5 @@
+-- Extractions short-circuited because the export content hash matched the previous one are still logged,
+-- with the previous file_name/file_hash and the reason in skip_reason (NULL for normal extractions).
+
+ALTER TABLE survey_responses_extraction_log
+    ADD COLUMN IF NOT EXISTS skip_reason text;
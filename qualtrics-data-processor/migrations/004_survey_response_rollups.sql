@@ -0,0 +1,42 @@
+-- Dashboard rollups (required: the chart services read only this table)
+--
+-- Response counts per survey x period x Facility x Gender x ParticipantType for every Satisfaction,
+-- NPS_NPS_GROUP and Ab_* answer code, kept up to date by every load in the same transaction as the responses.
+-- code is NULL for unanswered questions. has_core_answers mirrors the chart filter that requires both
+-- Satisfaction and NPS_NPS_GROUP, so chart queries can sum response_count instead of scanning response_data.
+
+CREATE TABLE IF NOT EXISTS survey_response_rollups
+(
+    survey_id        uuid    NOT NULL,
+    period_year      integer,
+    period_month     integer,
+    facility         text,
+    gender           text,
+    participant_type text,
+    has_core_answers boolean NOT NULL,
+    metric           text    NOT NULL,
+    code             text,
+    response_count   integer NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS survey_response_rollups_survey_metric_period_idx
+    ON survey_response_rollups (survey_id, metric, period_year, period_month);
+
+-- Backfill from the responses already loaded
+INSERT INTO survey_response_rollups (survey_id, period_year, period_month, facility, gender, participant_type,
+                                     has_core_answers, metric, code, response_count)
+SELECT sr.survey_id,
+       sr.period_year,
+       sr.period_month,
+       sr.response_data ->> 'Facility',
+       sr.response_data ->> 'Gender',
+       sr.response_data ->> 'ParticipantType',
+       sr.response_data ->> 'Satisfaction' IS NOT NULL AND sr.response_data ->> 'NPS_NPS_GROUP' IS NOT NULL,
+       answer.key,
+       answer.value,
+       count(*)
+FROM survey_responses sr
+         CROSS JOIN LATERAL jsonb_each_text(sr.response_data) AS answer(key, value)
+WHERE (answer.key IN ('Satisfaction', 'NPS_NPS_GROUP') OR answer.key LIKE 'Ab\_%')
+  AND NOT EXISTS (SELECT 1 FROM survey_response_rollups r WHERE r.survey_id = sr.survey_id)
+GROUP BY 1, 2, 3, 4, 5, 6, 7, 8, 9;
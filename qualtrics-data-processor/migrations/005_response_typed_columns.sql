@@ -0,0 +1,31 @@
+-- Typed copies of the response_data keys the dashboard filters on
+--
+-- Required by every load: the load stage writes these next to response_data. Codes that are not integers are
+-- stored as NULL. Rows loaded before this migration are filled by the next load of their survey, or straight
+-- away with
+--     python backfill_typed_columns.py
+-- Chart queries filtering on these columns can use the composite indexes instead of scanning response_data.
+
+ALTER TABLE survey_responses
+    ADD COLUMN IF NOT EXISTS facility         text,
+    ADD COLUMN IF NOT EXISTS gender           text,
+    ADD COLUMN IF NOT EXISTS participant_type text,
+    ADD COLUMN IF NOT EXISTS satisfaction     smallint,
+    ADD COLUMN IF NOT EXISTS nps              smallint,
+    ADD COLUMN IF NOT EXISTS nps_group        smallint;
+
+-- Chart filters: survey + period, optionally Gender / ParticipantType, over responses with both core answers.
+-- INCLUDE lets the satisfaction and NPS counts run as index-only scans.
+CREATE INDEX IF NOT EXISTS survey_responses_chart_filter_idx
+    ON survey_responses (survey_id, period_year, period_month, gender, participant_type)
+    INCLUDE (facility, satisfaction, nps_group)
+    WHERE satisfaction IS NOT NULL AND nps_group IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS survey_responses_facility_period_idx
+    ON survey_responses (survey_id, facility, period_year, period_month);
+
+-- Expression index for chart queries that still filter on response_data (BuildFilterConditions)
+CREATE INDEX IF NOT EXISTS survey_responses_chart_filter_expr_idx
+    ON survey_responses (survey_id, period_year, period_month,
+                         (response_data ->> 'Gender'), (response_data ->> 'ParticipantType'))
+    WHERE response_data ->> 'Satisfaction' IS NOT NULL AND response_data ->> 'NPS_NPS_GROUP' IS NOT NULL;
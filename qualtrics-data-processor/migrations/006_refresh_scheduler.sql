@@ -0,0 +1,41 @@
+-- Scheduled refreshes (python scheduler.py)
+--
+-- refresh_schedules overrides SCHEDULER_DEFAULT_INTERVAL_MINUTES for a whole organisation (survey_id NULL)
+-- or for one Qualtrics survey (organisation_id NULL); a survey row wins over its organisation's row, and
+-- enabled = false leaves the organisation or survey out of scheduled runs.
+--
+-- survey_refresh_state keeps the Qualtrics response count seen at the last successful scheduled refresh,
+-- so surveys without new responses are skipped, and when the scheduler last looked at each survey.
+
+CREATE TABLE IF NOT EXISTS refresh_schedules
+(
+    id                       serial PRIMARY KEY,
+    organisation_id          uuid,
+    survey_id                text,
+    refresh_interval_minutes integer     NOT NULL CHECK (refresh_interval_minutes > 0),
+    enabled                  boolean     NOT NULL DEFAULT true,
+    updated_at               timestamptz NOT NULL DEFAULT now(),
+    CHECK ((organisation_id IS NULL) <> (survey_id IS NULL))
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS refresh_schedules_organisation_id_key
+    ON refresh_schedules (organisation_id) WHERE survey_id IS NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS refresh_schedules_survey_id_key
+    ON refresh_schedules (survey_id) WHERE organisation_id IS NULL;
+
+CREATE TABLE IF NOT EXISTS survey_refresh_state
+(
+    survey_id      text PRIMARY KEY,
+    response_count integer,
+    refreshed_at   timestamptz,
+    checked_at     timestamptz
+);
+
+-- Staleness: latest extraction per survey
+CREATE INDEX IF NOT EXISTS survey_responses_extraction_log_survey_extracted_idx
+    ON survey_responses_extraction_log (survey_id, extracted_at DESC);
+
+-- Velocity: responses submitted in the last SCHEDULER_VELOCITY_DAYS per survey
+CREATE INDEX IF NOT EXISTS survey_responses_survey_submitted_idx
+    ON survey_responses (survey_id, submitted_at);
@@ -0,0 +1,8 @@
+-- Cancelling background pipeline jobs (POST /api/jobs/<job_id>/cancel)
+--
+-- The endpoint only records cancel_requested_at, since the job may run in another gunicorn worker or in
+-- scheduler.py; the process running it polls the column every JOB_CANCEL_POLL_SECONDS and stops the run.
+-- Queued jobs are marked 'cancelled' straight away, running ones once they have stopped and rolled back.
+
+ALTER TABLE pipeline_jobs
+    ADD COLUMN IF NOT EXISTS cancel_requested_at timestamptz;
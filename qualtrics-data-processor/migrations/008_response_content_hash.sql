@@ -0,0 +1,11 @@
+-- Row-level diffing of replace loads (RESPONSES_REPLACE_STRATEGY=diff)
+--
+-- Required by every load, whatever the strategy: content_hash is computed by the transform stage from each
+-- response's kept columns and written with every row, so switching to diff later rewrites nothing.
+-- A diff load reads the survey's (response_id, content_hash) pairs through
+-- survey_responses_survey_id_response_id_key and only writes rows whose hash differs, so unchanged responses
+-- are never re-encoded, staged or rewritten.
+-- Rows loaded before this migration have no hash and are rewritten once by their survey's next load.
+
+ALTER TABLE survey_responses
+    ADD COLUMN IF NOT EXISTS content_hash text;
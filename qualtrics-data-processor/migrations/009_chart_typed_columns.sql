@@ -0,0 +1,52 @@
+-- Chart filters read the typed response columns (required)
+--
+-- BuildFilterConditions in the .NET chart services now filters on facility, gender, participant_type,
+-- satisfaction and nps_group instead of response_data, through survey_responses_chart_filter_idx. A
+-- Satisfaction or NPS_NPS_GROUP answer that is not an integer code is stored as NULL and counts as unanswered,
+-- and the rollups' has_core_answers now follows the same rule.
+--
+-- 1. Fill the typed columns of rows loaded before 005, so the charts do not lose them. The expressions match
+--    _typed_column_sql in app/services/load_service.py, which backfill_typed_columns.py uses.
+UPDATE survey_responses
+SET (facility, gender, participant_type, satisfaction, nps, nps_group) = (
+        response_data ->> 'Facility',
+        response_data ->> 'Gender',
+        response_data ->> 'ParticipantType',
+        CASE WHEN btrim(response_data ->> 'Satisfaction') ~ '^-?[0-9]{1,5}$' THEN
+            CASE WHEN btrim(response_data ->> 'Satisfaction')::integer BETWEEN -32768 AND 32767
+                THEN btrim(response_data ->> 'Satisfaction')::smallint END END,
+        CASE WHEN btrim(response_data ->> 'NPS') ~ '^-?[0-9]{1,5}$' THEN
+            CASE WHEN btrim(response_data ->> 'NPS')::integer BETWEEN -32768 AND 32767
+                THEN btrim(response_data ->> 'NPS')::smallint END END,
+        CASE WHEN btrim(response_data ->> 'NPS_NPS_GROUP') ~ '^-?[0-9]{1,5}$' THEN
+            CASE WHEN btrim(response_data ->> 'NPS_NPS_GROUP')::integer BETWEEN -32768 AND 32767
+                THEN btrim(response_data ->> 'NPS_NPS_GROUP')::smallint END END)
+WHERE facility IS NULL
+  AND gender IS NULL
+  AND participant_type IS NULL
+  AND satisfaction IS NULL
+  AND nps IS NULL
+  AND nps_group IS NULL;
+
+-- 2. Rebuild the rollups with has_core_answers taken from the typed columns
+DELETE FROM survey_response_rollups;
+
+INSERT INTO survey_response_rollups (survey_id, period_year, period_month, facility, gender, participant_type,
+                                     has_core_answers, metric, code, response_count)
+SELECT sr.survey_id,
+       sr.period_year,
+       sr.period_month,
+       sr.facility,
+       sr.gender,
+       sr.participant_type,
+       sr.satisfaction IS NOT NULL AND sr.nps_group IS NOT NULL,
+       answer.key,
+       answer.value,
+       count(*)
+FROM survey_responses sr
+         CROSS JOIN LATERAL jsonb_each_text(sr.response_data) AS answer(key, value)
+WHERE answer.key IN ('Satisfaction', 'NPS_NPS_GROUP') OR answer.key LIKE 'Ab\_%'
+GROUP BY 1, 2, 3, 4, 5, 6, 7, 8, 9;
+
+-- 3. Nothing filters on the response_data expressions any more
+DROP INDEX IF EXISTS survey_responses_chart_filter_expr_idx;
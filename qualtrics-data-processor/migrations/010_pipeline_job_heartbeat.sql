@@ -0,0 +1,15 @@
+-- Heartbeats for background pipeline jobs
+--
+-- Jobs run on an in-process executor, so a job whose gunicorn worker or scheduler.py process stops would stay
+-- 'queued' or 'running' forever. worker_id records the process (host:pid) that owns the job, and that process
+-- touches heartbeat_at every JOB_HEARTBEAT_SECONDS while the job is queued or running. Any process marks jobs
+-- whose heartbeat is older than JOB_STALE_SECONDS as failed, at startup and on every heartbeat.
+-- Jobs created before this migration have no heartbeat and are judged by started_at or created_at.
+
+ALTER TABLE pipeline_jobs
+    ADD COLUMN IF NOT EXISTS worker_id    text,
+    ADD COLUMN IF NOT EXISTS heartbeat_at timestamptz;
+
+CREATE INDEX IF NOT EXISTS pipeline_jobs_active_idx
+    ON pipeline_jobs (worker_id)
+    WHERE status IN ('queued', 'running');
@@ -0,0 +1,59 @@
+"""
+Scheduler entry point: refreshes active surveys on their refresh_schedules intervals
+(migrations/006_refresh_scheduler.sql), next to the API served by wsgi.py. Run a single instance.
+
+    python scheduler.py
+    python scheduler.py --once
+    python scheduler.py --organisation-id 3f0c...
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.config.database import db_manager
+from app.config.settings import get_config
+from app.services.job_service import PipelineJobService
+from app.services.scheduler_service import RefreshScheduler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="run one scheduling pass and exit")
+    parser.add_argument("--organisation-id", help="only schedule this organisation's surveys")
+    args = parser.parse_args()
+
+    config = get_config()
+    logging.basicConfig(level=getattr(logging, config.LOG_LEVEL), format=config.LOG_FORMAT,
+                        handlers=[logging.StreamHandler()])
+    try:
+        config.validate_config()
+    except ValueError as e:
+        print(f"Configuration error: {e}", file=sys.stderr)
+        return False
+
+    db_manager.initialize_with_config(config)
+    try:
+        try:
+            stale_jobs = PipelineJobService().fail_stale_jobs()
+            if stale_jobs:
+                logging.warning(f"Marked {stale_jobs} interrupted pipeline jobs as failed")
+        except Exception as e:
+            logging.error(f"Failed to check for interrupted pipeline jobs: {e}")
+
+        scheduler = RefreshScheduler(args.organisation_id)
+        if args.once:
+            return scheduler.run_once()["success"]
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db_manager.close_all_connections()
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
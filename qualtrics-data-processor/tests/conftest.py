@@ -0,0 +1,11 @@
+import os
+
+# app.config.settings reads these at import time; the tests never open a connection or call Qualtrics
+os.environ.setdefault("FLASK_ENV", "testing")
+os.environ.setdefault("DB_HOST", "localhost")
+os.environ.setdefault("DB_PORT", "5432")
+os.environ.setdefault("DB_NAME", "test")
+os.environ.setdefault("DB_USER", "test")
+os.environ.setdefault("DB_PASSWORD", "test")
+os.environ.setdefault("QUALTRICS_API_TOKEN", "test")
+os.environ.setdefault("QUALTRICS_DATA_CENTER", "test")
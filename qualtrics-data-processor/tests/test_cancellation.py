@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.utils.cancellation import CancellationToken, PipelineCancelled
+
+
+def test_cancel_runs_registered_callbacks_once():
+    token = CancellationToken()
+    calls = []
+
+    with token.on_cancel(lambda: calls.append("cancelled")):
+        token.cancel("stop")
+        token.cancel("again")
+
+    assert calls == ["cancelled"]
+    assert token.reason == "stop"
+    with pytest.raises(PipelineCancelled, match="stop"):
+        token.check()
+
+
+def test_callbacks_are_dropped_when_the_block_ends():
+    token = CancellationToken()
+    calls = []
+
+    with token.on_cancel(lambda: calls.append("cancelled")):
+        pass
+    token.cancel()
+
+    assert calls == []
+
+
+def test_failing_callback_does_not_stop_the_others():
+    token = CancellationToken()
+    calls = []
+
+    def fail():
+        raise RuntimeError("connection already closed")
+
+    with token.on_cancel(fail), token.on_cancel(lambda: calls.append("cancelled")):
+        token.cancel()
+
+    assert calls == ["cancelled"]
+
+
+def test_run_deadline_cancels_the_token():
+    token = CancellationToken(deadline_seconds=0.01)
+    assert not token.cancelled
+
+    time.sleep(0.02)
+
+    assert token.cancelled
+    assert "deadline of 0.01s exceeded" in token.reason
+    assert token.remaining() == 0.0
+
+
+def test_survey_deadline_only_applies_inside_its_scope():
+    token = CancellationToken(survey_deadline_seconds=0.01)
+    assert token.remaining() is None
+
+    with token.survey_scope():
+        assert 0 < token.remaining() <= 0.01
+        time.sleep(0.02)
+        with pytest.raises(PipelineCancelled, match="survey deadline"):
+            token.check()
+
+    token.check()
+    assert not token.cancelled
+
+
+def test_remaining_is_the_nearest_deadline():
+    token = CancellationToken(deadline_seconds=10, survey_deadline_seconds=1)
+
+    with token.survey_scope():
+        assert token.remaining() <= 1
+    assert 1 < token.remaining() <= 10
+
+
+def test_wait_returns_early_when_cancelled_from_another_thread():
+    token = CancellationToken()
+    threading.Timer(0.05, token.cancel).start()
+
+    started = time.monotonic()
+    with pytest.raises(PipelineCancelled):
+        token.wait(5)
+
+    assert time.monotonic() - started < 1
+
+
+def test_wait_without_cancel_sleeps_and_returns():
+    token = CancellationToken()
+    token.wait(0.01)
+    assert not token.cancelled
+
+
+def test_wait_async_stops_at_the_survey_deadline():
+    token = CancellationToken(survey_deadline_seconds=0.05)
+
+    async def run():
+        with token.survey_scope():
+            await token.wait_async(5)
+
+    started = time.monotonic()
+    with pytest.raises(PipelineCancelled):
+        asyncio.run(run())
+
+    assert time.monotonic() - started < 1
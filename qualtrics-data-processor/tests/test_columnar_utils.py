@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from app.utils.columnar_utils import convert_csv_to_columnar, iter_csv_batches, read_columnar
+
+BLOCK_SIZE = 64
+HEADER = "\ufeffResponseId,Q1\nResponse ID,Comments\n_recordId,QID1\n".encode("utf-8")
+
+
+def csv_with_quote_on_the_block_boundary():
+    """A Qualtrics CSV whose first answer has a “ starting one byte before BLOCK_SIZE, so the block ends inside it"""
+    padding = "x" * (BLOCK_SIZE - 1 - len(HEADER) - len('R_1,"'))
+    data = HEADER + f'R_1,"{padding}“Great”"\nR_2,ok\n'.encode("utf-8")
+    assert data[BLOCK_SIZE - 1:BLOCK_SIZE + 2].decode("utf-8") == "“"
+    return data, f"{padding}“Great”"
+
+
+def test_csv_batches_with_a_multi_byte_character_on_the_block_boundary(tmp_path):
+    data, answer = csv_with_quote_on_the_block_boundary()
+    csv_path = tmp_path / "export.csv"
+    csv_path.write_bytes(data)
+
+    frames = list(iter_csv_batches(csv_path, ["ResponseId", "Q1"], batch_size=10, block_size=BLOCK_SIZE))
+
+    assert frames[0].to_dict(orient="list") == {"ResponseId": ["R_1", "R_2"], "Q1": [answer, "ok"]}
+
+
+def test_columnar_conversion_with_a_multi_byte_character_on_the_block_boundary(tmp_path):
+    data, answer = csv_with_quote_on_the_block_boundary()
+    csv_path = tmp_path / "export.csv"
+    csv_path.write_bytes(data)
+
+    with open(csv_path, "rb") as f:
+        assert convert_csv_to_columnar(f, tmp_path / "export.parquet", "parquet", block_size=BLOCK_SIZE) == 2
+
+    assert read_columnar(tmp_path / "export.parquet", ["Q1"])["Q1"].tolist() == [answer, "ok"]
@@ -0,0 +1,128 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import psycopg2
+import pytest
+
+from app.config.database import DatabaseManager
+
+
+class FakeConnection:
+    def __init__(self, error=None):
+        self.error = error
+        self.closed = 0
+        self.checks = 0
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def execute(self, query):
+        self.checks += 1
+        if self.error:
+            raise self.error
+
+    def rollback(self):
+        pass
+
+
+class FakePool:
+    """getconn hands out the idle connections first, then opens fresh ones"""
+
+    def __init__(self, idle):
+        self.idle = list(idle)
+        self.opened = []
+        self.closed = []
+
+    def getconn(self):
+        if self.idle:
+            return self.idle.pop(0)
+        conn = FakeConnection()
+        self.opened.append(conn)
+        return conn
+
+    def putconn(self, conn, close=False):
+        if close:
+            conn.closed = 1
+            self.closed.append(conn)
+        else:
+            self.idle.append(conn)
+
+
+@pytest.fixture
+def manager():
+    def make(idle, max_conn=3):
+        manager = DatabaseManager(SimpleNamespace(DB_POOL_MAX_CONN=max_conn, DB_POOL_CHECKOUT_TIMEOUT=1,
+                                                  DB_POOL_VALIDATE_IDLE_SECONDS=30))
+        manager.connection_pool = FakePool(idle)
+        manager._slots = threading.BoundedSemaphore(max_conn)
+        return manager
+
+    return make
+
+
+def test_recently_used_connection_is_not_checked(manager):
+    conn = FakeConnection()
+    db = manager([conn])
+    db._last_used[id(conn)] = time.monotonic()
+
+    with db.get_connection() as checked_out:
+        assert checked_out is conn
+
+    assert conn.checks == 0
+    assert db.get_pool_metrics()["validations"] == 0
+
+
+def test_failed_operation_marks_the_connection_for_a_check(manager):
+    conn = FakeConnection()
+    db = manager([conn])
+    db._last_used[id(conn)] = time.monotonic()
+
+    with pytest.raises(ValueError):
+        with db.get_connection():
+            raise ValueError("boom")
+
+    with db.get_connection() as checked_out:
+        assert checked_out is conn
+    assert conn.checks == 1
+
+
+def test_every_stale_idle_connection_is_replaced(manager):
+    stale = [FakeConnection(psycopg2.OperationalError("server closed the connection")) for _ in range(2)]
+    db = manager(stale)
+
+    with db.get_connection() as conn:
+        assert conn is db.connection_pool.opened[0]
+        assert conn.checks == 1
+
+    assert db.connection_pool.closed == stale
+    assert db.get_pool_metrics()["validation_failures"] == 2
+
+
+def test_connection_failing_its_check_with_any_error_is_discarded(manager):
+    broken = FakeConnection(RuntimeError("unexpected"))
+    db = manager([broken])
+
+    with db.get_connection() as conn:
+        assert conn is not broken
+
+    assert db.connection_pool.closed == [broken]
+    assert db.get_pool_metrics()["in_use"] == 0
+
+
+def test_checkout_gives_up_when_new_connections_fail_too(manager, monkeypatch):
+    db = manager([], max_conn=2)
+    monkeypatch.setattr(FakePool, "getconn", lambda self: FakeConnection(psycopg2.InterfaceError("gone")))
+
+    with pytest.raises(Exception, match="No working database connection"):
+        with db.get_connection():
+            pass
+
+    # The slot is given back, so later checkouts do not wait for it
+    assert db._slots.acquire(blocking=False) and db._slots.acquire(blocking=False)
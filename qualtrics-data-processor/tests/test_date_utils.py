@@ -0,0 +1,26 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from app.utils.date_utils import compute_submission_periods
+
+
+def test_periods_are_perth_local_time():
+    periods = compute_submission_periods(["2024-01-31 16:30:00", "2024-01-31 15:59:59"])
+
+    assert periods == [(datetime(2024, 1, 31, 16, 30, tzinfo=timezone.utc), 2024, 2),
+                       (datetime(2024, 1, 31, 15, 59, 59, tzinfo=timezone.utc), 2024, 1)]
+
+
+def test_missing_and_unparseable_dates_have_no_period():
+    assert compute_submission_periods([None, np.nan, "", "not a date"]) == [(None, None, None)] * 4
+
+
+def test_categorical_column_and_record_values_give_the_same_periods():
+    end_dates = ["2023-12-31 16:00:00", "2024-06-01 00:00:00,extra", None]
+
+    from_column = compute_submission_periods(pd.Series(end_dates, dtype="category"))
+
+    assert from_column == compute_submission_periods(end_dates)
+    assert [period[1:] for period in from_column] == [(2024, 1), (2024, 6), (None, None)]
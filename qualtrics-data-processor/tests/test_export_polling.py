@@ -0,0 +1,32 @@
+import pytest
+
+from app.services.extract_service import DataExtractionService
+
+
+@pytest.fixture
+def service():
+    service = DataExtractionService()
+    service.config.EXPORT_POLL_MIN_INTERVAL = 0.5
+    service.config.EXPORT_POLL_MAX_INTERVAL = 10.0
+    return service
+
+
+def test_delay_grows_geometrically_until_progress_is_reported(service):
+    delays = [service._next_poll_delay(elapsed=1, percent_complete=0, poll_count=count) for count in range(4)]
+
+    assert delays == [0.5, 0.75, 1.125, 1.6875]
+
+
+def test_delay_is_half_the_extrapolated_remaining_time(service):
+    # 20% done after 4s: about 16s left, so check again in 8s
+    assert service._next_poll_delay(elapsed=4, percent_complete=20, poll_count=3) == 8
+
+
+def test_delay_stays_within_the_configured_bounds(service):
+    assert service._next_poll_delay(elapsed=60, percent_complete=1, poll_count=2) == 10.0
+    assert service._next_poll_delay(elapsed=0.1, percent_complete=99, poll_count=2) == 0.5
+    assert service._next_poll_delay(elapsed=1, percent_complete=0, poll_count=50) == 10.0
+
+
+def test_complete_export_falls_back_to_the_minimum_schedule(service):
+    assert service._next_poll_delay(elapsed=5, percent_complete=100, poll_count=0) == 0.5
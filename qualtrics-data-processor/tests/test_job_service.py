@@ -0,0 +1,92 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services import job_service
+from app.services.job_service import PipelineJobService
+
+
+class RecordingCursor:
+    def __init__(self, rows=(), rowcount=1):
+        self.rows = list(rows)
+        self.rowcount = rowcount
+        self.statements = []
+
+    def execute(self, query, params=None):
+        self.statements.append((" ".join(query.split()), params))
+
+    def fetchall(self):
+        return self.rows
+
+
+@pytest.fixture
+def cursor(monkeypatch):
+    cursor = RecordingCursor()
+
+    @contextmanager
+    def get_cursor():
+        yield cursor
+
+    monkeypatch.setattr(job_service.db_manager, "get_cursor", get_cursor)
+    monkeypatch.setattr(job_service, "_start_heartbeat", lambda service: None)
+    return cursor
+
+
+def test_new_jobs_record_their_process_and_a_heartbeat(cursor):
+    job_id = PipelineJobService()._create_job("extract", {"survey_ids": ["SV_1"]})
+
+    query, params = cursor.statements[0]
+    assert "worker_id, heartbeat_at" in query
+    assert params[0] == job_id
+    assert params[4] == job_service._worker_id()
+    assert params[5] == params[3]
+
+
+def test_unknown_job_type_is_rejected(cursor):
+    with pytest.raises(ValueError, match="Unknown job type"):
+        PipelineJobService()._create_job("reindex", {})
+
+    assert cursor.statements == []
+
+
+def test_stale_jobs_are_failed_by_heartbeat_age(cursor):
+    cursor.rows = [{"id": "job-1", "worker_id": "web-1:42"}, {"id": "job-2", "worker_id": None}]
+    service = PipelineJobService()
+
+    before = datetime.now(timezone.utc)
+    assert service.fail_stale_jobs() == 2
+
+    query, (error, finished_at, cutoff) = cursor.statements[0]
+    assert "status IN ('queued', 'running')" in query
+    assert "COALESCE(heartbeat_at, started_at, created_at) < %s" in query
+    assert error.startswith("Interrupted")
+    assert finished_at - cutoff == timedelta(seconds=service.config.JOB_STALE_SECONDS)
+    assert finished_at >= before
+
+
+def test_job_cancelled_before_it_starts_does_not_run(cursor, monkeypatch):
+    cursor.rowcount = 0
+    monkeypatch.setattr(job_service, "PipelineService", lambda **kwargs: pytest.fail("pipeline started"))
+
+    assert PipelineJobService()._run_job("job-1", "extract", {}) is None
+    assert cursor.statements[0][0].startswith("UPDATE pipeline_jobs SET status = 'running'")
+
+
+def test_heartbeat_thread_starts_once_per_process(monkeypatch):
+    started = []
+
+    class FakeThread:
+        def __init__(self, target, name, daemon):
+            self.name = name
+
+        def start(self):
+            started.append(self.name)
+
+    monkeypatch.setattr(job_service, "_heartbeat_pid", None)
+    monkeypatch.setattr(job_service.threading, "Thread", FakeThread)
+
+    job_service._start_heartbeat(PipelineJobService())
+    job_service._start_heartbeat(PipelineJobService())
+
+    assert started == ["pipeline-job-heartbeat"]
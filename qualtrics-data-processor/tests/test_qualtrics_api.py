@@ -0,0 +1,49 @@
+import pytest
+
+from app.services.qualtrics_api import QualtricsAPI
+
+
+class FakeResponse:
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"result": {"progressId": "ES_1"}}
+
+
+@pytest.fixture
+def posted(monkeypatch):
+    """Records the JSON payloads start_export sends instead of calling Qualtrics"""
+    payloads = []
+
+    def request(self, method, url, json=None, **kwargs):
+        payloads.append(json)
+        return FakeResponse()
+
+    monkeypatch.setattr(QualtricsAPI, "request", request)
+    return payloads
+
+
+def test_start_export_defaults_to_a_full_csv_export(posted):
+    assert QualtricsAPI().start_export("SV_1") == "ES_1"
+
+    assert posted == [{"format": "csv"}]
+
+
+def test_start_export_uses_start_date_without_a_continuation_token(posted):
+    QualtricsAPI().start_export("SV_1", start_date="2024-01-01T00:00:00Z", allow_continuation=True)
+
+    assert posted == [{"format": "csv", "startDate": "2024-01-01T00:00:00Z", "allowContinuation": True}]
+
+
+def test_start_export_drops_start_date_when_continuing(posted):
+    QualtricsAPI().start_export("SV_1", start_date="2024-01-01T00:00:00Z", continuation_token="token",
+                                allow_continuation=True)
+
+    assert posted == [{"format": "csv", "continuationToken": "token", "allowContinuation": True}]
+
+
+def test_export_payload_matches_start_export():
+    # The async backend posts export_payload() itself, so it must build what start_export sends
+    assert QualtricsAPI.export_payload(start_date="2024-01-01T00:00:00Z") == \
+        {"format": "csv", "startDate": "2024-01-01T00:00:00Z"}
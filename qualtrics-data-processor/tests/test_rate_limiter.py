@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from app.utils import rate_limiter
+from app.utils.rate_limiter import RateLimiter
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Records the waits RateLimiter.acquire asks for instead of sleeping"""
+    recorded = []
+    monkeypatch.setattr(rate_limiter.time, "sleep", recorded.append)
+    return recorded
+
+
+def test_calls_are_spaced_by_the_interval(sleeps):
+    limiter = RateLimiter(10)
+
+    for _ in range(3):
+        limiter.acquire()
+
+    assert len(sleeps) == 2
+    assert sleeps[0] == pytest.approx(0.1, abs=0.02)
+    assert sleeps[1] == pytest.approx(0.2, abs=0.02)
+
+
+@pytest.mark.parametrize("rate", [0, None, -1])
+def test_zero_rate_disables_throttling(rate, sleeps):
+    limiter = RateLimiter(rate)
+
+    for _ in range(3):
+        limiter.acquire()
+
+    assert limiter.interval == 0.0
+    assert sleeps == []
+
+
+def test_acquire_async_shares_the_schedule_with_acquire():
+    limiter = RateLimiter(20)
+    limiter.acquire()
+
+    asyncio.run(limiter.acquire_async())
+
+    assert limiter._reserve() == pytest.approx(0.05, abs=0.02)
@@ -0,0 +1,202 @@
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services import load_service
+from app.services.load_service import DataLoadService, response_content_hashes
+
+
+def make_responses(**overrides):
+    data = {
+        "ResponseId": ["R_1", "R_2", "R_3"],
+        "EndDate": ["2024-01-01 00:00:00", "2024-01-02 00:00:00", "2024-02-01 00:00:00"],
+        "Satisfaction": ["4", np.nan, "5"],
+        "Ab_1": ["1", "2", np.nan],
+    }
+    data.update(overrides)
+    return pd.DataFrame(data)
+
+
+class RecordingCursor:
+    """Answers the diff load's SELECTs from stored rows and records every other statement"""
+
+    def __init__(self, stored_hashes):
+        self.stored_hashes = stored_hashes
+        self.statements = []
+        self.copied = []
+        self.rowcount = 0
+        self.connection = self
+        self._rows = []
+
+    def cancel(self):
+        pass
+
+    def execute(self, query, params=None):
+        query = " ".join(query.split())
+        self.statements.append((query, params))
+        self.rowcount = 0
+        if query.startswith("SELECT response_id, content_hash"):
+            self._rows = [{"response_id": response_id, "content_hash": content_hash}
+                          for response_id, content_hash in self.stored_hashes.items()]
+        elif query.startswith("SELECT DISTINCT period_year"):
+            self._rows = [{"period_year": 2024, "period_month": 1}] if params[1] else []
+
+    def fetchall(self):
+        return self._rows
+
+    def copy_expert(self, query, stream):
+        self.copied.extend(stream.read().splitlines())
+
+
+@pytest.fixture
+def diff_load(monkeypatch):
+    """Runs a diff replace against a RecordingCursor; returns (result, cursor)"""
+    def run(batches, stored_hashes):
+        cursor = RecordingCursor(stored_hashes)
+
+        @contextmanager
+        def get_cursor():
+            yield cursor
+
+        monkeypatch.setattr(load_service.db_manager, "get_cursor", get_cursor)
+        service = DataLoadService()
+        service.config.RESPONSES_REPLACE_STRATEGY = "diff"
+        service.config.RESPONSES_LOAD_METHOD = "copy"
+        return service._write_survey_responses("survey-uuid", batches), cursor
+
+    return run
+
+
+def test_hash_is_the_same_for_categorical_string_and_object_columns():
+    df = make_responses()
+    hashes = response_content_hashes(df)
+
+    assert response_content_hashes(df.astype("category")) == hashes
+    assert response_content_hashes(df.astype("string")) == hashes
+    assert response_content_hashes(df.astype(object).where(df.notna(), None)) == hashes
+
+
+def test_hash_ignores_column_order_but_not_column_names_or_values():
+    df = make_responses()
+    hashes = response_content_hashes(df)
+
+    assert response_content_hashes(df[list(reversed(df.columns))]) == hashes
+    assert response_content_hashes(df.rename(columns={"Ab_1": "Ab_2"})) != hashes
+
+    changed = response_content_hashes(make_responses(Ab_1=["1", "3", np.nan]))
+    assert changed[0] == hashes[0]
+    assert changed[1] != hashes[1]
+    assert changed[2] == hashes[2]
+
+
+def test_hash_tells_missing_answers_from_empty_strings():
+    assert response_content_hashes(make_responses(Ab_1=["1", "2", ""]))[2] != \
+        response_content_hashes(make_responses())[2]
+
+
+def test_changed_positions_skips_unchanged_and_always_writes_rows_without_response_id():
+    df = make_responses(ResponseId=["R_1", None, "R_3"])
+    hashes = response_content_hashes(df)
+    stored = {"R_1": hashes[0], "R_3": "stale"}
+    seen_ids = set()
+
+    positions = DataLoadService()._changed_positions(df, hashes, stored, seen_ids)
+
+    assert positions == [1, 2]
+    assert seen_ids == {"R_1", "R_3"}
+    assert stored["R_3"] == hashes[2]
+
+
+def test_changed_positions_rewrites_rows_stored_without_a_hash():
+    df = make_responses()
+    hashes = response_content_hashes(df)
+    stored = {"R_1": hashes[0], "R_2": None, "R_3": hashes[2]}
+
+    assert DataLoadService()._changed_positions(df, hashes, stored, set()) == [1]
+
+
+def test_duplicate_response_id_is_written_again_only_when_it_differs():
+    service = DataLoadService()
+    same = {"ResponseId": ["R_1"] * 3, "EndDate": ["2024-01-01 00:00:00"] * 3, "Satisfaction": ["4"] * 3}
+    df = make_responses(**same, Ab_1=["1", "1", "2"])
+    hashes = response_content_hashes(df)
+
+    # The stored row matches the first two occurrences; the last one differs and must win
+    stored = {"R_1": hashes[0]}
+    assert service._changed_positions(df, hashes, stored, set()) == [2]
+
+    # The first occurrence differs from the stored row and the last one matches it again
+    df = make_responses(**same, Ab_1=["2", "2", "1"])
+    hashes = response_content_hashes(df)
+    stored = {"R_1": hashes[2]}
+    assert service._changed_positions(df, hashes, stored, set()) == [0, 2]
+
+
+def test_take_rows_keeps_periods_and_hashes_aligned():
+    df = make_responses()
+    periods = [("p1",), ("p2",), ("p3",)]
+
+    rows, taken_periods, taken_hashes = DataLoadService()._take_rows(df, periods, ["h1", "h2", "h3"], [0, 2])
+
+    assert rows["ResponseId"].tolist() == ["R_1", "R_3"]
+    assert taken_periods == [("p1",), ("p3",)]
+    assert taken_hashes == ["h1", "h3"]
+
+
+def test_diff_load_stages_changed_rows_and_deletes_removed_ids(diff_load):
+    df = make_responses()
+    hashes = response_content_hashes(df)
+    stored = {"R_1": hashes[0], "R_2": "stale", "R_gone": "x"}
+
+    result, cursor = diff_load([(df, None, hashes)], stored)
+
+    assert [line.split(",")[1] for line in cursor.copied] == ["R_2", "R_3"]
+    assert result["unchanged_count"] == 1
+    assert result["total_input_records"] == 3
+
+    delete_params = [params for query, params in cursor.statements
+                     if query.startswith("DELETE FROM survey_responses WHERE")]
+    assert delete_params == [("survey-uuid", ["R_gone"])]
+
+    upsert = next(query for query, _ in cursor.statements if "SELECT DISTINCT ON (response_id)" in query)
+    assert "IS DISTINCT FROM" not in upsert
+
+
+def test_diff_load_without_changes_writes_nothing(diff_load):
+    df = make_responses()
+    hashes = response_content_hashes(df)
+
+    result, cursor = diff_load([(df, None, hashes)], dict(zip(df["ResponseId"], hashes)))
+
+    assert cursor.copied == []
+    assert result["unchanged_count"] == 3
+    assert result["rollup_rows"] == 0
+    assert not any("survey_response_rollups" in query for query, _ in cursor.statements)
+
+
+def test_diff_load_hashes_batches_that_come_without_hashes(diff_load):
+    df = make_responses()
+    records = df.astype(object).where(df.notna(), np.nan).to_dict(orient="records")
+    stored = dict(zip(df["ResponseId"], response_content_hashes(df)))
+
+    result, cursor = diff_load([(records, None, None)], stored)
+
+    assert result["unchanged_count"] == 3
+    assert cursor.copied == []
+
+
+def test_rejected_row_indexes_refer_to_the_whole_export(diff_load, monkeypatch):
+    df = make_responses()
+    hashes = response_content_hashes(df)
+    stored = {"R_1": hashes[0], "R_2": hashes[1]}
+
+    def reject_all(self, cursor, survey_uuid, responses_data, *args, **kwargs):
+        return 0, [{"row_index": idx, "error": "bad"} for idx in range(len(responses_data))]
+
+    monkeypatch.setattr(DataLoadService, "_write_response_batch", reject_all)
+    result, _ = diff_load([(df.iloc[:1], None, hashes[:1]), (df.iloc[1:].reset_index(drop=True), None, hashes[1:])],
+                          stored)
+
+    assert [rejected["row_index"] for rejected in result["rejected_rows"]] == [2]
@@ -0,0 +1,66 @@
+import psycopg2
+import pytest
+
+from app.services.load_service import DataLoadService
+
+
+class AbortingCursor:
+    """Fails INSERTs of the given response ids and, like Postgres, every statement after that until a rollback"""
+
+    def __init__(self, failing_ids=()):
+        self.failing_ids = set(failing_ids)
+        self.statements = []
+        self.inserted_ids = []
+        self.aborted = False
+
+    def execute(self, query, params=None):
+        query = " ".join(query.split())
+        self.statements.append(query)
+        if query.startswith("ROLLBACK TO SAVEPOINT"):
+            self.aborted = False
+            return
+        if self.aborted:
+            raise psycopg2.InternalError("current transaction is aborted")
+        if query.startswith("INSERT"):
+            if params[1] in self.failing_ids:
+                self.aborted = True
+                raise psycopg2.DataError("invalid input")
+            self.inserted_ids.append(params[1])
+
+
+@pytest.fixture
+def service():
+    return DataLoadService()
+
+
+def responses(*response_ids):
+    return [{"ResponseId": response_id, "EndDate": "2024-01-01 00:00:00", "Satisfaction": "5"}
+            for response_id in response_ids]
+
+
+def periods(count):
+    return [(None, 2024, 1)] * count
+
+
+def test_row_method_skips_a_failing_row_and_keeps_the_rest(service):
+    cursor = AbortingCursor(failing_ids={"R_2"})
+
+    inserted_count, rejected_rows = service._insert_rows_individually(cursor, "survey-uuid",
+                                                                      responses("R_1", "R_2", "R_3"), periods(3))
+
+    assert inserted_count == 2
+    assert cursor.inserted_ids == ["R_1", "R_3"]
+    assert [rejected["row_index"] for rejected in rejected_rows] == [1]
+    assert cursor.statements.count("ROLLBACK TO SAVEPOINT responses_row") == 1
+    assert cursor.statements.count("RELEASE SAVEPOINT responses_row") == 2
+
+
+def test_rows_without_submission_periods_get_perth_periods(service):
+    records = responses("R_1") + [{"ResponseId": "R_2", "EndDate": "2024-01-31 16:30:00"}]
+    cursor = AbortingCursor()
+
+    rows, rejected_rows = service._prepare_response_rows("survey-uuid", records)
+
+    assert rejected_rows == []
+    assert service._insert_rows_individually(cursor, "survey-uuid", records) == (2, [])
+    assert [values[3:5] for _, values in rows] == [(2024, 1), (2024, 2)]
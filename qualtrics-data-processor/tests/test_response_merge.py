@@ -0,0 +1,124 @@
+from contextlib import contextmanager
+
+import pandas as pd
+import pytest
+
+from app.services import load_service
+from app.services.load_service import RESPONSE_STAGING_TABLE, DataLoadService
+
+
+class RecordingCursor:
+    """Records every statement and COPY; DML reports rowcounts from the given {statement prefix: count}"""
+
+    def __init__(self, rowcounts=None):
+        self.rowcounts = rowcounts or {}
+        self.statements = []
+        self.copies = []
+        self.rowcount = 0
+        self.connection = self
+
+    def cancel(self):
+        pass
+
+    def execute(self, query, params=None):
+        query = " ".join(query.split())
+        self.statements.append((query, params))
+        self.rowcount = next((count for prefix, count in self.rowcounts.items() if query.startswith(prefix)), 0)
+
+    def fetchall(self):
+        return []
+
+    def copy_expert(self, query, stream):
+        self.copies.append((query, stream.read().splitlines()))
+
+    def queries(self, prefix):
+        return [query for query, _ in self.statements if query.startswith(prefix)]
+
+
+@pytest.fixture
+def load(monkeypatch):
+    """Runs _write_survey_responses with the given replace strategy; returns (result, cursor)"""
+    def run(strategy, batches, cursor=None, **kwargs):
+        cursor = cursor or RecordingCursor()
+
+        @contextmanager
+        def get_cursor():
+            yield cursor
+
+        monkeypatch.setattr(load_service.db_manager, "get_cursor", get_cursor)
+        service = DataLoadService()
+        service.config.RESPONSES_REPLACE_STRATEGY = strategy
+        service.config.RESPONSES_LOAD_METHOD = "copy"
+        return service._write_survey_responses("survey-uuid", batches, **kwargs), cursor
+
+    return run
+
+
+def responses():
+    return pd.DataFrame({"ResponseId": ["R_1", None, "R_1"],
+                         "EndDate": ["2024-01-01 00:00:00", "2024-01-02 00:00:00", "2024-02-01 00:00:00"],
+                         "Satisfaction": ["4", "5", "6"]})
+
+
+def test_merge_stages_every_row_and_writes_only_changed_ones(load):
+    cursor = RecordingCursor({"DELETE FROM survey_responses sr": 4, "INSERT INTO survey_responses": 1})
+
+    result, cursor = load("merge", [(responses(), None, None)], cursor)
+
+    copy_query, copied = cursor.copies[0]
+    assert copy_query.startswith(f"COPY {RESPONSE_STAGING_TABLE} ")
+    assert len(copied) == 3
+    assert cursor.queries(f"CREATE TEMP TABLE {RESPONSE_STAGING_TABLE} ON COMMIT DROP")
+    assert cursor.queries(f"ANALYZE {RESPONSE_STAGING_TABLE}")
+
+    delete, = cursor.queries("DELETE FROM survey_responses sr")
+    assert "response_id IS NULL OR NOT EXISTS" in delete
+
+    upsert, null_ids = cursor.queries("INSERT INTO survey_responses")
+    assert "SELECT DISTINCT ON (response_id)" in upsert
+    assert "ORDER BY response_id, staged_order DESC" in upsert
+    assert "IS DISTINCT FROM" in upsert
+    assert null_ids.endswith("WHERE response_id IS NULL")
+
+    assert result["deleted_count"] == 4
+    assert result["changed_count"] == 2
+    assert "unchanged_count" not in result
+
+
+def test_merge_keeps_the_survey_rows_until_the_staged_rows_are_applied(load):
+    _, cursor = load("merge", [(responses(), None, None)])
+
+    assert not cursor.queries("DELETE FROM survey_responses WHERE survey_id")
+    statements = [query for query, _ in cursor.statements]
+    merge_start = statements.index(cursor.queries(f"ANALYZE {RESPONSE_STAGING_TABLE}")[0])
+    assert all(not query.startswith("DELETE FROM survey_responses") for query in statements[:merge_start])
+
+
+def test_merge_recomputes_the_rollups_of_the_whole_survey(load):
+    _, cursor = load("merge", [(responses(), None, None)])
+
+    rollup_delete, = cursor.queries("DELETE FROM survey_response_rollups")
+    assert "unnest" not in rollup_delete
+    assert cursor.queries("INSERT INTO survey_response_rollups")
+
+
+def test_delete_strategy_clears_the_survey_and_copies_into_it(load):
+    result, cursor = load("delete", [(responses(), None, None)],
+                          RecordingCursor({"DELETE FROM survey_responses WHERE survey_id": 7}))
+
+    assert cursor.copies[0][0].startswith("COPY survey_responses ")
+    assert not cursor.queries("CREATE TEMP TABLE")
+    assert result["deleted_count"] == 7
+    assert result["inserted_count"] == 3
+
+
+def test_upsert_and_append_loads_do_not_stage(load, monkeypatch):
+    # Upserts go through execute_values, which needs a real connection
+    monkeypatch.setattr(DataLoadService, "_insert_rows_paged", lambda self, cursor, rows, *args: (len(rows), []))
+
+    _, upsert_cursor = load("merge", [(responses(), None, None)], replace_existing=False, upsert=True)
+    _, append_cursor = load("merge", [(responses(), None, None)], replace_existing=False)
+
+    for cursor in (upsert_cursor, append_cursor):
+        assert not cursor.queries("CREATE TEMP TABLE")
+        assert not cursor.queries("DELETE FROM survey_responses")
@@ -0,0 +1,124 @@
+from contextlib import contextmanager
+
+import pandas as pd
+import pytest
+
+from app.services import load_service
+from app.services.load_service import DataLoadService
+
+
+class PeriodCursor:
+    """Answers _response_periods from {response_id: (period_year, period_month)} and records every statement"""
+
+    def __init__(self, stored_periods=None):
+        self.stored_periods = stored_periods or {}
+        self.statements = []
+        self.rowcount = 0
+        self.connection = self
+        self._rows = []
+
+    def cancel(self):
+        pass
+
+    def execute(self, query, params=None):
+        query = " ".join(query.split())
+        self.statements.append((query, params))
+        self.rowcount = 5 if query.startswith("INSERT INTO survey_response_rollups") else 0
+        if query.startswith("SELECT DISTINCT period_year"):
+            self._rows = [{"period_year": year, "period_month": month}
+                          for response_id, (year, month) in self.stored_periods.items() if response_id in params[1]]
+
+    def fetchall(self):
+        return self._rows
+
+    def queries(self, prefix):
+        return [(query, params) for query, params in self.statements if query.startswith(prefix)]
+
+
+def test_no_touched_periods_writes_nothing():
+    cursor = PeriodCursor()
+
+    assert DataLoadService()._refresh_response_rollups(cursor, "survey-uuid", set()) == 0
+    assert cursor.statements == []
+
+
+def test_whole_survey_refresh_has_no_period_filter():
+    cursor = PeriodCursor()
+
+    assert DataLoadService()._refresh_response_rollups(cursor, "survey-uuid") == 5
+
+    (delete, delete_params), = cursor.queries("DELETE FROM survey_response_rollups")
+    (insert, insert_params), = cursor.queries("INSERT INTO survey_response_rollups")
+    assert "unnest" not in delete and "unnest" not in insert
+    assert delete_params == insert_params == ["survey-uuid"]
+    assert "sr.satisfaction IS NOT NULL AND sr.nps_group IS NOT NULL" in insert
+
+
+def test_period_refresh_matches_null_periods_too():
+    cursor = PeriodCursor()
+
+    DataLoadService()._refresh_response_rollups(cursor, "survey-uuid", {(2024, 1), (None, None)})
+
+    for query, params in cursor.statements:
+        assert "unnest(%s::integer[], %s::integer[])" in query
+        assert "IS NOT DISTINCT FROM" in query
+        survey_id, years, months = params
+        assert survey_id == "survey-uuid"
+        assert sorted(zip(years, months), key=str) == sorted([(2024, 1), (None, None)], key=str)
+
+
+def test_response_periods_include_rows_without_a_response_id():
+    cursor = PeriodCursor({"R_1": (2024, 1)})
+
+    assert DataLoadService()._response_periods(cursor, "survey-uuid", {"R_1", None, "R_0"}) == {(2024, 1)}
+
+    query, params = cursor.statements[0]
+    assert "response_id IS NULL OR response_id = ANY(%s)" in query
+    assert params == ("survey-uuid", ["R_0", "R_1"])
+
+
+def test_upsert_refreshes_the_periods_responses_left_and_entered(monkeypatch):
+    # R_1 moves from January to March, R_2 is new in February
+    cursor = PeriodCursor({"R_1": (2024, 1)})
+
+    @contextmanager
+    def get_cursor():
+        yield cursor
+
+    monkeypatch.setattr(load_service.db_manager, "get_cursor", get_cursor)
+    refreshed = []
+    monkeypatch.setattr(DataLoadService, "_refresh_response_rollups",
+                        lambda self, cursor, survey_uuid, periods=None: refreshed.append(periods) or 0)
+
+    def load_and_move():
+        cursor.stored_periods.update({"R_1": (2024, 3), "R_2": (2024, 2)})
+        return 2, []
+
+    monkeypatch.setattr(DataLoadService, "_write_response_batch", lambda self, *args: load_and_move())
+    batch = pd.DataFrame({"ResponseId": ["R_1", "R_2"], "EndDate": ["2024-03-01", "2024-02-01"]})
+
+    DataLoadService()._write_survey_responses("survey-uuid", [(batch, None, None)], replace_existing=False,
+                                              upsert=True)
+
+    assert refreshed == [{(2024, 1), (2024, 2), (2024, 3)}]
+
+
+@pytest.mark.parametrize("replace_existing", [True, False])
+def test_replace_and_append_loads_refresh_the_whole_survey(monkeypatch, replace_existing):
+    cursor = PeriodCursor()
+
+    @contextmanager
+    def get_cursor():
+        yield cursor
+
+    monkeypatch.setattr(load_service.db_manager, "get_cursor", get_cursor)
+    monkeypatch.setattr(DataLoadService, "_write_response_batch", lambda self, *args: (1, []))
+    service = DataLoadService()
+    service.config.RESPONSES_REPLACE_STRATEGY = "delete"
+
+    result = service._write_survey_responses("survey-uuid", [(pd.DataFrame({"ResponseId": ["R_1"]}), None, None)],
+                                             replace_existing=replace_existing)
+
+    (_, params), = cursor.queries("DELETE FROM survey_response_rollups")
+    assert params == ["survey-uuid"]
+    assert result["rollup_rows"] == 5
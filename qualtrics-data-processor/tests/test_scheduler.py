@@ -0,0 +1,110 @@
+import math
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services.scheduler_service import RefreshScheduler
+
+NOW = datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def candidate(survey_id, minutes_ago=None, interval_minutes=60, recent_responses=0, enabled=True, **state):
+    return {
+        "survey_id": survey_id,
+        "organisation_id": None,
+        "interval_minutes": interval_minutes,
+        "enabled": enabled,
+        "last_extracted_at": NOW - timedelta(minutes=minutes_ago) if minutes_ago is not None else None,
+        "response_count": state.get("response_count"),
+        "refreshed_at": state.get("refreshed_at"),
+        "checked_at": state.get("checked_at"),
+        "recent_responses": recent_responses,
+    }
+
+
+class FakeQualtrics:
+    def __init__(self, counts):
+        self.counts = counts
+
+    def get_response_count(self, survey_id):
+        count = self.counts[survey_id]
+        if isinstance(count, Exception):
+            raise count
+        return count
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = RefreshScheduler()
+    scheduler.config.SCHEDULER_VELOCITY_DAYS = 7
+    scheduler.config.SCHEDULER_MAX_SURVEYS_PER_RUN = 20
+    scheduler.config.SCHEDULER_FORCE_REFRESH_HOURS = 24
+    return scheduler
+
+
+def test_never_extracted_surveys_lead_and_disabled_or_fresh_ones_are_left_out(scheduler):
+    due = scheduler.select_due_surveys([
+        candidate("SV_overdue", minutes_ago=120),
+        candidate("SV_new"),
+        candidate("SV_fresh", minutes_ago=30),
+        candidate("SV_disabled", minutes_ago=600, enabled=False),
+    ], NOW)
+
+    assert [survey["survey_id"] for survey in due] == ["SV_new", "SV_overdue"]
+    assert due[0]["priority"] == math.inf
+    assert due[1]["priority"] == pytest.approx(2.0)
+
+
+def test_busy_surveys_outrank_equally_overdue_quiet_ones(scheduler):
+    due = scheduler.select_due_surveys([
+        candidate("SV_quiet", minutes_ago=120),
+        candidate("SV_busy", minutes_ago=120, recent_responses=70),
+    ], NOW)
+
+    assert [survey["survey_id"] for survey in due] == ["SV_busy", "SV_quiet"]
+    assert due[0]["priority"] == pytest.approx(2 * (1 + math.log1p(10)))
+
+
+def test_last_check_counts_as_seen(scheduler):
+    checked = candidate("SV_checked", minutes_ago=600, checked_at=NOW - timedelta(minutes=10))
+
+    assert scheduler.select_due_surveys([checked], NOW) == []
+
+
+def test_unchanged_response_count_skips_until_the_forced_refresh(scheduler):
+    survey = candidate("SV_1", response_count=40, refreshed_at=NOW - timedelta(hours=2))
+    survey["current_response_count"] = 40
+    assert scheduler._is_unchanged(survey, NOW)
+
+    survey["current_response_count"] = 41
+    assert not scheduler._is_unchanged(survey, NOW)
+
+    survey["current_response_count"] = 40
+    survey["refreshed_at"] = NOW - timedelta(hours=25)
+    assert not scheduler._is_unchanged(survey, NOW)
+
+
+def test_surveys_never_refreshed_by_the_scheduler_are_not_skipped(scheduler):
+    survey = candidate("SV_1")
+    survey["current_response_count"] = 0
+
+    assert not scheduler._is_unchanged(survey, NOW)
+
+
+def test_pick_fills_the_budget_in_priority_order(scheduler):
+    scheduler.config.SCHEDULER_MAX_SURVEYS_PER_RUN = 2
+    scheduler.api_client = FakeQualtrics({"SV_a": 10, "SV_b": RuntimeError("down"), "SV_c": 5, "SV_d": 1})
+    refreshed_at = NOW - timedelta(hours=1)
+    due = [
+        candidate("SV_a", response_count=10, refreshed_at=refreshed_at),
+        candidate("SV_b"),
+        candidate("SV_c", response_count=4, refreshed_at=refreshed_at),
+        candidate("SV_d"),
+    ]
+
+    selected, skipped = scheduler._pick_surveys_with_new_responses(due, NOW)
+
+    # SV_b is refreshed anyway since its count could not be read
+    assert [survey["survey_id"] for survey in selected] == ["SV_b", "SV_c"]
+    assert selected[0]["current_response_count"] is None
+    assert skipped == ["SV_a"]